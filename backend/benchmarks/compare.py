@@ -0,0 +1,52 @@
+"""
+Compare two result files written by `run.py`.
+
+    python benchmarks/compare.py baseline.json candidate.json
+"""
+
+import argparse
+import json
+from typing import Any, Dict, Tuple
+
+METRICS = ("throughput_per_second", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, str]:
+    return result["stage"], json.dumps(result["params"], sort_keys=True)
+
+
+def _change(before: float | None, after: float | None) -> str:
+    if before is None or after is None:
+        return "n/a"
+    if not before:
+        return f"{after:.2f}"
+    return f"{after:.2f} ({100 * (after - before) / before:+.1f}%)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = {_key(result): result for result in json.load(f)["results"]}
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)["results"]
+
+    print(f"{'stage':<22} {'params':<36} " + " ".join(f"{m:>24}" for m in METRICS))
+    for result in candidate:
+        before = baseline.get(_key(result))
+        params = ",".join(f"{key}={value}" for key, value in result["params"].items())
+        cells = [
+            _change(before.get(metric) if before else None, result.get(metric))
+            for metric in METRICS
+        ]
+        print(
+            f"{result['stage']:<22} {params[:36]:<36} "
+            + " ".join(f"{cell:>24}" for cell in cells)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_QUESTION_MARKERS = ("**New User Question:**", "**QUESTION:**")
+_CONTEXT_ID = re.compile(r"\bid: ([^|\n]+)")
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic offline stand-in for Titan embeddings.
+
+    Every word is hashed into one of `buckets` fixed random directions and a
+    text embeds to the normalized sum of its words, so texts sharing words
+    are close, as they would be with a real model. `latency_ms` simulates
+    the round trip to Bedrock.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 1024,
+        buckets: int = 4096,
+        latency_ms: float = 0.0,
+        seed: int = 0,
+    ):
+        self.dimension = dimension
+        self.latency_ms = latency_ms
+        rng = np.random.default_rng(seed)
+        self._directions = rng.standard_normal((buckets, dimension)).astype(np.float32)
+
+    def _embed(self, text: str) -> List[float]:
+        words = _TOKEN.findall(text.lower())
+        if not words:
+            return [0.0] * self.dimension
+        rows = [zlib.crc32(word.encode("utf-8")) % len(self._directions) for word in words]
+        vector = self._directions[rows].sum(axis=0)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._embed(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return [self._embed(text) for text in texts]
+
+
+def _question(text: str) -> str:
+    for marker in _QUESTION_MARKERS:
+        if marker in text:
+            return text.rsplit(marker, 1)[1].strip().split("\n", 1)[0].strip()
+    return text.strip().rsplit("\n", 1)[-1]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Offline chat model following the two calls the RAG pipeline makes.
+
+    - Bound to tools, it calls the first tool with the user's question, as
+      the routing prompt asks for.
+    - Otherwise it answers the RAG prompt with the structured JSON the
+      output suffix asks for: the ids of the first `max_results` listings in
+      the context, or, without the hydrate suffix, their full records as
+      returned by `lookup` (listing keys -> `RealEstate` dicts).
+
+    Each call sleeps `latency_ms` ± `jitter_ms`.
+    """
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    max_results: int = 3
+    hydrate_marker: str = '"ids"'
+    lookup: Optional[Callable[[List[str]], List[Dict[str, Any]]]] = None
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-benchmark"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        return self.model_copy(
+            update={"tool_names": [getattr(tool, "name", str(tool)) for tool in tools]}
+        )
+
+    def _delay(self) -> float:
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt = "\n".join(str(message.content) for message in messages)
+        question = _question(prompt)
+        has_context = any(isinstance(message, ToolMessage) for message in messages)
+        if self.tool_names and not has_context:
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": self.tool_names[0],
+                        "args": {"query": question},
+                        "id": f"call-{zlib.crc32(question.encode('utf-8')):08x}",
+                    }
+                ],
+            )
+
+        ids = list(dict.fromkeys(key.strip() for key in _CONTEXT_ID.findall(prompt)))
+        ids = ids[: self.max_results]
+        answer = f"Có {len(ids)} bất động sản phù hợp với yêu cầu: {question}"
+        if self.hydrate_marker in prompt:
+            payload: Dict[str, Any] = {"response": answer, "ids": ids}
+        else:
+            payload = {
+                "response": answer,
+                "result": self.lookup(ids) if self.lookup is not None else [],
+            }
+        return AIMessage(content=json.dumps(payload, ensure_ascii=False))
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+
+class FakeRedis:
+    """
+    In-process stand-in for a `decode_responses=True` redis-py client, with
+    the commands and pipelines of `RedisChatHistoryStore`. Keys expire lazily,
+    when next accessed.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires_at: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _get(self, key: str, default: Any = None) -> Any:
+        expires_at = self._expires_at.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            del self._expires_at[key]
+        return self._data.get(key, default)
+
+    def _set(self, key: str, value: Any) -> None:
+        self._get(key)
+        self._data[key] = value
+
+    @staticmethod
+    def _range(values: list, start: int, end: int) -> slice:
+        # Redis ranges are inclusive and clamp out-of-range indexes
+        size = len(values)
+        start = max(start + size if start < 0 else start, 0)
+        end = end + size if end < 0 else min(end, size - 1)
+        return slice(start, end + 1) if start <= end else slice(0, 0)
+
+    def ping(self) -> bool:
+        return True
+
+    def incrby(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._get(key, 0)) + amount
+            self._set(key, str(value))
+            return value
+
+    def rpush(self, key: str, *values: Any) -> int:
+        with self._lock:
+            items = self._get(key, [])
+            items = items + [str(value) for value in values]
+            self._set(key, items)
+            return len(items)
+
+    def ltrim(self, key: str, start: int, end: int) -> bool:
+        with self._lock:
+            items = self._get(key, [])
+            self._set(key, items[self._range(items, start, end)])
+            return True
+
+    def lrange(self, key: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            items = self._get(key, [])
+            return list(items[self._range(items, start, end)])
+
+    def hset(self, key: str, mapping: Dict[str, Any]) -> int:
+        with self._lock:
+            fields = dict(self._get(key, {}))
+            added = len(set(mapping) - set(fields))
+            fields.update({field: str(value) for field, value in mapping.items()})
+            self._set(key, fields)
+            return added
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._get(key, {}))
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if self._get(key) is None:
+                return False
+            self._expires_at[key] = time.monotonic() + seconds
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            deleted = 0
+            for key in keys:
+                deleted += self._get(key) is not None
+                self._data.pop(key, None)
+                self._expires_at.pop(key, None)
+            return deleted
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedisPipeline":
+        return FakeRedisPipeline(self)
+
+
+class FakeRedisPipeline:
+    """Buffers commands and runs them on `execute`, like a redis-py pipeline."""
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._commands: List[Callable[[], Any]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., "FakeRedisPipeline"]:
+        command = getattr(self._client, name)
+
+        def queue(*args: Any, **kwargs: Any) -> "FakeRedisPipeline":
+            self._commands.append(lambda: command(*args, **kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> List[Any]:
+        with self._client._lock:
+            results = [command() for command in self._commands]
+        self._commands = []
+        return results
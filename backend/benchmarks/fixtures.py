@@ -0,0 +1,280 @@
+import json
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from fakes import HashEmbeddings
+
+# Building blocks of the synthetic listings, shaped like the crawled feed in
+# `ingest_data/data.json`
+_PROPERTY_TYPES = (
+    "Nhà mặt tiền", "Nhà trong hẻm", "Căn hộ chung cư", "Đất thổ cư", "Biệt thự",
+    "Nhà phố", "Văn phòng", "Mặt bằng kinh doanh",
+)
+_TRANSACTIONS = ("Bán", "Cho thuê")
+_LOCATIONS = {
+    "Hồ Chí Minh": (
+        "Quận 1", "Quận 3", "Quận 7", "Quận 10", "Quận Bình Thạnh", "Quận Gò Vấp",
+        "Quận Phú Nhuận", "Quận Tân Bình", "Thành phố Thủ Đức", "Huyện Bình Chánh",
+        "Huyện Nhà Bè",
+    ),
+    "Hà Nội": (
+        "Quận Ba Đình", "Quận Hoàn Kiếm", "Quận Đống Đa", "Quận Cầu Giấy",
+        "Quận Thanh Xuân", "Quận Hà Đông", "Quận Long Biên",
+    ),
+    "Đà Nẵng": ("Quận Hải Châu", "Quận Sơn Trà", "Quận Ngũ Hành Sơn"),
+}
+_STREETS = (
+    "Nguyễn Văn Linh", "Lê Văn Sỹ", "Điện Biên Phủ", "Phan Xích Long", "Trường Chinh",
+    "Cách Mạng Tháng 8", "Võ Văn Kiệt", "Nguyễn Trãi", "Láng Hạ", "Kim Mã",
+    "Trần Phú", "Bạch Đằng", "Hoàng Văn Thụ", "Quang Trung", "Lê Lợi",
+)
+_LEGAL = ("Sổ hồng/ Sổ đỏ", "Sổ hồng riêng", "Hợp đồng mua bán", "Đang chờ sổ")
+_DIRECTIONS = ("Đông", "Tây", "Nam", "Bắc", "Đông Nam", "Tây Bắc")
+_DESCRIPTION = (
+    "Nhà thiết kế hiện đại, {bedrooms} phòng ngủ {bathrooms} WC, phòng khách rộng thoáng.",
+    "Vị trí đắc địa, gần chợ, trường học các cấp, bệnh viện và siêu thị.",
+    "Hẻm xe hơi {road}m thông thoáng, an ninh tốt, dân trí cao.",
+    "Pháp lý rõ ràng, {legal}, công chứng trong ngày, hỗ trợ vay ngân hàng 70%.",
+    "Phù hợp ở gia đình, kinh doanh, mở văn phòng hoặc cho thuê dòng tiền ổn định.",
+    "Khu dân cư đông đúc, tiện ích đầy đủ, cách trung tâm {minutes} phút di chuyển.",
+    "Nội thất cao cấp tặng kèm, chỉ việc xách vali vào ở.",
+    "Chủ cần tiền bán gấp, giá thương lượng cho khách thiện chí.",
+    "Mặt tiền ngang {width}m, dài {length}m, không lộ giới, không quy hoạch.",
+    "Gần công viên, hồ bơi, phòng gym, khu vui chơi trẻ em trong nội khu.",
+)
+_QUERY_TEMPLATES = (
+    "{transaction} {type} ở {district} giá dưới {budget} tỷ",
+    "Tìm {type} {district} {city} diện tích trên {area}m2",
+    "{type} {bedrooms} phòng ngủ tại {district}",
+    "{transaction} nhà hẻm xe hơi đường {street} {district}",
+    "Có {type} nào ở {city} hướng {direction} không?",
+)
+
+
+def _price(rng: random.Random, transaction: str, area: float) -> float:
+    if transaction == "Cho thuê":
+        return float(rng.randrange(5, 80) * 1_000_000)
+    return float(round(area * rng.uniform(30, 250), 1) * 1_000_000)
+
+
+def synthetic_listing(idx: int, seed: int = 0) -> Dict[str, Any]:
+    """Listing record number `idx`, identical for a given `seed`."""
+    rng = random.Random(seed * 1_000_003 + idx)
+    transaction = rng.choice(_TRANSACTIONS)
+    property_type = rng.choice(_PROPERTY_TYPES)
+    city = rng.choice(tuple(_LOCATIONS))
+    district = rng.choice(_LOCATIONS[city])
+    street = rng.choice(_STREETS)
+    width = rng.randrange(3, 12)
+    length = rng.randrange(10, 30)
+    area = float(width * length)
+    price = _price(rng, transaction, area)
+    legal = rng.choice(_LEGAL)
+    bedrooms = rng.randrange(1, 6)
+    address = f"Đường {street}, {district}, {city}"
+    title = f"{transaction} {property_type.lower()} {district} {area:.0f}m2, {bedrooms}PN"
+    fields = {
+        "bedrooms": bedrooms,
+        "bathrooms": max(1, bedrooms - 1),
+        "road": rng.randrange(3, 12),
+        "legal": legal,
+        "minutes": rng.randrange(5, 40),
+        "width": width,
+        "length": length,
+    }
+    description = " ".join(
+        sentence.format(**fields)
+        for sentence in rng.sample(_DESCRIPTION, rng.randrange(3, len(_DESCRIPTION)))
+    )
+    price_text = (
+        f"{price / 1e9:.2f} tỷ" if price >= 1e9 else f"{price / 1e6:.0f} triệu"
+    )
+    content = (
+        f"{title}.\n"
+        f"    Địa chỉ: {address}.\n"
+        f"    Diện tích: {area:.0f} m².\n"
+        f"    Giá: {price_text}.\n"
+        f"    Thông tin mô tả: {description}"
+    )
+    listing_id = str(10_000_000 + idx)
+    return {
+        "content": content,
+        "metadata": {
+            "url": f"https://bench.local/{listing_id}.html",
+            "price": price,
+            "area": area,
+            "address": address,
+            "type": property_type,
+            "transactionType": transaction,
+            "legal": legal,
+            "bedrooms": float(bedrooms),
+            "floors": float(rng.randrange(1, 6)),
+            "width": float(width),
+            "length": float(length),
+            "street_width": float(fields["road"]),
+            "direction": rng.choice(_DIRECTIONS),
+            "source": "bench",
+            "listing_id": listing_id,
+            "contact_name": f"Anh {rng.choice(('Hiếu', 'Nam', 'Tuấn', 'Lan', 'Mai'))}",
+            "contact_phone": f"09{rng.randrange(10_000_000, 99_999_999)}",
+        },
+    }
+
+
+def synthetic_queries(count: int, seed: int = 0) -> List[str]:
+    """User questions about the kinds of listings `synthetic_listing` makes."""
+    rng = random.Random(seed - 1)
+    queries = []
+    for _ in range(count):
+        city = rng.choice(tuple(_LOCATIONS))
+        queries.append(
+            rng.choice(_QUERY_TEMPLATES).format(
+                transaction=rng.choice(_TRANSACTIONS),
+                type=rng.choice(_PROPERTY_TYPES).lower(),
+                district=rng.choice(_LOCATIONS[city]),
+                city=city,
+                street=rng.choice(_STREETS),
+                budget=rng.randrange(2, 20),
+                area=rng.randrange(40, 200, 10),
+                bedrooms=rng.randrange(1, 5),
+                direction=rng.choice(_DIRECTIONS),
+            )
+        )
+    return queries
+
+
+def iter_listings(count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    for idx in range(count):
+        yield synthetic_listing(idx, seed)
+
+
+def write_records(path: Path, records: Iterator[Dict[str, Any]]) -> int:
+    """Write records as a JSON array, the format of the crawled feed."""
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for record in records:
+            if written:
+                f.write(",\n")
+            json.dump(record, f, ensure_ascii=False)
+            written += 1
+        f.write("\n]\n")
+    return written
+
+
+@dataclass
+class Fixture:
+    """A populated Chroma collection with the indexes the API reads next to it."""
+
+    chunks: int
+    dimension: int
+    seed: int
+    root: Path
+    collection_name: str = "rag-bench"
+
+    @property
+    def persist_dir(self) -> Path:
+        return self.root / "storage"
+
+    @property
+    def records_path(self) -> Path:
+        return self.root / "records.jsonl"
+
+    @property
+    def listing_store_path(self) -> Path:
+        return self.persist_dir / "listings.sqlite3"
+
+    @property
+    def lexical_index_path(self) -> Path:
+        return self.persist_dir / "lexical.idx"
+
+    @property
+    def attribute_index_path(self) -> Path:
+        return self.persist_dir / "attributes.npz"
+
+    @property
+    def vector_index_path(self) -> Path:
+        return self.persist_dir / "vectors.idx"
+
+    @property
+    def marker_path(self) -> Path:
+        return self.root / "fixture.json"
+
+    def is_built(self) -> bool:
+        return self.marker_path.exists()
+
+    def listing_keys(self, limit: int) -> List[str]:
+        """Listing keys of the first `limit` synthetic listings."""
+        from shared import listing_key
+
+        return [
+            listing_key(synthetic_listing(idx, self.seed)["metadata"], f"record-{idx}")
+            for idx in range(limit)
+        ]
+
+
+class _OfflineEmbedder:
+    """The `DocumentEmbedder` interface `StreamingIngestion` relies on."""
+
+    def __init__(self, embeddings: HashEmbeddings):
+        self.embeddings = embeddings
+
+
+def build_fixture(
+    root: Path,
+    chunks: int,
+    embeddings: HashEmbeddings,
+    seed: int = 0,
+    rebuild: bool = False,
+) -> Fixture:
+    """
+    Ingest synthetic listings until the collection holds at least `chunks`
+    chunks, through the production ingestion pipeline with `embeddings` in
+    place of Bedrock. Fixtures are kept under `root` and reused across runs.
+    """
+    from shared import ListingStoreWriter
+    from load_and_chunk import LoadAndChunk
+    from pipeline import StreamingIngestion
+
+    fixture = Fixture(
+        chunks=chunks,
+        dimension=embeddings.dimension,
+        seed=seed,
+        root=root / f"chunks-{chunks}-dim-{embeddings.dimension}-seed-{seed}",
+    )
+    if fixture.is_built() and not rebuild:
+        return fixture
+    fixture.persist_dir.mkdir(parents=True, exist_ok=True)
+
+    loader = LoadAndChunk()
+    total_chunks = 0
+    listings = 0
+    with open(fixture.records_path, "w", encoding="utf-8") as f:
+        while total_chunks < chunks:
+            record = synthetic_listing(listings, seed)
+            total_chunks += len(loader.chunk_record(listings, record))
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            listings += 1
+
+    listing_store = ListingStoreWriter(str(fixture.listing_store_path))
+    pipeline = StreamingIngestion(
+        loader=loader,
+        embedder=_OfflineEmbedder(embeddings),
+        collection_name=fixture.collection_name,
+        persist_directory=str(fixture.persist_dir),
+        listing_store=listing_store,
+        batch_size=256,
+        max_concurrency=4,
+        lexical_index_path=str(fixture.lexical_index_path),
+        attribute_index_path=str(fixture.attribute_index_path),
+        vector_index_path=str(fixture.vector_index_path),
+    )
+    stats = pipeline.run(str(fixture.records_path), restart=True, prune=False)
+    listing_store.close()
+    (fixture.persist_dir / ".ingest_version").touch()
+    fixture.marker_path.write_text(
+        json.dumps({"listings": listings, "chunks": total_chunks, "ingest": stats})
+    )
+    return fixture
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+def summarize(
+    stage: str,
+    latencies: Sequence[float],
+    elapsed: float,
+    errors: int = 0,
+    items: int | None = None,
+    error: str | None = None,
+    **params: Any,
+) -> Dict[str, Any]:
+    """
+    One benchmark result: latency percentiles in milliseconds and throughput
+    in operations (or `items`, e.g. chunks) per second.
+    """
+    latencies_ms = np.asarray(latencies, dtype=float) * 1000
+    ok = len(latencies_ms)
+    result: Dict[str, Any] = {
+        "stage": stage,
+        "params": params,
+        "operations": ok,
+        "errors": errors,
+        "first_error": error,
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": ok / elapsed if elapsed else 0.0,
+    }
+    if items is not None:
+        result["items"] = items
+        result["items_per_second"] = items / elapsed if elapsed else 0.0
+    if ok:
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        result.update(
+            p50_ms=float(p50),
+            p95_ms=float(p95),
+            p99_ms=float(p99),
+            mean_ms=float(latencies_ms.mean()),
+            max_ms=float(latencies_ms.max()),
+        )
+    return result
+
+
+def measure(
+    stage: str,
+    fn: Callable[[Any], Any],
+    inputs: Sequence[Any],
+    warmup: int = 3,
+    **params: Any,
+) -> Dict[str, Any]:
+    """Call `fn` once per input, one after the other."""
+    for item in inputs[:warmup]:
+        fn(item)
+    latencies: List[float] = []
+    errors = 0
+    first_error = None
+    started = time.perf_counter()
+    for item in inputs:
+        call_started = time.perf_counter()
+        try:
+            fn(item)
+        except Exception as e:
+            errors += 1
+            first_error = first_error or repr(e)
+            continue
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(
+        stage, latencies, time.perf_counter() - started, errors, error=first_error, **params
+    )
+
+
+async def measure_concurrent(
+    stage: str,
+    fn: Callable[[Any], Awaitable[Any]],
+    inputs: Sequence[Any],
+    concurrency: int,
+    warmup: int = 3,
+    **params: Any,
+) -> Dict[str, Any]:
+    """Await `fn` for every input with `concurrency` clients in flight."""
+    for item in inputs[:warmup]:
+        await fn(item)
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in inputs:
+        queue.put_nowait(item)
+    latencies: List[float] = []
+    errors = 0
+    first_error = None
+
+    async def client() -> None:
+        nonlocal errors, first_error
+        while not queue.empty():
+            item = queue.get_nowait()
+            call_started = time.perf_counter()
+            try:
+                await fn(item)
+            except Exception as e:
+                errors += 1
+                first_error = first_error or repr(e)
+                continue
+            latencies.append(time.perf_counter() - call_started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(
+        stage,
+        latencies,
+        time.perf_counter() - started,
+        errors,
+        error=first_error,
+        concurrency=concurrency,
+        **params,
+    )
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    header = (
+        f"{'stage':<34} {'params':<28} {'ops/s':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}"
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        params = ",".join(f"{key}={value}" for key, value in result["params"].items())
+        lines.append(
+            f"{result['stage']:<34} {params[:28]:<28} "
+            f"{result['throughput_per_second']:>9.1f} "
+            f"{result.get('p50_ms', float('nan')):>9.2f} "
+            f"{result.get('p95_ms', float('nan')):>9.2f} "
+            f"{result.get('p99_ms', float('nan')):>9.2f} "
+            f"{result['errors']:>6}"
+        )
+    return "\n".join(lines)
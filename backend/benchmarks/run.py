@@ -0,0 +1,501 @@
+"""
+Offline stage-level benchmarks of the RAG backend.
+
+Groq/Bedrock chat models are replaced by `ScriptedChatModel`, Titan by
+`HashEmbeddings`, and Chroma holds synthetic listings ingested through the
+production pipeline, so a run needs no network and no credentials.
+
+    cd backend
+    python benchmarks/run.py --sizes 10k,100k,1m --output results/baseline.json
+    python benchmarks/compare.py results/baseline.json results/candidate.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+INGEST_DIR = BACKEND_DIR.parent / "ingest_data"
+sys.path[1:1] = [str(BACKEND_DIR), str(INGEST_DIR)]
+
+from fakes import FakeRedis, HashEmbeddings, ScriptedChatModel  # noqa: E402
+from fixtures import (  # noqa: E402
+    Fixture,
+    build_fixture,
+    iter_listings,
+    synthetic_queries,
+    write_records,
+)
+from harness import format_table, measure, measure_concurrent, summarize  # noqa: E402
+
+SUITES = ("retrieval", "context", "parse", "history", "chunking", "e2e")
+
+
+def _count(value: str) -> int:
+    value = value.strip().lower()
+    for suffix, multiplier in (("k", 1_000), ("m", 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * multiplier)
+    return int(value)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline RAG backend benchmarks")
+    parser.add_argument(
+        "--suites", default=",".join(SUITES), help=f"Comma-separated, from {SUITES}"
+    )
+    parser.add_argument(
+        "--sizes", default="10k", help="Collection sizes in chunks, e.g. 10k,100k,1m"
+    )
+    parser.add_argument(
+        "--concurrency", default="1,8,32", help="Concurrent clients, comma-separated"
+    )
+    parser.add_argument("--requests", type=int, default=200, help="Requests per case")
+    parser.add_argument("--top-k", type=int, default=5, help="Listings per search")
+    parser.add_argument("--dimension", type=int, default=1024, help="Embedding size")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=10.0)
+    parser.add_argument(
+        "--output-mode", choices=("hydrate", "full"), default="hydrate",
+        help="RAG_OUTPUT_MODE of the pipeline",
+    )
+    parser.add_argument(
+        "--vector-backend", choices=("chroma", "mmap"), default="chroma",
+        help="VECTOR_BACKEND of the search",
+    )
+    parser.add_argument(
+        "--history-backend", choices=("sql", "redis"), default="sql",
+        help="Chat history store, redis runs against an in-process fake",
+    )
+    parser.add_argument("--history-sessions", type=int, default=50)
+    parser.add_argument("--history-length", type=int, default=20)
+    parser.add_argument("--chunk-records", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workdir",
+        default=str(BACKEND_DIR / "benchmarks" / ".work"),
+        help="Fixtures and scratch databases, reused across runs",
+    )
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild fixtures")
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Results file, defaults to <workdir>/results-<timestamp>.json",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Keep INFO logs")
+    return parser.parse_args()
+
+
+def _prepare_environment(args, workdir: Path) -> None:
+    """
+    Settings read when `src` is imported: no caches or request collapsing
+    that would turn repeated queries into hits, no per-user rate limit (all
+    requests come from one client), no background summarization, and a placeholder key
+    so the Groq provider is built (and then replaced by the scripted model).
+    Runs from `workdir` so `chat_history.db` and `.env` are the benchmark's.
+    """
+    os.chdir(workdir)
+    db_path = workdir / "chat_history.db"
+    for path in (db_path, Path(f"{db_path}-wal"), Path(f"{db_path}-shm")):
+        path.unlink(missing_ok=True)
+    os.environ.update(
+        {
+            "EMBEDDING_DIMENSION": str(args.dimension),
+            "EMBEDDING_CACHE_ENABLED": "false",
+            "SEMANTIC_CACHE_ENABLED": "false",
+            "SINGLE_FLIGHT_ENABLED": "false",
+            "USER_RATE_LIMIT_PER_SECOND": "0",
+            "BATCH_RATE_LIMIT_PER_SECOND": "0",
+            "CHAT_SUMMARY_ENABLED": "false",
+            "LLM_PROVIDERS": "groq",
+            "GROQ_API_KEY": "offline-benchmark",
+            "RAG_OUTPUT_MODE": args.output_mode,
+            "VECTOR_BACKEND": args.vector_backend,
+        }
+    )
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+
+def _use_fixture(fixture: Fixture) -> None:
+    """Point the API's vector store and index paths at `fixture`."""
+    from src.config.config import config
+
+    config.CHROMA_PERSIST_DIR = str(fixture.persist_dir)
+    config.CHROMA_COLLECTION_NAME = fixture.collection_name
+    config.CHROMA_VERSION_FILE = str(fixture.persist_dir / ".ingest_version")
+    config.LISTING_STORE_PATH = str(fixture.listing_store_path)
+    config.LEXICAL_INDEX_PATH = str(fixture.lexical_index_path)
+    config.ATTRIBUTE_INDEX_PATH = str(fixture.attribute_index_path)
+    config.VECTOR_INDEX_PATH = str(fixture.vector_index_path)
+
+
+def _install_fakes(args, embeddings: HashEmbeddings) -> None:
+    """
+    Every chat model the app builds is scripted, every embedding is local,
+    and a Redis chat history store talks to an in-process fake.
+    """
+    from src.constants.llm_factory import LLMFactory
+    from src.infra.embeddings.embeddings import embedding_service
+    from src.infra.listing_store.listing_store import ListingStore
+    from src.config.config import config
+
+    def lookup(ids: List[str]) -> List[Dict[str, Any]]:
+        store = ListingStore.open(config.LISTING_STORE_PATH)
+        if store is None:
+            return []
+        return [listing.model_dump(mode="json") for listing in store.hydrate(ids)]
+
+    model = ScriptedChatModel(
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.llm_jitter_ms,
+        max_results=args.top_k,
+        lookup=lookup,
+    )
+    LLMFactory.create_llm = staticmethod(lambda llm_provider, config: model)
+    embedding_service.embedding_model = embeddings
+    if args.history_backend == "redis":
+        from src.services.chat_history.chat_history import use_store
+        from src.services.chat_history.redis_store import RedisChatHistoryStore
+
+        use_store(
+            RedisChatHistoryStore(
+                FakeRedis(),
+                ttl_seconds=config.CHAT_HISTORY_TTL_SECONDS,
+                max_messages=config.CHAT_HISTORY_REDIS_MAX_MESSAGES,
+            )
+        )
+
+
+def bench_retrieval(args, fixtures: List[Fixture], queries: List[str]) -> List[dict]:
+    from src.infra.vector_stores.chroma_client import ChromaClientService
+
+    results = []
+    for fixture in fixtures:
+        _use_fixture(fixture)
+        service = ChromaClientService()
+        service.connect()
+        results.append(
+            measure(
+                "retrieve_vector",
+                lambda query: service.retrieve_vector(query, top_k=args.top_k),
+                queries,
+                chunks=fixture.chunks,
+            )
+        )
+        for concurrency in args.concurrency:
+            results.append(
+                asyncio.run(
+                    measure_concurrent(
+                        "aretrieve_vector",
+                        lambda query: service.aretrieve_vector(query, top_k=args.top_k),
+                        queries,
+                        concurrency,
+                        chunks=fixture.chunks,
+                    )
+                )
+            )
+    return results
+
+
+def bench_context(args, fixture: Fixture, queries: List[str]) -> List[dict]:
+    from langchain_core.messages import ToolMessage
+    from src.config.config import config
+    from src.infra.vector_stores.chroma_client import ChromaClientService
+    from src.services.rest_api import build_context
+
+    _use_fixture(fixture)
+    service = ChromaClientService()
+    # One search per question, and a follow-up search on every other one
+    tool_messages = [
+        ToolMessage(
+            content=service.retrieve_vector(query, top_k=args.top_k),
+            tool_call_id=f"call-{idx}",
+        )
+        for idx, query in enumerate(queries)
+    ]
+    inputs = [
+        tool_messages[idx : idx + (2 if idx % 2 else 1)]
+        for idx in range(len(tool_messages))
+    ]
+    return [
+        measure(
+            "build_context",
+            lambda messages: build_context(messages, config.RAG_CONTEXT_TOKEN_BUDGET),
+            inputs,
+            token_budget=config.RAG_CONTEXT_TOKEN_BUDGET,
+        )
+    ]
+
+
+def bench_parse(args, fixture: Fixture) -> List[dict]:
+    from src.infra.listing_store.listing_store import ListingStore
+    from src.services.rest_api import RestAPIGenService
+
+    _use_fixture(fixture)
+    store = ListingStore.open(str(fixture.listing_store_path))
+    keys = fixture.listing_keys(args.requests + args.top_k)
+    id_batches = [keys[idx : idx + args.top_k] for idx in range(args.requests)]
+    model = ScriptedChatModel()
+    results = []
+    for mode in ("hydrate", "full"):
+        service = RestAPIGenService(
+            llm_with_tools=model, tools={}, listing_store=store, output_mode=mode
+        )
+        outputs = []
+        for ids in id_batches:
+            if mode == "hydrate":
+                payload = {"response": "Có kết quả phù hợp.", "ids": ids}
+            else:
+                listings = [listing.model_dump(mode="json") for listing in store.hydrate(ids)]
+                payload = {"response": "Có kết quả phù hợp.", "result": listings}
+            outputs.append(json.dumps(payload, ensure_ascii=False))
+        results.append(
+            measure("rag_parse", service._parse_rag_output, outputs, output_mode=mode)
+        )
+    return results
+
+
+def bench_history(args) -> List[dict]:
+    from src.services.chat_history.chat_history import (
+        get_session_tail,
+        load_session_history,
+        load_session_tail,
+        save_message,
+        session_tail_cache,
+    )
+
+    sessions = [f"bench-session-{idx}" for idx in range(args.history_sessions)]
+    messages = [
+        (session, "human" if turn % 2 == 0 else "ai", f"Tin nhắn số {turn} của {session}")
+        for turn in range(args.history_length)
+        for session in sessions
+    ]
+    reads = [sessions[idx % len(sessions)] for idx in range(args.requests)]
+    return [
+        measure(
+            "save_message",
+            lambda message: save_message(*message),
+            messages,
+            warmup=0,
+            sessions=args.history_sessions,
+        ),
+        measure(
+            "load_session_history",
+            load_session_history,
+            reads,
+            messages_per_session=args.history_length,
+        ),
+        measure(
+            "load_session_tail",
+            lambda session: load_session_tail(session, session_tail_cache.tail),
+            reads,
+            messages_per_session=args.history_length,
+        ),
+        measure(
+            "get_session_tail",
+            get_session_tail,
+            reads,
+            messages_per_session=args.history_length,
+        ),
+    ]
+
+
+def bench_chunking(args, workdir: Path) -> List[dict]:
+    from load_and_chunk import LoadAndChunk
+
+    path = workdir / f"chunking-{args.chunk_records}-seed-{args.seed}.json"
+    if not path.exists():
+        write_records(path, iter_listings(args.chunk_records, args.seed))
+    latencies = []
+    chunks = 0
+    started = time.perf_counter()
+    for _ in range(5):
+        run_started = time.perf_counter()
+        # read_and_chunk reports progress on stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            chunks += len(LoadAndChunk().read_and_chunk(str(path)))
+        latencies.append(time.perf_counter() - run_started)
+    return [
+        summarize(
+            "read_and_chunk",
+            latencies,
+            time.perf_counter() - started,
+            items=chunks,
+            records=args.chunk_records,
+        )
+    ]
+
+
+async def bench_e2e(args, fixture: Fixture, queries: List[str]) -> List[dict]:
+    import httpx
+    from src.main import app
+    from src.services.application.rag import RagPipeline
+    from src.services.chat_history.writer import chat_history_writer
+
+    _use_fixture(fixture)
+    app.state.rag_service = RagPipeline()
+    chat_history_writer.start()
+    results = []
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+
+            async def ask(item: tuple[int, str]) -> None:
+                idx, question = item
+                response = await client.post(
+                    "/v1/rest-retrieve/",
+                    json={"user_input": question, "session_id": f"bench-e2e-{idx}"},
+                )
+                response.raise_for_status()
+
+            for concurrency in args.concurrency:
+                results.append(
+                    await measure_concurrent(
+                        "rest_retrieve",
+                        ask,
+                        list(enumerate(queries)),
+                        concurrency,
+                        chunks=fixture.chunks,
+                        llm_latency_ms=args.llm_latency_ms,
+                    )
+                )
+
+            # The same questions as one batch request, answered as NDJSON
+            answered = errors = 0
+            first_error = None
+            started = time.perf_counter()
+            async with client.stream(
+                "POST",
+                "/v1/rest-retrieve/batch",
+                json=[
+                    {"user_input": question, "session_id": f"bench-batch-{idx}"}
+                    for idx, question in enumerate(queries)
+                ],
+                timeout=None,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    answered += 1
+                    if "error" in (item := json.loads(line)):
+                        errors += 1
+                        first_error = first_error or item["error"]
+            elapsed = time.perf_counter() - started
+            results.append(
+                summarize(
+                    "rest_retrieve_batch",
+                    [elapsed],
+                    elapsed,
+                    errors,
+                    items=answered,
+                    error=first_error,
+                    chunks=fixture.chunks,
+                    llm_latency_ms=args.llm_latency_ms,
+                )
+            )
+    finally:
+        await chat_history_writer.stop()
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    args.sizes = [_count(size) for size in args.sizes.split(",")]
+    args.concurrency = [int(value) for value in args.concurrency.split(",")]
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        raise SystemExit(f"Unknown suites: {sorted(unknown)}")
+
+    workdir = Path(args.workdir).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    output = Path(args.output).resolve() if args.output else None
+    _prepare_environment(args, workdir)
+
+    embeddings = HashEmbeddings(
+        dimension=args.dimension, latency_ms=args.embed_latency_ms, seed=args.seed
+    )
+    # Fixtures are ingested without the simulated latency
+    fixture_embeddings = HashEmbeddings(dimension=args.dimension, seed=args.seed)
+    fixtures = []
+    if {"retrieval", "context", "parse", "e2e"} & set(suites):
+        for size in args.sizes:
+            print(f"Preparing fixture of {size} chunks")
+            fixtures.append(
+                build_fixture(
+                    workdir / "fixtures",
+                    size,
+                    fixture_embeddings,
+                    seed=args.seed,
+                    rebuild=args.rebuild,
+                )
+            )
+    _install_fakes(args, embeddings)
+    queries = synthetic_queries(args.requests, args.seed)
+
+    results: List[dict] = []
+    for suite in suites:
+        print(f"Running {suite}")
+        if suite == "retrieval":
+            results += bench_retrieval(args, fixtures, queries)
+        elif suite == "context":
+            results += bench_context(args, fixtures[0], queries)
+        elif suite == "parse":
+            results += bench_parse(args, fixtures[0])
+        elif suite == "history":
+            results += bench_history(args)
+        elif suite == "chunking":
+            results += bench_chunking(args, workdir)
+        elif suite == "e2e":
+            results += asyncio.run(bench_e2e(args, fixtures[0], queries))
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": {
+            key: value for key, value in vars(args).items() if key not in ("output",)
+        },
+        "results": results,
+    }
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = workdir / f"results-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(format_table(results))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
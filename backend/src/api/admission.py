@@ -0,0 +1,39 @@
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+
+from src.utils.admission import Overloaded, RateLimited, admission
+
+
+def _user_key(request: Request, user_id: str) -> str:
+    return user_id or (request.client.host if request.client else "anonymous")
+
+
+def admit(request: Request, user_id: str) -> None:
+    """
+    Turn a request away before it does any work: `RateLimited` when the
+    user is over their rate, `Overloaded` when a stage cannot queue it.
+    """
+    admission.check_rate(_user_key(request, user_id))
+    admission.check_capacity()
+
+
+def admit_batch(request: Request, user_id: str, questions: int) -> None:
+    """`admit` for a batch, charged to the user's batch quota instead."""
+    admission.check_batch_rate(_user_key(request, user_id), questions)
+    admission.check_capacity()
+
+
+async def rate_limited_handler(request: Request, exc: RateLimited) -> JSONResponse:
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def overloaded_handler(request: Request, exc: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
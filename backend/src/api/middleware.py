@@ -0,0 +1,49 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.utils.logger import LoggerConfig
+from src.utils.tracing import span, trace
+
+logger = LoggerConfig(__name__).get()
+
+_UNTRACED_PATHS = ("/health", "/ready", "/metrics")
+
+
+class TracingMiddleware:
+    """
+    Runs every request inside a trace so the stages it goes through are
+    timed into it. The trace id comes from the `X-Request-ID` header or is
+    generated, and is returned with a `Server-Timing` breakdown.
+
+    Plain ASGI rather than `BaseHTTPMiddleware`, so streamed response
+    bodies are still covered by the trace.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(_UNTRACED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1") or None
+        with trace(request_id) as current:
+
+            async def send_with_trace(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    extra = [(b"x-request-id", current.trace_id.encode("latin-1"))]
+                    timing = current.server_timing()
+                    if timing:
+                        extra.append((b"server-timing", timing.encode("latin-1")))
+                    message = {
+                        **message,
+                        "headers": list(message.get("headers", [])) + extra,
+                    }
+                await send(message)
+
+            try:
+                with span("request"):
+                    await self.app(scope, receive, send_with_trace)
+            finally:
+                logger.info(current.summary())
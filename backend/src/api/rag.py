@@ -1,6 +1,18 @@
-from fastapi import Request
-from src.services.application.rag import RagPipeline
+from typing import TYPE_CHECKING
 
+from fastapi import HTTPException, Request, status
 
-def get_rag_service(request: Request) -> RagPipeline:
-    return request.app.state.rag_service
+if TYPE_CHECKING:
+    from src.services.application.rag import RagPipeline
+
+
+def get_rag_service(request: Request) -> "RagPipeline":
+    rag_service = getattr(request.app.state, "rag_service", None)
+    # The pipeline is built in the background at startup
+    if rag_service is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service is starting up",
+            headers={"Retry-After": "5"},
+        )
+    return rag_service
@@ -1,29 +1,50 @@
+import json
 import uuid
+from typing import TYPE_CHECKING, Any, AsyncIterator
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 
+from src.api.admission import admit, admit_batch
 from src.api.rag import get_rag_service
+from src.config.config import config
+from src.schema.real_estate import RealEstate
 from src.schema.requests import UserInput
 from src.schema.response import Response
-from src.services.application.rag import RagPipeline
+from src.utils.logger import LoggerConfig
+
+# Imported by the lifespan instead, the pipeline pulls in every client library
+if TYPE_CHECKING:
+    from src.services.application.rag import RagPipeline
+
+logger = LoggerConfig(__name__).get()
 
 router = APIRouter()
 
 
+def _resolve_ids(input: UserInput) -> tuple[str, str]:
+    session_id = input.session_id or str(uuid.uuid4())
+    user_id = input.user_id or f"user_{str(uuid.uuid4().hex[:8])}"
+    return session_id, user_id
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.post(
     "/",
     status_code=status.HTTP_200_OK,
     response_model=Response,
 )
 async def rag_retrieve(
-    input: UserInput, rag_service: RagPipeline = Depends(get_rag_service)
+    input: UserInput,
+    request: Request,
+    rag_service: "RagPipeline" = Depends(get_rag_service),
 ):
-    print("*" * 50)
-    print(f"INFO: Session id: {input.session_id} && User id: {input.user_id}")
-    print("*" * 50)
-
-    session_id = input.session_id or str(uuid.uuid4())
-    user_id = input.user_id or f"user_{str(uuid.uuid4().hex[:8])}"
+    logger.info(f"Session id: {input.session_id}, user id: {input.user_id}")
+    admit(request, input.user_id)
+    session_id, user_id = _resolve_ids(input)
     response, results = await rag_service.get_response(
         question=input.user_input, session_id=session_id, user_id=user_id
     )
@@ -33,3 +54,107 @@ async def rag_retrieve(
         session_id=session_id,
         user_id=user_id,
     )
+
+
+@router.post("/stream", status_code=status.HTTP_200_OK)
+async def rag_retrieve_stream(
+    input: UserInput,
+    request: Request,
+    rag_service: "RagPipeline" = Depends(get_rag_service),
+):
+    """
+    Server-Sent Events variant of `rag_retrieve`.
+
+    Events:
+    - `meta`: `{session_id, user_id}`, sent immediately.
+    - `token`: `{delta}`, incremental text of the `response` field.
+    - `real_estate`: one `RealEstate` object, sent as soon as it is complete.
+    - `done`: `{response, session_id, user_id}`, the final answer.
+    - `error`: `{detail}`, generation failed.
+    """
+    admit(request, input.user_id)
+    session_id, user_id = _resolve_ids(input)
+
+    async def event_stream() -> AsyncIterator[str]:
+        yield _sse_event("meta", {"session_id": session_id, "user_id": user_id})
+        try:
+            async for kind, value in rag_service.get_response_stream(
+                question=input.user_input, session_id=session_id, user_id=user_id
+            ):
+                if kind == "token":
+                    yield _sse_event("token", {"delta": value})
+                elif kind == "real_estate" and isinstance(value, RealEstate):
+                    yield _sse_event("real_estate", value.model_dump(mode="json"))
+                elif kind == "answer":
+                    yield _sse_event(
+                        "done",
+                        {
+                            "response": value,
+                            "session_id": session_id,
+                            "user_id": user_id,
+                        },
+                    )
+        except Exception as e:
+            logger.error(f"Error while streaming response: {e}")
+            yield _sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK)
+async def rag_retrieve_batch(
+    inputs: list[UserInput],
+    request: Request,
+    rag_service: "RagPipeline" = Depends(get_rag_service),
+):
+    """
+    Answer many questions in one request, streamed as NDJSON in completion
+    order. The questions are searched together, then answered with bounded
+    concurrency.
+
+    One line per input: `{index, response, result, session_id, user_id}`,
+    or `{index, error, session_id, user_id}` when that question failed.
+    The questions are charged to the first item's user batch quota
+    (`BATCH_RATE_LIMIT_PER_SECOND`), not to the per-request rate limit.
+    """
+    if len(inputs) > config.RAG_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {config.RAG_BATCH_MAX_ITEMS} questions per batch",
+        )
+    admit_batch(request, inputs[0].user_id if inputs else "", len(inputs))
+    ids = [_resolve_ids(input) for input in inputs]
+    requests = [
+        (input.user_input, session_id, user_id)
+        for input, (session_id, user_id) in zip(inputs, ids)
+    ]
+
+    async def lines() -> AsyncIterator[str]:
+        async for index, outcome in rag_service.get_responses(requests):
+            session_id, user_id = ids[index]
+            if isinstance(outcome, Exception):
+                logger.error(f"Batch question {index} failed: {outcome}")
+                line = {
+                    "index": index,
+                    "error": str(outcome),
+                    "session_id": session_id,
+                    "user_id": user_id,
+                }
+            else:
+                response, results = outcome
+                line = {
+                    "index": index,
+                    **Response(
+                        response=response,
+                        result=results,
+                        session_id=session_id,
+                        user_id=user_id,
+                    ).model_dump(mode="json"),
+                }
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -33,11 +33,61 @@ class ConfigSingleton:
         self.BEDROCK_LLM_MODEL = env.get(
             "BEDROCK_LLM_MODEL", "meta.llama3-3-70b-instruct-v1:0"
         )
+        self.EMBEDDING_DIMENSION: int = int(env.get("EMBEDDING_DIMENSION", "1024"))
+
+        # Embedding cache (shared with the ingestion pipeline)
+        self.EMBEDDING_CACHE_ENABLED: bool = (
+            env.get("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+        )
+        self.EMBEDDING_CACHE_PATH: str = env.get(
+            "EMBEDDING_CACHE_PATH",
+            str(PROJECT_ROOT / "infra" / "embedding_cache" / "embeddings.sqlite3"),
+        )
+        self.EMBEDDING_CACHE_MAX_ITEMS: int = int(
+            env.get("EMBEDDING_CACHE_MAX_ITEMS", "10000")
+        )
+        # Micro-batching of concurrent query embeddings
+        self.EMBEDDING_BATCH_ENABLED: bool = (
+            env.get("EMBEDDING_BATCH_ENABLED", "true").lower() == "true"
+        )
+        self.EMBEDDING_BATCH_WINDOW_MS: float = float(
+            env.get("EMBEDDING_BATCH_WINDOW_MS", "5")
+        )
+        self.EMBEDDING_BATCH_MAX_SIZE: int = int(
+            env.get("EMBEDDING_BATCH_MAX_SIZE", "32")
+        )
 
         # GROQ
         self.GROQ_API_KEY = env.get("GROQ_API_KEY", "")
         self.GROQ_MODEL = env.get("GROQ_MODEL", "llama-3.3-70b-versatile")
 
+        # OpenAI (optional router provider)
+        self.OPENAI_API_KEY = env.get("OPENAI_API_KEY", "")
+        self.OPENAI_MODEL = env.get("OPENAI_MODEL", "gpt-4o-mini")
+
+        # LLM router: providers in preference order, hedging and circuit breaking
+        self.LLM_PROVIDERS: list[str] = [
+            p.strip().lower()
+            for p in env.get("LLM_PROVIDERS", "groq").split(",")
+            if p.strip()
+        ]
+        self.LLM_TIMEOUT_SECONDS: float = float(env.get("LLM_TIMEOUT_SECONDS", "30"))
+        self.LLM_MAX_RETRIES: int = int(env.get("LLM_MAX_RETRIES", "1"))
+        self.LLM_HEDGE_ENABLED: bool = (
+            env.get("LLM_HEDGE_ENABLED", "true").lower() == "true"
+        )
+        self.LLM_HEDGE_PERCENTILE: float = float(env.get("LLM_HEDGE_PERCENTILE", "95"))
+        self.LLM_HEDGE_MIN_DELAY_MS: float = float(
+            env.get("LLM_HEDGE_MIN_DELAY_MS", "300")
+        )
+        self.LLM_HEDGE_MAX_DELAY_MS: float = float(
+            env.get("LLM_HEDGE_MAX_DELAY_MS", "5000")
+        )
+        self.LLM_BREAKER_FAILURES: int = int(env.get("LLM_BREAKER_FAILURES", "5"))
+        self.LLM_BREAKER_COOLDOWN_SECONDS: float = float(
+            env.get("LLM_BREAKER_COOLDOWN_SECONDS", "30")
+        )
+
         # Vector Store
         self.DATASET_NAME: str = os.getenv(
             "DATASET_NAME", "goldog-ai"
@@ -46,6 +96,186 @@ class ConfigSingleton:
         self.CHROMA_PERSIST_DIR: str = str(
             PROJECT_ROOT / "infra" / "vector_stores" / "storage"
         )
+        # Listing records written by the ingestion pipeline, used to hydrate
+        # `RealEstate` results instead of having the LLM generate them
+        self.LISTING_STORE_PATH: str = env.get(
+            "LISTING_STORE_PATH",
+            str(Path(self.CHROMA_PERSIST_DIR) / "listings.sqlite3"),
+        )
+        # "hydrate": LLM returns listing ids only, "full": LLM returns every field
+        self.RAG_OUTPUT_MODE: str = env.get("RAG_OUTPUT_MODE", "hydrate").lower()
+        # Retrieved context sent to the generation LLM, in tokens
+        self.RAG_CONTEXT_TOKEN_BUDGET: int = int(
+            env.get("RAG_CONTEXT_TOKEN_BUDGET", "2000")
+        )
+        self.RAG_CONTEXT_DOC_MAX_TOKENS: int = int(
+            env.get("RAG_CONTEXT_DOC_MAX_TOKENS", "350")
+        )
+        # HuggingFace `tokenizer.json` of the generation model for exact token
+        # counts, estimated from the UTF-8 length when empty
+        self.TOKENIZER_PATH: str = env.get("TOKENIZER_PATH", "")
+
+        # Dedicated thread pool for embedding calls and vector search
+        self.RETRIEVAL_MAX_WORKERS: int = int(env.get("RETRIEVAL_MAX_WORKERS", "16"))
+        # Hybrid retrieval: BM25 index built by the ingestion pipeline, fused
+        # with vector search by reciprocal rank fusion
+        self.LEXICAL_INDEX_PATH: str = env.get(
+            "LEXICAL_INDEX_PATH", str(Path(self.CHROMA_PERSIST_DIR) / "lexical.idx")
+        )
+        # "hybrid" | "vector"
+        self.RETRIEVAL_MODE: str = env.get("RETRIEVAL_MODE", "hybrid").lower()
+        self.HYBRID_CANDIDATES: int = int(env.get("HYBRID_CANDIDATES", "20"))
+        self.RRF_K: int = int(env.get("RRF_K", "60"))
+        # Parent-listing layer: over-fetch chunks, group them by listing and
+        # diversify the listings with MMR
+        self.PARENT_COLLAPSE_ENABLED: bool = (
+            env.get("PARENT_COLLAPSE_ENABLED", "true").lower() == "true"
+        )
+        self.PARENT_OVERFETCH: int = int(env.get("PARENT_OVERFETCH", "5"))
+        self.PARENT_MAX_CHUNKS: int = int(env.get("PARENT_MAX_CHUNKS", "2"))
+        self.MMR_LAMBDA: float = float(env.get("MMR_LAMBDA", "0.7"))
+        # Price / area / location / type constraints parsed from the question
+        # are matched against a column index built by the ingestion pipeline
+        self.ATTRIBUTE_INDEX_PATH: str = env.get(
+            "ATTRIBUTE_INDEX_PATH",
+            str(Path(self.CHROMA_PERSIST_DIR) / "attributes.npz"),
+        )
+        self.ATTRIBUTE_FILTER_ENABLED: bool = (
+            env.get("ATTRIBUTE_FILTER_ENABLED", "true").lower() == "true"
+        )
+        # Larger candidate sets are post-filtered instead of sent to Chroma
+        self.ATTRIBUTE_PUSHDOWN_MAX: int = int(
+            env.get("ATTRIBUTE_PUSHDOWN_MAX", "2000")
+        )
+        # "chroma" | "mmap": search the memory-mapped export of the collection
+        # written by the ingestion pipeline, shared by every worker through
+        # the page cache, instead of each worker opening Chroma
+        self.VECTOR_BACKEND: str = env.get("VECTOR_BACKEND", "chroma").lower()
+        self.VECTOR_INDEX_PATH: str = env.get(
+            "VECTOR_INDEX_PATH", str(Path(self.CHROMA_PERSIST_DIR) / "vectors.idx")
+        )
+        # Inverted lists scanned per query by large (IVF) indexes
+        self.VECTOR_INDEX_NPROBE: int = int(env.get("VECTOR_INDEX_NPROBE", "32"))
+        # Touched by the ingestion pipeline after every (re-)ingestion
+        self.CHROMA_VERSION_FILE: str = str(
+            Path(self.CHROMA_PERSIST_DIR) / ".ingest_version"
+        )
+
+        # Tool routing: "llm" waits for the routing call before searching,
+        # "speculative" searches while the routing call runs, "classifier"
+        # also skips the routing call for clearly in-domain questions
+        self.ROUTING_MODE: str = env.get("ROUTING_MODE", "classifier").lower()
+
+        # Chat history store: "sql" (SQLAlchemy, a SQLite file per node by
+        # default) or "redis", shared by every node of a deployment
+        self.CHAT_HISTORY_BACKEND: str = env.get("CHAT_HISTORY_BACKEND", "sql").lower()
+        self.CHAT_HISTORY_DATABASE_URL: str = env.get(
+            "CHAT_HISTORY_DATABASE_URL", "sqlite:///chat_history.db"
+        )
+        self.REDIS_URL: str = env.get("REDIS_URL", "redis://localhost:6379/0")
+        self.CHAT_HISTORY_REDIS_PREFIX: str = env.get("CHAT_HISTORY_REDIS_PREFIX", "chat")
+        # Redis only: sessions expire this long after their last write (0 = never)
+        # and keep at most this many messages (0 = all)
+        self.CHAT_HISTORY_TTL_SECONDS: int = int(
+            env.get("CHAT_HISTORY_TTL_SECONDS", "2592000")
+        )
+        self.CHAT_HISTORY_REDIS_MAX_MESSAGES: int = int(
+            env.get("CHAT_HISTORY_REDIS_MAX_MESSAGES", "1000")
+        )
+
+        # Chat history write-behind
+        self.CHAT_HISTORY_BATCH_SIZE: int = int(
+            env.get("CHAT_HISTORY_BATCH_SIZE", "64")
+        )
+        self.CHAT_HISTORY_FLUSH_INTERVAL_MS: float = float(
+            env.get("CHAT_HISTORY_FLUSH_INTERVAL_MS", "50")
+        )
+
+        # Chat history fed to the generator: rolling summary + last N messages
+        self.CHAT_HISTORY_KEEP_LAST: int = int(env.get("CHAT_HISTORY_KEEP_LAST", "6"))
+        self.CHAT_HISTORY_TOKEN_BUDGET: int = int(
+            env.get("CHAT_HISTORY_TOKEN_BUDGET", "1500")
+        )
+        self.CHAT_SUMMARY_ENABLED: bool = (
+            env.get("CHAT_SUMMARY_ENABLED", "true").lower() == "true"
+        )
+        # Newest messages read per turn (the whole history without a summary),
+        # cached for recently active sessions and updated on every write (not
+        # cached with a store shared by several nodes: redis, a server database)
+        self.CHAT_HISTORY_TAIL_MESSAGES: int = int(
+            env.get("CHAT_HISTORY_TAIL_MESSAGES", "50")
+        )
+        self.CHAT_HISTORY_CACHE_SESSIONS: int = int(
+            env.get("CHAT_HISTORY_CACHE_SESSIONS", "10000")
+        )
+        self.CHAT_HISTORY_CACHE_TTL_SECONDS: float = float(
+            env.get("CHAT_HISTORY_CACHE_TTL_SECONDS", "30")
+        )
+
+        # Semantic answer cache
+        self.SEMANTIC_CACHE_ENABLED: bool = (
+            env.get("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        )
+        self.SEMANTIC_CACHE_THRESHOLD: float = float(
+            env.get("SEMANTIC_CACHE_THRESHOLD", "0.95")
+        )
+        self.SEMANTIC_CACHE_MAX_ENTRIES: int = int(
+            env.get("SEMANTIC_CACHE_MAX_ENTRIES", "50000")
+        )
+        self.SEMANTIC_CACHE_TTL_SECONDS: float = float(
+            env.get("SEMANTIC_CACHE_TTL_SECONDS", "3600")
+        )
+        self.SEMANTIC_CACHE_MAX_BYTES: int = int(
+            env.get("SEMANTIC_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+        )
+
+        # Identical history-free questions in flight at the same time are
+        # answered once
+        self.SINGLE_FLIGHT_ENABLED: bool = (
+            env.get("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+        )
+
+        # Admission control: concurrent calls per stage (0 = unlimited), calls
+        # waiting for a slot, and how long they may wait before a 503
+        self.ADMISSION_ROUTE_LLM_CONCURRENCY: int = int(
+            env.get("ADMISSION_ROUTE_LLM_CONCURRENCY", "32")
+        )
+        self.ADMISSION_RAG_LLM_CONCURRENCY: int = int(
+            env.get("ADMISSION_RAG_LLM_CONCURRENCY", "32")
+        )
+        self.ADMISSION_EMBED_CONCURRENCY: int = int(
+            env.get("ADMISSION_EMBED_CONCURRENCY", "64")
+        )
+        self.ADMISSION_MAX_QUEUE: int = int(env.get("ADMISSION_MAX_QUEUE", "256"))
+        self.ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(
+            env.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10")
+        )
+        self.ADMISSION_RETRY_AFTER_SECONDS: int = int(
+            env.get("ADMISSION_RETRY_AFTER_SECONDS", "2")
+        )
+        # Requests per second per user_id (client address when absent) with
+        # bursts up to USER_RATE_LIMIT_BURST, 0 disables
+        self.USER_RATE_LIMIT_PER_SECOND: float = float(
+            env.get("USER_RATE_LIMIT_PER_SECOND", "1")
+        )
+        self.USER_RATE_LIMIT_BURST: int = int(env.get("USER_RATE_LIMIT_BURST", "20"))
+
+        # Batch questions per second per user, a quota of their own: batches
+        # are admitted while it is not in debt, then pay for every question.
+        # 0 disables
+        self.BATCH_RATE_LIMIT_PER_SECOND: float = float(
+            env.get("BATCH_RATE_LIMIT_PER_SECOND", "10")
+        )
+        self.BATCH_RATE_LIMIT_BURST: int = int(env.get("BATCH_RATE_LIMIT_BURST", "1000"))
+
+        # Batch endpoint: questions per request, searched together per window,
+        # and answered with bounded concurrency
+        self.RAG_BATCH_MAX_ITEMS: int = int(env.get("RAG_BATCH_MAX_ITEMS", "1000"))
+        self.RAG_BATCH_WINDOW: int = int(env.get("RAG_BATCH_WINDOW", "32"))
+        self.RAG_BATCH_CONCURRENCY: int = int(env.get("RAG_BATCH_CONCURRENCY", "8"))
+
+        # Startup: warm indexes, tokenizer and clients before reporting ready
+        self.WARMUP_ENABLED: bool = env.get("WARMUP_ENABLED", "true").lower() == "true"
 
 
 config = ConfigSingleton()
@@ -37,10 +37,21 @@ class LLMFactory:
                 kwargs["max_tokens"] = config["max_completion_tokens"]
             if "temperature" in config:
                 kwargs["temperature"] = config["temperature"]
+            # `ChatBedrockConverse` has no retry or timeout fields, unknown
+            # kwargs end up in the request body, so they go to the boto client
+            client_config = {}
             if "max_retries" in config:
-                kwargs["max_retries"] = config["max_retries"]
+                client_config["retries"] = {
+                    "max_attempts": config["max_retries"],
+                    "mode": "standard",
+                }
             if "timeout" in config:
-                kwargs["timeout"] = config["timeout"]
+                client_config["read_timeout"] = config["timeout"]
+                client_config["connect_timeout"] = config["timeout"]
+            if client_config:
+                from botocore.config import Config as BotoConfig
+
+                kwargs["config"] = BotoConfig(**client_config)
 
             return ChatBedrockConverse(**kwargs)
 
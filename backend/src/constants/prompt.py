@@ -113,6 +113,41 @@ RAG_STRUCTURED_SUFFIX = """
 """.strip()
 
 
+RAG_HYDRATE_SUFFIX = """
+        ### OUTPUT FORMAT (MANDATORY) ###
+
+        You MUST answer strictly in JSON format.
+        Your response must be a valid JSON string starting with { and ending with }.
+        Do NOT generate any conversational text, introductory phrases, or markdown formatting (```json) around the JSON.
+        CRITICAL: The output must contain ONLY the JSON string. Any text before or after the JSON block will cause a system error.
+
+        Structure:
+        {
+          "response": "<A brief summary of the finding (e.g., 'I found 2 matching properties...'). Do NOT repeat the full details of the properties here, they are attached by the system.>",
+          "ids": ["<LISTING KEY of a matching property>", "..."]
+        }
+
+        Important rules:
+        - Each id MUST be copied exactly from the `id:` field of a listing in the `CONTEXT`.
+        - Order the ids from most to least relevant and list each property only once.
+        - Do NOT output any other property fields (title, price, address, images, ...).
+        - If there is no matching real estate, return an empty list for "ids".
+        - The output MUST be raw JSON. Do NOT wrap it in markdown code blocks.
+""".strip()
+
+
+SUMMARY_TEXT = """
+        You maintain a running summary of a conversation between a user and a real-estate AI assistant.
+
+        Update the EXISTING SUMMARY with the NEW MESSAGES. Keep the user's goals, constraints (budget, location, area, property type) and any listings that were discussed. Drop small talk.
+        Write at most 4 sentences, in the same language as the conversation. Output ONLY the updated summary.
+
+        **EXISTING SUMMARY:** {summary}
+        **NEW MESSAGES:**
+        {messages}
+""".strip()
+
+
 temp_userinput = ChatPromptTemplate(
     [
         ("system", USERINPUT_TEXT),
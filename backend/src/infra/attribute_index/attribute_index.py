@@ -0,0 +1,234 @@
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.infra.lexical_index.lexical_index import fold_diacritics
+
+RANGE_COLUMNS = ("price", "area")
+CATEGORY_COLUMNS = ("district", "city", "property_type", "transaction_type")
+
+# Folded district names of the major cities, numbered districts ("quan 7")
+# are matched by `_NUMBERED_DISTRICT_RE`
+_DISTRICT_NAMES = (
+    # Ho Chi Minh City
+    "binh thanh", "go vap", "phu nhuan", "tan binh", "tan phu", "binh tan",
+    "thu duc", "binh chanh", "hoc mon", "cu chi", "nha be", "can gio",
+    # Ha Noi
+    "ba dinh", "hoan kiem", "hai ba trung", "dong da", "cau giay", "thanh xuan",
+    "hoang mai", "long bien", "tay ho", "nam tu liem", "bac tu liem", "ha dong",
+    # Da Nang
+    "hai chau", "thanh khe", "son tra", "ngu hanh son", "lien chieu", "cam le",
+    "hoa vang",
+)
+_NUMBERED_DISTRICT_RE = re.compile(r"\b(?:quan|q)\s*\.?\s*(\d{1,2})\b")
+_DISTRICT_NAME_RE = re.compile(
+    r"\b(" + "|".join(sorted(_DISTRICT_NAMES, key=len, reverse=True)) + r")\b"
+)
+_CITY_ALIASES = {
+    "ho chi minh": ("ho chi minh", "tphcm", "tp hcm", "hcm", "sai gon", "saigon"),
+    "ha noi": ("ha noi", "hanoi"),
+    "da nang": ("da nang",),
+}
+_CITY_RE = re.compile(
+    r"\b("
+    + "|".join(
+        sorted(
+            (re.escape(alias) for aliases in _CITY_ALIASES.values() for alias in aliases),
+            key=len,
+            reverse=True,
+        )
+    )
+    + r")\b"
+)
+_CITY_BY_ALIAS = {
+    alias: city for city, aliases in _CITY_ALIASES.items() for alias in aliases
+}
+# Matched before folding diacritics: folded, "bạn" ("you") reads as "ban" ("sale").
+# An unaccented "ban" is still taken for "bán".
+_TRANSACTION_RE = re.compile(r"\b(cho\s+thuê|cho\s+thue|thuê|thue)\b|\b(?:bán|ban)\b")
+_UNIT_MULTIPLIERS = (("ty", 1e9), ("trieu", 1e6), ("nghin", 1e3), ("ngan", 1e3))
+
+
+def extract_districts(text: str) -> List[str]:
+    """Canonical districts in `text`, in order: "Q.7, Bình Thạnh" -> ["quan 7", "binh thanh"]."""
+    folded = fold_diacritics(text)
+    found = [
+        (m.start(), f"quan {int(m.group(1))}")
+        for m in _NUMBERED_DISTRICT_RE.finditer(folded)
+    ]
+    found += [(m.start(), m.group(1)) for m in _DISTRICT_NAME_RE.finditer(folded)]
+    return list(dict.fromkeys(name for _, name in sorted(found)))
+
+
+def extract_cities(text: str) -> List[str]:
+    folded = fold_diacritics(text)
+    return list(
+        dict.fromkeys(_CITY_BY_ALIAS[m.group(1)] for m in _CITY_RE.finditer(folded))
+    )
+
+
+def transaction_type(text: str) -> Optional[str]:
+    """"ban" or "cho thue", whichever the text mentions first."""
+    lowered = unicodedata.normalize("NFC", text).lower()
+    match = _TRANSACTION_RE.search(lowered)
+    if match is None:
+        return None
+    return "cho thue" if match.group(1) else "ban"
+
+
+def normalize_price(
+    price: Any, unit: Optional[str] = None, area: Any = None
+) -> Optional[float]:
+    """Total price in VND. `unit` may be a scale ("tỷ", "triệu") and/or per m²."""
+    try:
+        value = float(price)
+    except (TypeError, ValueError):
+        return None
+    if not unit:
+        return value
+    folded = fold_diacritics(unit)
+    for word, multiplier in _UNIT_MULTIPLIERS:
+        if word in folded:
+            value *= multiplier
+            break
+    if "m2" in folded or "m²" in unit:
+        try:
+            value *= float(area)
+        except (TypeError, ValueError):
+            return None
+    return value
+
+
+def listing_attributes(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values of one listing record from the listing store."""
+    metadata = record.get("metadata") or {}
+    title = record.get("title") or ""
+    address = str(metadata.get("address") or "")
+    # Newer addresses omit the district, the title usually names it
+    districts = extract_districts(address) or extract_districts(title)
+    cities = extract_cities(address.split(",")[-1]) if address else []
+    area = metadata.get("area")
+    return {
+        "price": normalize_price(metadata.get("price"), metadata.get("priceUnit"), area),
+        "area": float(area) if isinstance(area, (int, float)) else None,
+        "district": districts[0] if districts else None,
+        "city": cities[0] if cities else None,
+        "property_type": fold_diacritics(str(metadata.get("type") or "")).strip() or None,
+        "transaction_type": (
+            fold_diacritics(str(metadata["transactionType"]))
+            if metadata.get("transactionType")
+            else transaction_type(title)
+        ),
+    }
+
+
+def build_index(records: Iterable[Tuple[str, Dict[str, Any]]], path: str) -> int:
+    """
+    Write the column arrays of `(listing_key, record)` pairs to `path`,
+    atomically. Range columns are stored with their sort order, category
+    columns as int16 codes into a per-column vocabulary.
+    """
+    keys: List[str] = []
+    rows: Dict[str, List[Any]] = {column: [] for column in RANGE_COLUMNS + CATEGORY_COLUMNS}
+    for key, record in records:
+        keys.append(key)
+        for column, value in listing_attributes(record).items():
+            rows[column].append(value)
+
+    arrays: Dict[str, np.ndarray] = {"keys": np.asarray(keys, dtype=str)}
+    for column in RANGE_COLUMNS:
+        values = np.asarray(
+            [np.nan if v is None else v for v in rows[column]], dtype=np.float64
+        )
+        order = np.argsort(values, kind="stable").astype(np.int32)
+        arrays[f"{column}_order"] = order
+        arrays[f"{column}_sorted"] = values[order]
+    for column in CATEGORY_COLUMNS:
+        vocab = sorted({v for v in rows[column] if v})
+        codes = {value: code for code, value in enumerate(vocab)}
+        arrays[column] = np.asarray(
+            [codes.get(v, -1) for v in rows[column]], dtype=np.int16
+        )
+        arrays[f"{column}_vocab"] = np.asarray(vocab, dtype=str)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+class AttributeIndex:
+    """
+    Structured attribute filter over every listing. Range constraints are two
+    binary searches over a sorted column, category constraints a code lookup,
+    so matching runs in microseconds instead of scanning chunk metadata.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with np.load(path) as data:
+            self._arrays = {name: data[name] for name in data.files}
+        self.keys: np.ndarray = self._arrays["keys"]
+        # NaNs sort last and never match a range
+        self._n_valid = {
+            column: int((~np.isnan(self._arrays[f"{column}_sorted"])).sum())
+            for column in RANGE_COLUMNS
+        }
+
+    @classmethod
+    def open(cls, path: str) -> Optional["AttributeIndex"]:
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _range_mask(
+        self, column: str, low: Optional[float], high: Optional[float]
+    ) -> np.ndarray:
+        values = self._arrays[f"{column}_sorted"][: self._n_valid[column]]
+        start = 0 if low is None else np.searchsorted(values, low, "left")
+        end = len(values) if high is None else np.searchsorted(values, high, "right")
+        mask = np.zeros(len(self.keys), dtype=bool)
+        mask[self._arrays[f"{column}_order"][start:end]] = True
+        return mask
+
+    def _category_mask(self, column: str, values: Sequence[str]) -> np.ndarray:
+        """Rows whose value contains any of `values` (e.g. "nha" matches "nha mat tien")."""
+        vocab = self._arrays[f"{column}_vocab"]
+        codes = [
+            code
+            for code, name in enumerate(vocab)
+            if any(name == value or f" {value} " in f" {name} " for value in values)
+        ]
+        return np.isin(self._arrays[column], codes)
+
+    def match(
+        self,
+        price: Tuple[Optional[float], Optional[float]] = (None, None),
+        area: Tuple[Optional[float], Optional[float]] = (None, None),
+        **categories: Sequence[str],
+    ) -> Optional[np.ndarray]:
+        """Row indices matching every given constraint, None if none is given."""
+        mask: Optional[np.ndarray] = None
+        for column, (low, high) in (("price", price), ("area", area)):
+            if low is None and high is None:
+                continue
+            column_mask = self._range_mask(column, low, high)
+            mask = column_mask if mask is None else mask & column_mask
+        for column, values in categories.items():
+            if column not in CATEGORY_COLUMNS or not values:
+                continue
+            column_mask = self._category_mask(column, values)
+            mask = column_mask if mask is None else mask & column_mask
+        return None if mask is None else np.flatnonzero(mask)
+
+    def candidate_keys(self, **constraints: Any) -> Optional[List[str]]:
+        """Listing keys matching the constraints, None if none is given."""
+        rows = self.match(**constraints)
+        return None if rows is None else self.keys[rows].tolist()
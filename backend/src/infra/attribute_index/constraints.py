@@ -0,0 +1,177 @@
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.infra.attribute_index.attribute_index import (
+    extract_cities,
+    extract_districts,
+    transaction_type,
+)
+from src.infra.lexical_index.lexical_index import fold_diacritics
+
+_NUM = r"(\d+(?:[.,]\d+)?)"
+_UNIT = r"(ty|trieu|tr|m2|m²|met vuong)\b"
+_UNITS = {
+    "ty": ("price", 1e9),
+    "trieu": ("price", 1e6),
+    "tr": ("price", 1e6),
+    "m2": ("area", 1.0),
+    "m²": ("area", 1.0),
+    "met vuong": ("area", 1.0),
+}
+_MAX_WORDS = r"duoi|khong qua|toi da|nho hon|it hon|re hon|max|<=?"
+_MIN_WORDS = r"tren|hon|lon hon|toi thieu|it nhat|min|>=?"
+_APPROX_WORDS = r"khoang|tam|gan|xap xi|~"
+
+# "từ 2 đến 3 tỷ", "2-3 tỷ", "50 đến 80m2"
+_RANGE_RE = re.compile(
+    rf"(?:\btu\s+)?{_NUM}\s*(?:{_UNIT})?\s*(?:-|\bden\b|\btoi\b)\s*{_NUM}\s*{_UNIT}"
+)
+# "dưới 3 tỷ", "trên 70m2", "khoảng 5 tỷ", "3 tỷ 5 trở xuống"
+_BOUND_RE = re.compile(
+    rf"(?:\b({_MAX_WORDS}|{_MIN_WORDS}|{_APPROX_WORDS})\s*)?{_NUM}\s*{_UNIT}"
+    r"(?:\s*(\d{1,3})\b(?!\s*(?:ty|trieu|tr|m2|m²)\b))?"
+    r"(?:\s*(tro xuong|tro lai|do lai|tro len))?"
+)
+_APPROX_TOLERANCE = 0.2
+
+# Query keyword -> words of the folded `type` values it selects
+_PROPERTY_TYPES = (
+    (r"can ho|chung cu|condotel|officetel", ("can ho", "chung cu")),
+    (r"biet thu|villa", ("biet thu",)),
+    (r"mat tien|mat pho", ("mat tien",)),
+    (r"\bhem\b|\bkiet\b", ("hem", "ngo", "kiet")),
+    # "nhà đất" is the generic word for real estate
+    (r"dat nen|tho cu|lo dat|(?<!nha )\bdat\b", ("dat",)),
+    (r"van phong", ("van phong",)),
+    (r"phong tro|nha tro", ("phong tro", "nha tro")),
+    (r"kho xuong|nha xuong|\bkho\b", ("kho", "xuong")),
+)
+
+
+@dataclass
+class Constraints:
+    """Structured constraints extracted from a question."""
+
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    area_min: Optional[float] = None
+    area_max: Optional[float] = None
+    districts: List[str] = field(default_factory=list)
+    cities: List[str] = field(default_factory=list)
+    property_types: List[str] = field(default_factory=list)
+    transaction_type: Optional[str] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not any(
+            (
+                self.price_min is not None,
+                self.price_max is not None,
+                self.area_min is not None,
+                self.area_max is not None,
+                self.districts,
+                self.cities,
+                self.property_types,
+                self.transaction_type,
+            )
+        )
+
+    @property
+    def names_listing(self) -> bool:
+        """
+        Whether the constraints describe listings: a price, area, district or
+        property type. A transaction type or a city alone shows up in
+        questions about anything ("bạn", "thời tiết Hà Nội").
+        """
+        return any(
+            (
+                self.price_min is not None,
+                self.price_max is not None,
+                self.area_min is not None,
+                self.area_max is not None,
+                self.districts,
+                self.property_types,
+            )
+        )
+
+    def to_filters(self) -> Dict[str, Any]:
+        """Keyword arguments of `AttributeIndex.match`."""
+        return {
+            "price": (self.price_min, self.price_max),
+            "area": (self.area_min, self.area_max),
+            "district": self.districts,
+            "city": self.cities,
+            "property_type": self.property_types,
+            "transaction_type": (
+                [self.transaction_type] if self.transaction_type else []
+            ),
+        }
+
+
+def _number(raw: str) -> float:
+    return float(raw.replace(",", "."))
+
+
+def _set_bounds(
+    constraints: Constraints, column: str, low: Optional[float], high: Optional[float]
+) -> None:
+    if low is not None:
+        setattr(constraints, f"{column}_min", low)
+    if high is not None:
+        setattr(constraints, f"{column}_max", high)
+
+
+def parse_constraints(question: str) -> Constraints:
+    """
+    Rule-based extraction of price, area, location, property type and
+    transaction type, e.g. "nhà dưới 3 tỷ, trên 70m2, quận 7, bán" ->
+    price_max=3e9, area_min=70, districts=["quan 7"], transaction_type="ban".
+    """
+    constraints = Constraints()
+    text = fold_diacritics(question)
+
+    for match in _RANGE_RE.finditer(text):
+        low, low_unit, high, high_unit = match.groups()
+        column, multiplier = _UNITS[high_unit]
+        low_multiplier = _UNITS[low_unit][1] if low_unit else multiplier
+        low = _number(low) * low_multiplier
+        _set_bounds(constraints, column, low, _number(high) * multiplier)
+    text = _RANGE_RE.sub(" ", text)
+
+    for match in _BOUND_RE.finditer(text):
+        word, raw, unit, fraction, suffix = match.groups()
+        column, multiplier = _UNITS[unit]
+        value = _number(raw)
+        if fraction and column == "price":
+            # "3 tỷ 5" is 3.5 tỷ
+            value += int(fraction) / 10 ** len(fraction)
+        value *= multiplier
+        if (word and re.fullmatch(_MAX_WORDS, word)) or suffix in (
+            "tro xuong",
+            "tro lai",
+            "do lai",
+        ):
+            _set_bounds(constraints, column, None, value)
+        elif (word and re.fullmatch(_MIN_WORDS, word)) or suffix == "tro len":
+            _set_bounds(constraints, column, value, None)
+        else:
+            _set_bounds(
+                constraints,
+                column,
+                value * (1 - _APPROX_TOLERANCE),
+                value * (1 + _APPROX_TOLERANCE),
+            )
+
+    constraints.districts = extract_districts(question)
+    constraints.cities = extract_cities(question)
+    for pattern, types in _PROPERTY_TYPES:
+        if re.search(pattern, text):
+            constraints.property_types.extend(types)
+    # Unfolded, "mùa" ("season") folds to "mua" ("buy")
+    lowered = unicodedata.normalize("NFC", question).lower()
+    constraints.transaction_type = transaction_type(question) or (
+        "ban" if re.search(r"\bmua\b", lowered) else None
+    )
+    return constraints
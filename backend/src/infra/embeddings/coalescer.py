@@ -0,0 +1,94 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.utils.logger import LoggerConfig
+
+logger = LoggerConfig(__name__).get()
+
+BatchFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingCoalescer:
+    """
+    Micro-batcher for concurrent query embeddings.
+
+    Texts submitted within `window_ms` of the first pending one, or until
+    `max_batch` distinct texts are pending, are embedded by one `batch_fn`
+    call and each vector is handed back to its waiters. Identical texts in a
+    window are embedded once.
+    """
+
+    def __init__(self, batch_fn: BatchFn, window_ms: float = 5.0, max_batch: int = 32):
+        self.batch_fn = batch_fn
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        # text -> [(future, submitted_at)]
+        self._pending: Dict[str, List[Tuple[asyncio.Future, float]]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.unique_items = 0
+        self.max_batch_size = 0
+        self.total_wait_seconds = 0.0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(text, []).append((future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        self.batches += 1
+        self.unique_items += len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        for waiters in batch.values():
+            self.items += len(waiters)
+            self.total_wait_seconds += sum(now - submitted for _, submitted in waiters)
+
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[str, List[Tuple[asyncio.Future, float]]]) -> None:
+        texts = list(batch)
+        try:
+            vectors = await self.batch_fn(texts)
+        except Exception as e:
+            logger.error(f"Batched embedding of {len(texts)} texts failed: {e}")
+            for waiters in batch.values():
+                for future, _ in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for text, vector in zip(texts, vectors):
+            for future, _ in batch[text]:
+                # Waiters may have been cancelled meanwhile
+                if not future.done():
+                    future.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "deduplicated": self.items - self.unique_items,
+            "avg_batch_size": self.unique_items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_wait_ms": (
+                1000 * self.total_wait_seconds / self.items if self.items else 0.0
+            ),
+        }
@@ -0,0 +1,198 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model_id TEXT NOT NULL,
+    dimension INTEGER NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (model_id, dimension, text_hash)
+) WITHOUT ROWID
+"""
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LRUEmbeddingCache:
+    """Bounded in-process LRU of float32 vectors keyed by text hash."""
+
+    def __init__(self, max_items: int = 10000):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._items.get(key)
+            if vector is not None:
+                self._items.move_to_end(key)
+            return vector
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._items[key] = vector
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQLiteEmbeddingStore:
+    """
+    Persistent embedding store keyed by (model_id, dimension, sha256(text)).
+
+    Vectors are stored as raw float32 blobs. The database runs in WAL mode so
+    the API workers and the ingestion pipeline can share one file.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def get_many(
+        self, model_id: str, dimension: int, hashes: List[str]
+    ) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(hashes), _SQLITE_BATCH):
+                batch = hashes[start : start + _SQLITE_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model_id = ? AND dimension = ? AND text_hash IN ({placeholders})",
+                    (model_id, dimension, *batch),
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(
+        self, model_id: str, dimension: int, items: Iterable[tuple[str, np.ndarray]]
+    ) -> None:
+        rows = [
+            (model_id, dimension, key, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model_id, dimension, text_hash, vector) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an in-memory LRU in front of a persistent store.
+    Only texts missing from both tiers are sent to the wrapped model, and
+    duplicated texts within a batch are embedded once.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_id: str,
+        dimension: int,
+        memory_cache: Optional[LRUEmbeddingCache] = None,
+        store: Optional[SQLiteEmbeddingStore] = None,
+    ):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.dimension = dimension
+        self.memory_cache = (
+            memory_cache if memory_cache is not None else LRUEmbeddingCache()
+        )
+        self.store = store
+
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        pending: List[str] = []
+        for key in hashes:
+            vector = self.memory_cache.get(key)
+            if vector is not None:
+                found[key] = vector
+                self.memory_hits += 1
+            else:
+                pending.append(key)
+
+        if pending and self.store is not None:
+            stored = self.store.get_many(self.model_id, self.dimension, pending)
+            for key, vector in stored.items():
+                self.memory_cache.put(key, vector)
+                found[key] = vector
+            self.store_hits += len(stored)
+        return found
+
+    def _remember(self, items: List[tuple[str, np.ndarray]]) -> None:
+        for key, vector in items:
+            self.memory_cache.put(key, vector)
+        if self.store is not None:
+            self.store.put_many(self.model_id, self.dimension, items)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_hash(text)
+        found = self._lookup([key])
+        if key in found:
+            return found[key].tolist()
+
+        self.misses += 1
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        self._remember([(key, vector)])
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(hashes)))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(hashes, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            self.misses += len(missing)
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = [
+                (key, np.asarray(vector, dtype=np.float32))
+                for key, vector in zip(missing.keys(), vectors)
+            ]
+            self._remember(new_items)
+            found.update(new_items)
+
+        return [found[key].tolist() for key in hashes]
+
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "memory_items": len(self.memory_cache),
+        }
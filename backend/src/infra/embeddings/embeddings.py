@@ -1,23 +1,134 @@
+import asyncio
+import threading
 from langchain.embeddings.base import Embeddings
-from langchain_aws import BedrockEmbeddings
-from typing import List
+from typing import List, Optional
+from src.config.config import config
+from src.utils.admission import admission
+from src.utils.executor import retrieval_executor
+from src.infra.embeddings.coalescer import EmbeddingCoalescer
+from src.infra.embeddings.embedding_cache import (
+    CachedEmbeddings,
+    LRUEmbeddingCache,
+    SQLiteEmbeddingStore,
+)
 
 
 class EmbeddingService(Embeddings):
+    """
+    Titan embeddings behind the embedding cache. The Bedrock client is built
+    on first use (or by `warm_up`), not when the module is imported.
+    """
+
     def __init__(
-        self, model_id="amazon.titan-embed-text-v2:0", region_name="us-east-1"
+        self,
+        model_id="amazon.titan-embed-text-v2:0",
+        region_name="us-east-1",
+        dimension: int = 1024,
+        use_cache: bool = True,
+        coalesce: bool = False,
     ):
-        self.embedding_model = BedrockEmbeddings(
-            model_id=model_id, region_name=region_name
+        self.model_id = model_id
+        self.region_name = region_name
+        self.dimension = dimension
+        self.use_cache = use_cache
+        self.embedding_model: Optional[Embeddings] = None
+        self._model_lock = threading.Lock()
+        # Concurrent `aembed_query` calls are collected into micro-batches
+        self.coalescer = (
+            EmbeddingCoalescer(
+                self._embed_query_batch,
+                window_ms=config.EMBEDDING_BATCH_WINDOW_MS,
+                max_batch=config.EMBEDDING_BATCH_MAX_SIZE,
+            )
+            if coalesce
+            else None
         )
 
+    def _model(self) -> Embeddings:
+        if self.embedding_model is None:
+            with self._model_lock:
+                if self.embedding_model is None:
+                    from langchain_aws import BedrockEmbeddings
+
+                    model = BedrockEmbeddings(
+                        model_id=self.model_id, region_name=self.region_name
+                    )
+                    if self.use_cache:
+                        model = CachedEmbeddings(
+                            model,
+                            model_id=self.model_id,
+                            dimension=self.dimension,
+                            memory_cache=LRUEmbeddingCache(
+                                config.EMBEDDING_CACHE_MAX_ITEMS
+                            ),
+                            store=SQLiteEmbeddingStore(config.EMBEDDING_CACHE_PATH),
+                        )
+                    self.embedding_model = model
+        return self.embedding_model
+
+    def warm_up(self) -> None:
+        """
+        Build the Bedrock client and open its connection pool with one
+        request, bypassing the cache so the request is actually sent.
+        """
+        model = self._model()
+        getattr(model, "embeddings", model).embed_query("warm-up")
+
     def embed_query(self, text: str) -> List[float]:
         """Embed a single text (normalized vector) and return as list."""
-        return self.embedding_model.embed_query(text)
+        return self._model().embed_query(text)
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed a list of texts (normalized vector) and return as list of lists."""
-        return self.embedding_model.embed_documents(texts)
+        return self._model().embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a single text on the dedicated retrieval thread pool."""
+        async with admission.stage("embed"):
+            if self.coalescer is not None:
+                return await self.coalescer.embed(text)
+            return await retrieval_executor.run(self.embed_query, text)
+
+    async def _embed_query_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed the distinct texts of one micro-batch. Titan embeds a single
+        text per request, so the batch fans out over the thread pool.
+        """
+        if len(texts) == 1:
+            return [await retrieval_executor.run(self.embed_query, texts[0])]
+        return list(
+            await asyncio.gather(
+                *(retrieval_executor.run(self.embed_query, text) for text in texts)
+            )
+        )
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many queries in one call, as `embed_query` would embed each:
+        the distinct texts fan out over the thread pool together, each
+        holding its own slot of the embed stage.
+        """
+        distinct = list(dict.fromkeys(texts))
+        if not distinct:
+            return []
+
+        async def embed(text: str) -> List[float]:
+            async with admission.stage("embed"):
+                return await retrieval_executor.run(self.embed_query, text)
+
+        vectors = dict(zip(distinct, await asyncio.gather(*map(embed, distinct))))
+        return [vectors[text] for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts on the dedicated retrieval thread pool."""
+        async with admission.stage("embed"):
+            return await retrieval_executor.run(self.embed_documents, texts)
 
 
-embedding_service = EmbeddingService()
+embedding_service = EmbeddingService(
+    model_id=config.BEDROCK_EMBEDDING_MODEL,
+    region_name=config.BEDROCK_MODEL_REGION,
+    dimension=config.EMBEDDING_DIMENSION,
+    use_cache=config.EMBEDDING_CACHE_ENABLED,
+    coalesce=config.EMBEDDING_BATCH_ENABLED,
+)
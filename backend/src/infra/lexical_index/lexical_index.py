@@ -0,0 +1,232 @@
+import json
+import math
+import os
+import re
+import struct
+import unicodedata
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.infra.vector_index.vector_index import hash64
+
+_MAGIC = b"LEXIDX02"
+_HEADER = struct.Struct("<8sQ")
+_ALIGN = 8
+
+_TOKEN_RE = re.compile(r"\d+(?:[.,]\d+)*|[a-z]+\d*")
+# "quận 7", "q.7", "q 7" -> "q7"; "phường 5", "p.5" -> "p5"
+_ADMIN_RE = re.compile(r"\b(?:(quan|q)|(phuong|p))\s*\.?\s*(\d{1,2})\b")
+
+
+def fold_diacritics(text: str) -> str:
+    """Lowercase and strip Vietnamese diacritics: "Quận Bình Thạnh" -> "quan binh thanh"."""
+    text = text.lower().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+
+
+def tokenize(text: str) -> List[str]:
+    text = fold_diacritics(text)
+    text = _ADMIN_RE.sub(lambda m: f" {'q' if m.group(1) else 'p'}{m.group(3)} ", text)
+    # "3,5 tỷ" and "3.5 tỷ" index the same token
+    return [token.replace(",", ".") for token in _TOKEN_RE.findall(text)]
+
+
+def _blob(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 `values` concatenated, and the offsets delimiting each of them."""
+    data = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(data) + 1, dtype=np.uint64)
+    np.cumsum([len(value) for value in data], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(data), dtype=np.uint8)
+
+
+def build_index(
+    docs: Iterable[Tuple[str, str]], path: str, k1: float = 1.2, b: float = 0.75
+) -> int:
+    """
+    Write a BM25 index of `(doc_id, text)` pairs to `path`, atomically.
+
+    Postings hold precomputed BM25 term weights, so a query only sums the
+    weights of its terms. Returns the number of indexed documents.
+
+    Ids and terms are concatenated into byte blobs addressed by offset
+    arrays. Terms are stored in the order of their 64-bit hashes, a lookup
+    is a binary search over the hashes.
+    """
+    ids: List[str] = []
+    lengths: List[int] = []
+    postings: dict[str, List[Tuple[int, int]]] = {}
+    for doc_id, text in docs:
+        tokens = tokenize(text or "")
+        doc_idx = len(ids)
+        ids.append(doc_id)
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term, []).append((doc_idx, tf))
+
+    n_docs = len(ids)
+    avgdl = (sum(lengths) / n_docs) if n_docs else 0.0
+    doc_lengths = np.asarray(lengths, dtype=np.float32)
+    vocabulary = sorted((hash64(term), term) for term in postings)
+    term_starts = np.zeros(len(vocabulary) + 1, dtype=np.uint64)
+    doc_arrays = [np.empty(0, dtype=np.uint32)]
+    weight_arrays = [np.empty(0, dtype=np.float32)]
+    for i, (_, term) in enumerate(vocabulary):
+        entries = postings[term]
+        df = len(entries)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        doc_idx = np.fromiter((d for d, _ in entries), dtype=np.uint32, count=df)
+        tf = np.fromiter((t for _, t in entries), dtype=np.float32, count=df)
+        dl = doc_lengths[doc_idx]
+        weight = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / max(avgdl, 1e-9)))
+        doc_arrays.append(doc_idx)
+        weight_arrays.append(weight.astype(np.float32))
+        term_starts[i + 1] = term_starts[i] + df
+
+    id_offsets, id_data = _blob(ids)
+    term_offsets, term_data = _blob([term for _, term in vocabulary])
+    arrays = {
+        "id_offsets": id_offsets,
+        "id_data": id_data,
+        "term_hashes": np.fromiter(
+            (value for value, _ in vocabulary), dtype=np.uint64, count=len(vocabulary)
+        ),
+        "term_starts": term_starts,
+        "term_offsets": term_offsets,
+        "term_data": term_data,
+        "docs": np.concatenate(doc_arrays),
+        "weights": np.concatenate(weight_arrays),
+    }
+    sections: Dict[str, List[int]] = {}
+    offset = 0
+    for name, values in arrays.items():
+        sections[name] = [offset, values.nbytes]
+        offset += values.nbytes + (-values.nbytes % _ALIGN)
+
+    header = json.dumps(
+        {
+            "n_docs": n_docs,
+            "n_terms": len(vocabulary),
+            "avgdl": avgdl,
+            "sections": sections,
+        }
+    ).encode("utf-8")
+    header += b" " * (-(len(header) + _HEADER.size) % _ALIGN)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(header)))
+        f.write(header)
+        base = f.tell()
+        for name, values in arrays.items():
+            f.write(b"\0" * (base + sections[name][0] - f.tell()))
+            f.write(values.tobytes())
+    os.replace(tmp_path, path)
+    return n_docs
+
+
+class LexicalIndex:
+    """
+    Read-only BM25 index written by `build_index`.
+
+    Ids, vocabulary and postings are `np.memmap` views: opening the index
+    only parses a small header, every worker shares one copy in the page
+    cache, and a query touches only its terms and their postings.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, header_size = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"Not a lexical index: {path}")
+            header = json.loads(f.read(header_size))
+        self.n_docs: int = header["n_docs"]
+        self.n_terms: int = header["n_terms"]
+        base = _HEADER.size + header_size
+        sections = header["sections"]
+
+        def section(name: str, dtype: Any) -> np.ndarray:
+            offset, size = sections[name]
+            if not size:
+                return np.empty(0, dtype=dtype)
+            return np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=base + offset,
+                shape=(size // np.dtype(dtype).itemsize,),
+            )
+
+        self._id_offsets = section("id_offsets", np.uint64)
+        self._id_data = section("id_data", np.uint8)
+        self._term_hashes = section("term_hashes", np.uint64)
+        self._term_starts = section("term_starts", np.uint64)
+        self._term_offsets = section("term_offsets", np.uint64)
+        self._term_data = section("term_data", np.uint8)
+        self._docs = section("docs", np.uint32)
+        self._weights = section("weights", np.float32)
+
+    @classmethod
+    def open(cls, path: str) -> Optional["LexicalIndex"]:
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def doc_id(self, doc: int) -> str:
+        start, end = int(self._id_offsets[doc]), int(self._id_offsets[doc + 1])
+        return self._id_data[start:end].tobytes().decode("utf-8")
+
+    def _postings(self, term: str) -> Optional[Tuple[int, int]]:
+        """`(start, end)` of the postings of `term`, None if it is not indexed."""
+        value = np.uint64(hash64(term))
+        position = int(np.searchsorted(self._term_hashes, value))
+        # Walk the (practically never) colliding hashes
+        while position < self.n_terms and self._term_hashes[position] == value:
+            start, end = self._term_offsets[position : position + 2].astype(np.int64)
+            if self._term_data[start:end].tobytes().decode("utf-8") == term:
+                return int(self._term_starts[position]), int(self._term_starts[position + 1])
+            position += 1
+        return None
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        doc_filter: Optional[Callable[[str], bool]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Return up to `top_k` `(doc_id, bm25_score)` pairs, best first.
+        `doc_filter` drops documents before the top-k cut.
+        """
+        slices = [
+            postings
+            for postings in map(self._postings, dict.fromkeys(tokenize(query)))
+            if postings is not None
+        ]
+        if not slices or top_k <= 0:
+            return []
+        docs = np.concatenate([self._docs[start:end] for start, end in slices])
+        weights = np.concatenate([self._weights[start:end] for start, end in slices])
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        if doc_filter is not None:
+            hits = []
+            for i in np.argsort(-scores, kind="stable"):
+                doc_id = self.doc_id(int(unique_docs[i]))
+                if doc_filter(doc_id):
+                    hits.append((doc_id, float(scores[i])))
+                    if len(hits) == top_k:
+                        break
+            return hits
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.doc_id(int(unique_docs[i])), float(scores[i])) for i in best]
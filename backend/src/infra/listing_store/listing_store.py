@@ -0,0 +1,254 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.schema.address import Address
+from src.schema.contact import ContactRealtor
+from src.schema.real_estate import RealEstate
+from src.utils.logger import LoggerConfig
+
+logger = LoggerConfig(__name__).get()
+
+_WARD_PREFIXES = ("phường", "xã", "thị trấn")
+_DISTRICT_PREFIXES = ("quận", "huyện", "thị xã", "thành phố")
+_DESCRIPTION_MARKER = "Thông tin mô tả:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    listing_key TEXT PRIMARY KEY,
+    listing_id TEXT,
+    source TEXT,
+    title TEXT,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+)
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS ix_listings_listing_id ON listings (listing_id)"
+
+
+def listing_key(metadata: dict, fallback: str) -> str:
+    """Stable key of a listing: `<source>-<listing_id>`, or the url / fallback."""
+    listing_id = metadata.get("listing_id")
+    if listing_id:
+        return f"{metadata.get('source') or 'unknown'}-{listing_id}"
+    return str(metadata.get("url") or fallback)
+
+
+def _parse_address(metadata: Dict[str, Any]) -> List[Address]:
+    raw = metadata.get("address")
+    if not raw:
+        return []
+    parts = [part.strip() for part in str(raw).split(",") if part.strip()]
+    address = Address(
+        latitude=metadata.get("lat") or metadata.get("latitude"),
+        longitude=metadata.get("lng") or metadata.get("longitude"),
+    )
+    if parts:
+        address.city = parts.pop()
+    street_parts = []
+    for part in parts:
+        lowered = part.lower()
+        if lowered.startswith(_WARD_PREFIXES):
+            address.ward = part
+        elif lowered.startswith(_DISTRICT_PREFIXES):
+            address.district = part
+        else:
+            street_parts.append(part)
+    address.street = ", ".join(street_parts)
+    return [address]
+
+
+def _parse_images(value: Any) -> List[str]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return [value] if value.startswith("http") else []
+    return [str(image) for image in value] if isinstance(value, list) else []
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _transaction_type(title: str, metadata: Dict[str, Any]) -> Optional[str]:
+    if metadata.get("transactionType"):
+        return metadata["transactionType"]
+    lowered = title.lower()
+    if "cho thuê" in lowered:
+        return "Cho thuê"
+    if re.search(r"\bbán\b", lowered):
+        return "Bán"
+    return None
+
+
+def record_to_real_estate(record: Dict[str, Any]) -> RealEstate:
+    """Build a `RealEstate` from a listing record written by the ingestion pipeline."""
+    metadata: Dict[str, Any] = record.get("metadata") or {}
+    content: str = record.get("content") or ""
+    title = record.get("title") or content.strip().split("\n", 1)[0].strip()
+
+    description = content
+    if _DESCRIPTION_MARKER in content:
+        description = content.split(_DESCRIPTION_MARKER, 1)[1].strip()
+
+    contact = None
+    contact_fields = {
+        "name": metadata.get("contact_name"),
+        "phone": metadata.get("contact_phone"),
+        "zalo": metadata.get("contact_zalo"),
+        "email": metadata.get("contact_email"),
+    }
+    if any(contact_fields.values()):
+        contact = ContactRealtor(**contact_fields)
+
+    price = metadata.get("price")
+    return RealEstate(
+        title=title or None,
+        address=_parse_address(metadata),
+        description=description or None,
+        propertyType=metadata.get("type") or metadata.get("propertyType"),
+        transactionType=_transaction_type(title, metadata),
+        legalStatus=metadata.get("legal") or metadata.get("legalStatus"),
+        price=price,
+        priceUnit=metadata.get("priceUnit") or ("VND" if price is not None else None),
+        area=metadata.get("area"),
+        direction=metadata.get("direction"),
+        images=_parse_images(metadata.get("image") or metadata.get("images")),
+        contactRealtor=contact,
+        source=metadata.get("url") or metadata.get("source"),
+        publishedAt=_parse_datetime(metadata.get("publishedAt")),
+        updatedAt=_parse_datetime(metadata.get("updatedAt")),
+    )
+
+
+class ListingStoreWriter:
+    """
+    Stores the full record of every ingested listing so the API can build
+    `RealEstate` objects from it instead of having the LLM re-type them.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(_SCHEMA)
+        self.conn.execute(_INDEX)
+        self.conn.commit()
+
+    def upsert_many(
+        self, records: list[dict], indexes: Optional[list[int]] = None
+    ) -> int:
+        """Upsert records, `indexes` are their positions in the feed."""
+        rows = []
+        for idx, record in zip(indexes or range(len(records)), records):
+            content = record.get("content", "")
+            if not content.strip():
+                continue
+            metadata = record.get("metadata", {})
+            rows.append(
+                (
+                    listing_key(metadata, fallback=f"record-{idx}"),
+                    str(metadata.get("listing_id") or ""),
+                    metadata.get("source"),
+                    content.strip().split("\n", 1)[0].strip(),
+                    content,
+                    json.dumps(metadata, ensure_ascii=False),
+                )
+            )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO listings "
+            "(listing_key, listing_id, source, title, content, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.conn.commit()
+        return len(rows)
+
+    def delete_many(self, keys: list[str]):
+        self.conn.executemany(
+            "DELETE FROM listings WHERE listing_key = ?", [(key,) for key in keys]
+        )
+        self.conn.commit()
+
+    def iter_records(self) -> Iterator[tuple[str, dict]]:
+        """Yield `(listing_key, record)` for every stored listing."""
+        rows = self.conn.execute(
+            "SELECT listing_key, title, content, metadata FROM listings"
+        )
+        for key, title, content, metadata in rows:
+            record = {"title": title, "content": content, "metadata": json.loads(metadata)}
+            yield key, record
+
+    def close(self):
+        self.conn.close()
+
+
+class ListingStore:
+    """
+    Read-only access to the listing records written by `ListingStoreWriter`,
+    keyed by listing key (`<source>-<listing_id>`) or by bare listing id.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+
+    @classmethod
+    def open(cls, path: str) -> Optional["ListingStore"]:
+        if not os.path.exists(path):
+            logger.warning(f"Listing store not found at {path}")
+            return None
+        return cls(path)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return records for the given keys, unknown keys are dropped."""
+        keys = [str(key) for key in dict.fromkeys(keys) if key]
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT listing_key, listing_id, title, content, metadata FROM listings "
+                f"WHERE listing_key IN ({placeholders}) OR listing_id IN ({placeholders})",
+                (*keys, *keys),
+            ).fetchall()
+
+        records: Dict[str, Dict[str, Any]] = {}
+        for listing_key, listing_id, title, content, metadata in rows:
+            record = {
+                "title": title,
+                "content": content,
+                "metadata": json.loads(metadata),
+            }
+            records[listing_key] = record
+            if listing_id:
+                records.setdefault(listing_id, record)
+        return records
+
+    def hydrate(self, keys: List[str]) -> List[RealEstate]:
+        """Build `RealEstate` objects for `keys`, keeping order and dropping unknown ids."""
+        records = self.get_many(keys)
+        results: List[RealEstate] = []
+        seen: set[int] = set()
+        for key in keys:
+            record = records.get(str(key))
+            if record is None or id(record) in seen:
+                continue
+            seen.add(id(record))
+            results.append(record_to_real_estate(record))
+        return results
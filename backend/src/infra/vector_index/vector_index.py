@@ -0,0 +1,447 @@
+import hashlib
+import json
+import math
+import operator
+import os
+import shutil
+import struct
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_MAGIC = b"VECIDX01"
+_HEADER = struct.Struct("<8sQ")
+# Sections start on cache-line boundaries
+_ALIGN = 64
+_BLOBS = ("ids", "documents", "metadatas")
+_BLOCK_ROWS = 65536
+
+_COMPARATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": operator.eq,
+    "$ne": operator.ne,
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+}
+
+
+def hash64(value: str) -> int:
+    """Stable 64-bit hash of a chunk id or listing key."""
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def _hashes(values: Iterable[str]) -> np.ndarray:
+    return np.fromiter((hash64(value) for value in values), dtype=np.uint64)
+
+
+def matches_where(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """Evaluate a Chroma `where` filter against one chunk's metadata."""
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        else:
+            # Like Chroma, a chunk without the field matches no condition on it
+            if key not in metadata:
+                return False
+            clauses = condition.items() if isinstance(condition, dict) else [("$eq", condition)]
+            for op, operand in clauses:
+                if op not in _COMPARATORS:
+                    raise ValueError(f"Unsupported where operator: {op}")
+                try:
+                    if not _COMPARATORS[op](metadata[key], operand):
+                        return False
+                except TypeError:
+                    return False
+    return True
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid of every row, by cosine similarity, in blocks."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _BLOCK_ROWS):
+        block = np.asarray(vectors[start : start + _BLOCK_ROWS])
+        assignments[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def _train_centroids(
+    vectors: np.ndarray, n_lists: int, seed: int, iterations: int = 10
+) -> np.ndarray:
+    """Spherical k-means on a sample of at most 64 rows per list."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), 64 * n_lists)
+    sample = np.asarray(
+        vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    )
+    centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.bincount(assignments, minlength=n_lists) == 0
+        # Re-seed empty lists with random sample rows
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = _normalize(sums).astype(np.float32)
+    return centroids
+
+
+def _listing_key(doc_id: str, metadata: Dict[str, Any]) -> str:
+    # Chunk ids are `<listing_key>:<content hash>`
+    return str(metadata.get("listing_key") or doc_id.rsplit(":", 1)[0])
+
+
+def build_index(
+    rows: Iterable[Tuple[str, Sequence[float], str, Dict[str, Any]]],
+    path: str,
+    ivf_min_rows: int = 200_000,
+    n_lists: Optional[int] = None,
+    seed: int = 0,
+) -> int:
+    """
+    Write `(chunk_id, embedding, document, metadata)` rows to `path` as one
+    memory-mappable file, atomically. Returns the number of rows.
+
+    Vectors are stored L2-normalized as a float32 matrix, so a search is a
+    matrix-vector product over pages every worker shares through the page
+    cache. From `ivf_min_rows` rows on, the rows are clustered into
+    `n_lists` (default sqrt(rows)) inverted lists stored contiguously, and a
+    search only scans the lists nearest to the query.
+
+    Ids, documents and metadata (JSON) are concatenated into byte blobs
+    addressed by offset arrays; ids and listing keys are also hashed for
+    vectorized lookups and filters.
+    """
+    parts_dir = f"{path}.parts"
+    os.makedirs(parts_dir, exist_ok=True)
+
+    def part(name: str) -> str:
+        return os.path.join(parts_dir, name)
+
+    lengths = {name: array("Q") for name in _BLOBS}
+    id_hashes = array("Q")
+    key_hashes = array("Q")
+    dimension = 0
+    n_rows = 0
+    try:
+        blob_files = {name: open(part(name), "wb") for name in _BLOBS}
+        try:
+            with open(part("vectors"), "wb") as vector_file:
+                for doc_id, embedding, document, metadata in rows:
+                    vector = np.asarray(embedding, dtype=np.float32)
+                    if not n_rows:
+                        dimension = len(vector)
+                    elif len(vector) != dimension:
+                        raise ValueError(
+                            f"Embedding of {doc_id} has {len(vector)} dimensions, "
+                            f"expected {dimension}"
+                        )
+                    vector_file.write(_normalize(vector).astype(np.float32).tobytes())
+                    metadata = metadata or {}
+                    values = {
+                        "ids": doc_id,
+                        "documents": document or "",
+                        "metadatas": json.dumps(metadata, ensure_ascii=False),
+                    }
+                    for name, value in values.items():
+                        data = value.encode("utf-8")
+                        blob_files[name].write(data)
+                        lengths[name].append(len(data))
+                    id_hashes.append(hash64(doc_id))
+                    key_hashes.append(hash64(_listing_key(doc_id, metadata)))
+                    n_rows += 1
+        finally:
+            for f in blob_files.values():
+                f.close()
+
+        vectors = (
+            np.memmap(part("vectors"), dtype=np.float32, mode="r", shape=(n_rows, dimension))
+            if n_rows
+            else np.empty((0, dimension), dtype=np.float32)
+        )
+        kind = "flat"
+        centroids = np.empty((0, dimension), dtype=np.float32)
+        list_offsets = np.zeros(1, dtype=np.int64)
+        order = np.arange(n_rows)
+        if n_rows >= max(ivf_min_rows, 1):
+            kind = "ivf"
+            n_lists = min(n_lists or max(1, int(math.sqrt(n_rows))), n_rows)
+            centroids = _train_centroids(vectors, n_lists, seed)
+            assignments = _assign(vectors, centroids)
+            order = np.argsort(assignments, kind="stable")
+            list_offsets = np.concatenate(
+                [[0], np.cumsum(np.bincount(assignments, minlength=n_lists))]
+            ).astype(np.int64)
+
+        key_hashes_np = np.frombuffer(key_hashes, dtype=np.uint64)[order]
+        id_hashes_np = np.frombuffer(id_hashes, dtype=np.uint64)[order]
+        id_order = np.argsort(id_hashes_np, kind="stable")
+        blob_lengths = {
+            name: np.frombuffer(lengths[name], dtype=np.uint64) for name in _BLOBS
+        }
+        blob_offsets = {
+            name: np.concatenate([[0], np.cumsum(blob_lengths[name][order])]).astype(
+                np.uint64
+            )
+            for name in _BLOBS
+        }
+
+        sizes = {
+            "vectors": n_rows * dimension * 4,
+            "centroids": centroids.nbytes,
+            "list_offsets": list_offsets.nbytes,
+            "key_hashes": key_hashes_np.nbytes,
+            "id_hashes": id_hashes_np.nbytes,
+            "id_order": id_order.astype(np.uint32).nbytes,
+        }
+        for name in _BLOBS:
+            sizes[f"{name}_offsets"] = blob_offsets[name].nbytes
+            sizes[f"{name}_data"] = int(blob_offsets[name][-1])
+        sections: Dict[str, List[int]] = {}
+        offset = 0
+        for name, size in sizes.items():
+            sections[name] = [offset, size]
+            offset += size + (-size % _ALIGN)
+
+        header = json.dumps(
+            {
+                "n_rows": n_rows,
+                "dimension": dimension,
+                "kind": kind,
+                "n_lists": len(centroids),
+                "sections": sections,
+            }
+        ).encode("utf-8")
+        header += b" " * (-(len(header) + _HEADER.size) % _ALIGN)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(header)))
+            f.write(header)
+            base = f.tell()
+
+            def start(name: str) -> None:
+                f.write(b"\0" * (base + sections[name][0] - f.tell()))
+
+            start("vectors")
+            for block in range(0, n_rows, _BLOCK_ROWS):
+                f.write(np.ascontiguousarray(vectors[order[block : block + _BLOCK_ROWS]]).tobytes())
+            for name, values in (
+                ("centroids", centroids),
+                ("list_offsets", list_offsets),
+                ("key_hashes", key_hashes_np),
+                ("id_hashes", id_hashes_np[id_order]),
+                ("id_order", id_order.astype(np.uint32)),
+            ):
+                start(name)
+                f.write(values.tobytes())
+            for name in _BLOBS:
+                start(f"{name}_offsets")
+                f.write(blob_offsets[name].tobytes())
+                start(f"{name}_data")
+                if kind == "flat":
+                    with open(part(name), "rb") as blob:
+                        shutil.copyfileobj(blob, f)
+                    continue
+                blob = np.memmap(part(name), dtype=np.uint8, mode="r")
+                starts = np.concatenate([[0], np.cumsum(blob_lengths[name])]).astype(np.int64)
+                for row in order:
+                    f.write(blob[starts[row] : starts[row + 1]].tobytes())
+                del blob
+        del vectors
+        os.replace(tmp_path, path)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    return n_rows
+
+
+class VectorIndex:
+    """
+    Read-only, memory-mapped vector index written by `build_index`.
+
+    Nothing is loaded into the process: vectors, hashes and blobs are
+    `np.memmap` views, so every worker opening the same file shares one copy
+    in the page cache. Distances are cosine distances, like Chroma's.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, header_size = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"Not a vector index: {path}")
+            header = json.loads(f.read(header_size))
+        self.n_rows: int = header["n_rows"]
+        self.dimension: int = header["dimension"]
+        self.kind: str = header["kind"]
+        self.n_lists: int = header["n_lists"]
+        base = _HEADER.size + header_size
+        sections = header["sections"]
+
+        def section(name: str, dtype: Any, shape: Tuple[int, ...]) -> np.ndarray:
+            offset, size = sections[name]
+            if not size:
+                return np.empty(shape, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode="r", offset=base + offset, shape=shape)
+
+        n, d = self.n_rows, self.dimension
+        self.vectors = section("vectors", np.float32, (n, d))
+        self.centroids = section("centroids", np.float32, (self.n_lists, d))
+        self.list_offsets = section("list_offsets", np.int64, (self.n_lists + 1,))
+        self.key_hashes = section("key_hashes", np.uint64, (n,))
+        self._id_hashes = section("id_hashes", np.uint64, (n,))
+        self._id_order = section("id_order", np.uint32, (n,))
+        self._offsets = {
+            name: section(f"{name}_offsets", np.uint64, (n + 1,)) for name in _BLOBS
+        }
+        self._blobs = {
+            name: section(f"{name}_data", np.uint8, (sections[f"{name}_data"][1],))
+            for name in _BLOBS
+        }
+
+    @classmethod
+    def open(cls, path: str) -> Optional["VectorIndex"]:
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def _string(self, name: str, row: int) -> str:
+        offsets = self._offsets[name]
+        return self._blobs[name][int(offsets[row]) : int(offsets[row + 1])].tobytes().decode("utf-8")
+
+    def doc_id(self, row: int) -> str:
+        return self._string("ids", row)
+
+    def document(self, row: int) -> str:
+        return self._string("documents", row)
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        return json.loads(self._string("metadatas", row))
+
+    def rows_for_ids(self, ids: Sequence[str]) -> Dict[str, int]:
+        """Row of every known chunk id in `ids`."""
+        if not ids or not self.n_rows:
+            return {}
+        hashes = _hashes(ids)
+        positions = np.searchsorted(self._id_hashes, hashes)
+        rows = {}
+        for doc_id, value, position in zip(ids, hashes, positions):
+            # Walk the (practically never) colliding hashes
+            while position < self.n_rows and self._id_hashes[position] == value:
+                row = int(self._id_order[position])
+                if self.doc_id(row) == doc_id:
+                    rows[doc_id] = row
+                    break
+                position += 1
+        return rows
+
+    def _ranges(self, query: np.ndarray, nprobe: int) -> List[Tuple[int, int]]:
+        if self.kind != "ivf":
+            return [(0, self.n_rows)]
+        nearest = np.argsort(-(self.centroids @ query))[:nprobe]
+        return [(int(self.list_offsets[i]), int(self.list_offsets[i + 1])) for i in nearest]
+
+    def _blocks(
+        self,
+        query: np.ndarray,
+        key_filter: Optional[np.ndarray],
+        nprobe: int,
+        block_rows: int,
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """`(scores, rows)` of the scanned rows, a block at a time."""
+        if key_filter is not None:
+            # Candidate listings are few and their chunks spread over any
+            # inverted list: score exactly those rows
+            candidates = np.flatnonzero(np.isin(self.key_hashes, key_filter))
+            for block in range(0, len(candidates), block_rows):
+                rows = candidates[block : block + block_rows]
+                yield self.vectors[rows] @ query, rows
+            return
+        for start, end in self._ranges(query, nprobe):
+            for block in range(start, end, block_rows):
+                stop = min(block + block_rows, end)
+                yield self.vectors[block:stop] @ query, np.arange(block, stop)
+
+    def search(
+        self,
+        embedding: Sequence[float],
+        top_k: int,
+        listing_keys: Optional[Iterable[str]] = None,
+        row_filter: Optional[Callable[[int], bool]] = None,
+        nprobe: int = 32,
+        block_rows: int = _BLOCK_ROWS,
+    ) -> List[Tuple[int, float]]:
+        """
+        Up to `top_k` `(row, cosine_distance)` pairs, nearest first.
+
+        Exact for flat indexes and for `listing_keys`, which restricts the
+        scan to those listings' chunks; otherwise IVF indexes scan the
+        `nprobe` nearest lists. `row_filter` drops rows before the top-k cut,
+        an IVF search it leaves short of `top_k` hits scans more lists.
+        """
+        if top_k <= 0 or not self.n_rows:
+            return []
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        key_filter = None if listing_keys is None else np.unique(_hashes(listing_keys))
+        # Without a row filter only each block's best `top_k` can make the cut
+        keep = None if row_filter is not None else top_k
+        all_rows: List[np.ndarray] = []
+        all_scores: List[np.ndarray] = []
+        for scores, rows in self._blocks(query, key_filter, nprobe, block_rows):
+            if keep is not None and len(scores) > keep:
+                best = np.argpartition(-scores, keep - 1)[:keep]
+                scores, rows = scores[best], rows[best]
+            all_rows.append(rows)
+            all_scores.append(scores)
+        if not all_rows:
+            return []
+        rows = np.concatenate(all_rows)
+        scores = np.concatenate(all_scores)
+        if row_filter is None:
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                best = np.arange(len(scores))
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return [(int(rows[i]), float(1.0 - scores[i])) for i in best]
+        hits = []
+        for i in np.argsort(-scores, kind="stable"):
+            if row_filter(int(rows[i])):
+                hits.append((int(rows[i]), float(1.0 - scores[i])))
+                if len(hits) == top_k:
+                    break
+        n_lists = len(self.centroids)
+        if (
+            len(hits) < top_k
+            and self.kind == "ivf"
+            and key_filter is None
+            and nprobe < n_lists
+        ):
+            return self.search(
+                embedding, top_k, None, row_filter, min(nprobe * 4, n_lists), block_rows
+            )
+        return hits
+
+    def warm_up(self) -> None:
+        """Read the scanned sections once so they sit in the page cache."""
+        for start in range(0, self.n_rows, _BLOCK_ROWS):
+            np.asarray(self.vectors[start : start + _BLOCK_ROWS]).sum()
+        np.asarray(self.key_hashes).sum()
+        np.asarray(self.centroids).sum()
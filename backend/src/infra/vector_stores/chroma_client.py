@@ -1,34 +1,95 @@
+import asyncio
+import json
+import os
+import threading
+import numpy as np
 from langchain_chroma import Chroma
+from src.infra.attribute_index.attribute_index import AttributeIndex
+from src.infra.attribute_index.constraints import parse_constraints
 from src.infra.embeddings.embeddings import embedding_service
+from src.infra.lexical_index.lexical_index import LexicalIndex
+from src.infra.vector_stores.chroma_settings import chroma_settings
+from src.infra.vector_index.vector_index import VectorIndex, matches_where
 from src.config.config import ConfigSingleton
+from src.utils.context_builder import NO_DOCUMENTS_FOUND, ContextBuilder
+from src.utils.executor import retrieval_executor
+from src.utils.logger import LoggerConfig
+from src.utils.tracing import span
 from langchain.schema.document import Document
-from typing import List, Tuple, Dict, Any, Optional
+from typing import Callable, FrozenSet, List, Tuple, Dict, Any, Optional
 
 config = ConfigSingleton()
+logger = LoggerConfig(__name__).get()
 
 
-def _format_docs(docs: List[Document], scores: List[float] | None = None) -> str:
-    if not docs:
-        return "Không tìm thấy tài liệu phù hợp."
-    for idx, doc in enumerate(docs):
-        # Content field
-        content = doc.page_content.strip()
-        # Metadata field
-        metadata: Dict[str, Any] = getattr(doc, "metadata", {}) or {}
-        
-        extra_lines: list[str] = []
-        
-        # Add all metadata fields
-        for key, value in metadata.items():
-            clean_key = key.upper().replace("_", " ")
-            extra_lines.append(f"[{clean_key}]: {value}")
-
-        if scores:
-            extra_lines.append(f"[SCORE]: {scores[idx]:.4f}")
-            
-        if extra_lines:
-            content = content + "\n\n" + "\n".join(extra_lines)
-        return content
+def _rrf_fuse(
+    rankings: List[List[Tuple[Document, float]]], top_k: int, k: int = 60
+) -> List[Tuple[Document, float]]:
+    """Reciprocal rank fusion: each ranking adds `1 / (k + rank)` per document."""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, (doc, _) in enumerate(ranking, start=1):
+            key = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(key, doc)
+    best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [(docs[key], scores[key]) for key in best]
+
+
+def _listing_key(doc: Document) -> str:
+    metadata = doc.metadata or {}
+    return str(
+        metadata.get("listing_key")
+        or metadata.get("listing_id")
+        or metadata.get("url")
+        or doc.id
+        or doc.page_content
+    )
+
+
+def _overlap(left: str, right: str, min_overlap: int = 20) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    for size in range(min(len(left), len(right)), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_chunks(chunks: List[str]) -> str:
+    """Join chunks of one listing, stitching the splitter's chunk overlap."""
+    merged = chunks[0]
+    for chunk in chunks[1:]:
+        if overlap := _overlap(merged, chunk):
+            merged += chunk[overlap:]
+        elif overlap := _overlap(chunk, merged):
+            merged = chunk + merged[overlap:]
+        else:
+            merged += "\n...\n" + chunk
+    return merged
+
+
+def _mmr_select(
+    relevance: np.ndarray, embeddings: np.ndarray, n: int, lambda_mult: float
+) -> List[int]:
+    """
+    Maximal marginal relevance over L2-normalized `embeddings`: greedily pick
+    the item maximizing `lambda * relevance - (1 - lambda) * max_sim_to_picked`.
+    """
+    n = min(n, len(relevance))
+    similarity = embeddings @ embeddings.T
+    max_similarity = np.full(len(relevance), -np.inf)
+    available = np.ones(len(relevance), dtype=bool)
+    picked: List[int] = []
+    for _ in range(n):
+        penalty = np.where(np.isinf(max_similarity), 0.0, max_similarity)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    return picked
 
 
 class ChromaClientService:
@@ -36,13 +97,510 @@ class ChromaClientService:
         self.client = None
         self.connection = None
         self.embedding_service = embedding_service
+        self._connect_lock = threading.Lock()
+        # path -> (mtime, index) of the indexes built by the ingestion pipeline
+        self._indexes: Dict[str, Tuple[int, Any]] = {}
+        self._index_lock = threading.Lock()
+        # Formats results for the LLM, `full` when it generates every field
+        self.context_builder = ContextBuilder(
+            token_budget=config.RAG_CONTEXT_TOKEN_BUDGET,
+            max_doc_tokens=config.RAG_CONTEXT_DOC_MAX_TOKENS,
+            full=config.RAG_OUTPUT_MODE != "hydrate",
+        )
 
     def connect(self):
-        persist_dir = config.CHROMA_PERSIST_DIR
-        self.client = Chroma(
-            collection_name=config.CHROMA_COLLECTION_NAME,
-            persist_directory=str(persist_dir),
-            embedding_function=embedding_service,
+        """Open the persisted collection once, safe to call from any thread."""
+        if self.client is not None:
+            return
+        with self._connect_lock:
+            if self.client is not None:
+                return
+            persist_dir = config.CHROMA_PERSIST_DIR
+            self.client = Chroma(
+                collection_name=config.CHROMA_COLLECTION_NAME,
+                persist_directory=str(persist_dir),
+                embedding_function=embedding_service,
+                client_settings=chroma_settings(),
+            )
+
+    async def aconnect(self):
+        if self.client is None and self._vector_index() is None:
+            await retrieval_executor.run(self.connect)
+
+    def warm_up(self) -> int:
+        """
+        Open the collection and page its HNSW index into memory with one
+        query (or page in the memory-mapped vector index), then load the
+        lexical and attribute indexes. Returns the number of chunks in the
+        collection.
+        """
+        index = self._vector_index()
+        if index is not None:
+            index.warm_up()
+            self._lexical()
+            self._attributes()
+            return len(index)
+        self.connect()
+        collection = self.client._collection
+        count = collection.count()
+        if count:
+            sample = collection.get(limit=1, include=["embeddings"])
+            collection.query(
+                query_embeddings=[sample["embeddings"][0]],
+                n_results=1,
+                include=["distances"],
+            )
+        self._lexical()
+        self._attributes()
+        return count
+
+    def collection_version(self) -> int | None:
+        """Modification time of the ingestion marker file, None if missing."""
+        try:
+            return os.stat(config.CHROMA_VERSION_FILE).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load_index(self, path: str, loader: Callable[[str], Any]) -> Optional[Any]:
+        """Index file at `path`, reopened when the ingestion pipeline rebuilds it."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._indexes.get(path)
+        if cached is None or cached[0] != mtime:
+            with self._index_lock:
+                cached = self._indexes.get(path)
+                if cached is None or cached[0] != mtime:
+                    cached = (mtime, loader(path))
+                    self._indexes[path] = cached
+                    logger.info(f"Loaded {loader.__name__} of {len(cached[1])} rows")
+        return cached[1]
+
+    def _lexical(self) -> Optional[LexicalIndex]:
+        return self._load_index(config.LEXICAL_INDEX_PATH, LexicalIndex)
+
+    def _attributes(self) -> Optional[AttributeIndex]:
+        return self._load_index(config.ATTRIBUTE_INDEX_PATH, AttributeIndex)
+
+    def _vector_index(self) -> Optional[VectorIndex]:
+        """The memory-mapped vector index, None when Chroma serves searches."""
+        if config.VECTOR_BACKEND != "mmap":
+            return None
+        return self._load_index(config.VECTOR_INDEX_PATH, VectorIndex)
+
+    def _candidate_keys(self, query: str) -> Optional[FrozenSet[str]]:
+        """
+        Listing keys satisfying the constraints parsed from `query`, None when
+        the query has none. An empty match falls back to unfiltered search,
+        a misparsed constraint must not hide every listing.
+        """
+        if not config.ATTRIBUTE_FILTER_ENABLED:
+            return None
+        index = self._attributes()
+        if index is None:
+            return None
+        with span("attribute_filter"):
+            constraints = parse_constraints(query)
+            if constraints.is_empty:
+                return None
+            keys = index.candidate_keys(**constraints.to_filters())
+        if not keys:
+            logger.info(f"No listing matches {constraints}, searching unfiltered")
+            return None
+        return frozenset(keys)
+
+    def _use_hybrid(self, mode: Optional[str]) -> bool:
+        return (mode or config.RETRIEVAL_MODE) == "hybrid" and self._lexical() is not None
+
+    def _search_by_vector(
+        self,
+        embedding: List[float],
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        candidate_keys: Optional[FrozenSet[str]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Nearest chunks with their distances. Queried directly to keep chunk ids.
+
+        Small `candidate_keys` sets are pushed into Chroma's filter, larger
+        ones post-filter an over-fetched result.
+        """
+        return self._search_by_vector_batch(
+            [embedding], top_k, metadata_filter, [candidate_keys]
+        )[0]
+
+    @staticmethod
+    def _vector_query_plan(
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]],
+        candidate_keys: Optional[FrozenSet[str]],
+    ) -> Tuple[Optional[Dict[str, Any]], int, bool]:
+        """Chroma `where`, `n_results` and whether to post-filter by listing key."""
+        where = metadata_filter or None
+        if candidate_keys is None:
+            return where, top_k, False
+        if len(candidate_keys) > config.ATTRIBUTE_PUSHDOWN_MAX:
+            return where, top_k * 8, True
+        key_filter = {"listing_key": {"$in": sorted(candidate_keys)}}
+        return ({"$and": [where, key_filter]} if where else key_filter), top_k, False
+
+    def _search_by_vector_batch(
+        self,
+        embeddings: List[List[float]],
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        candidate_keys: Optional[List[Optional[FrozenSet[str]]]] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        `_search_by_vector` for several embeddings, `candidate_keys` given per
+        embedding. Queries with the same filter are sent to Chroma as one
+        multi-query request.
+        """
+        candidate_keys = candidate_keys or [None] * len(embeddings)
+        index = self._vector_index()
+        if index is not None:
+            return [
+                self._search_vector_index(index, embedding, top_k, metadata_filter, keys)
+                for embedding, keys in zip(embeddings, candidate_keys)
+            ]
+        self.connect()
+        plans = [
+            self._vector_query_plan(top_k, metadata_filter, keys)
+            for keys in candidate_keys
+        ]
+        groups: Dict[str, List[int]] = {}
+        for i, (where, n_results, _) in enumerate(plans):
+            groups.setdefault(json.dumps([where, n_results], sort_keys=True), []).append(i)
+        ranked: List[List[Tuple[Document, float]]] = [[] for _ in embeddings]
+        for members in groups.values():
+            where, n_results, _ = plans[members[0]]
+            with span("vector_search"):
+                results = self.client._collection.query(
+                    query_embeddings=[embeddings[i] for i in members],
+                    n_results=n_results,
+                    where=where,
+                    include=["documents", "metadatas", "distances"],
+                )
+            for position, i in enumerate(members):
+                docs_with_scores = [
+                    (
+                        Document(id=doc_id, page_content=text, metadata=metadata or {}),
+                        distance,
+                    )
+                    for doc_id, text, metadata, distance in zip(
+                        results["ids"][position],
+                        results["documents"][position],
+                        results["metadatas"][position],
+                        results["distances"][position],
+                    )
+                ]
+                if plans[i][2]:
+                    docs_with_scores = [
+                        (doc, score)
+                        for doc, score in docs_with_scores
+                        if doc.metadata.get("listing_key") in candidate_keys[i]
+                    ][:top_k]
+                ranked[i] = docs_with_scores
+        return ranked
+
+    def _search_vector_index(
+        self,
+        index: VectorIndex,
+        embedding: List[float],
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        candidate_keys: Optional[FrozenSet[str]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """`_search_by_vector` over the memory-mapped index, without Chroma."""
+        row_filter = None
+        if metadata_filter:
+            row_filter = lambda row: matches_where(index.metadata(row), metadata_filter)
+        with span("vector_search"):
+            hits = index.search(
+                embedding,
+                top_k,
+                listing_keys=candidate_keys,
+                row_filter=row_filter,
+                nprobe=config.VECTOR_INDEX_NPROBE,
+            )
+        return [(self._index_document(index, row), distance) for row, distance in hits]
+
+    @staticmethod
+    def _index_document(index: VectorIndex, row: int) -> Document:
+        return Document(
+            id=index.doc_id(row),
+            page_content=index.document(row),
+            metadata=index.metadata(row),
+        )
+
+    def _get_documents(
+        self, ids: List[str], metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Document]:
+        """Chunks by id, those failing `metadata_filter` left out."""
+        index = self._vector_index()
+        if index is not None:
+            docs = {
+                doc_id: self._index_document(index, row)
+                for doc_id, row in index.rows_for_ids(ids).items()
+            }
+            if metadata_filter:
+                docs = {
+                    doc_id: doc
+                    for doc_id, doc in docs.items()
+                    if matches_where(doc.metadata, metadata_filter)
+                }
+            return docs
+        self.connect()
+        found = self.client._collection.get(
+            ids=ids,
+            where=metadata_filter or None,
+            include=["documents", "metadatas"],
+        )
+        return {
+            doc_id: Document(id=doc_id, page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(
+                found["ids"], found["documents"], found["metadatas"]
+            )
+        }
+
+    def _search_lexical(
+        self,
+        query: str,
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        candidate_keys: Optional[FrozenSet[str]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """BM25 hits with their scores, filtered by `metadata_filter`."""
+        index = self._lexical()
+        if index is None:
+            return []
+        doc_filter = None
+        if candidate_keys is not None:
+            # Chunk ids are `<listing_key>:<content hash>`
+            doc_filter = lambda doc_id: doc_id.rsplit(":", 1)[0] in candidate_keys
+        with span("lexical_search"):
+            hits = index.search(query, top_k, doc_filter=doc_filter)
+            if not hits:
+                return []
+            docs = self._get_documents([doc_id for doc_id, _ in hits], metadata_filter)
+        return [(docs[doc_id], score) for doc_id, score in hits if doc_id in docs]
+
+    def _search_hybrid(
+        self,
+        query: str,
+        embedding: List[float],
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        candidate_keys: Optional[FrozenSet[str]] = None,
+        lexical: Optional[List[Tuple[Document, float]]] = None,
+        vector: Optional[List[Tuple[Document, float]]] = None,
+    ) -> List[Tuple[Document, float]]:
+        candidates = max(top_k, config.HYBRID_CANDIDATES)
+        if lexical is None:
+            lexical = self._search_lexical(
+                query, candidates, metadata_filter, candidate_keys
+            )
+        if vector is None:
+            vector = self._search_by_vector(
+                embedding, candidates, metadata_filter, candidate_keys
+            )
+        return _rrf_fuse([vector, lexical], top_k, k=config.RRF_K)
+
+    def _chunk_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        index = self._vector_index()
+        if index is not None:
+            return {
+                doc_id: np.asarray(index.vectors[row])
+                for doc_id, row in index.rows_for_ids(ids).items()
+            }
+        self.connect()
+        found = self.client._collection.get(ids=ids, include=["embeddings"])
+        return {
+            doc_id: np.asarray(embedding, dtype=np.float32)
+            for doc_id, embedding in zip(found["ids"], found["embeddings"])
+        }
+
+    def _collapse_listings(
+        self, docs_with_scores: List[Tuple[Document, float]], top_k: int
+    ) -> List[Tuple[Document, float]]:
+        """
+        Parent-listing layer: group ranked chunks by listing, pick `top_k`
+        distinct listings by MMR on their chunk embeddings, and merge each
+        listing's best chunks into one document carrying its metadata once.
+        """
+        groups: Dict[str, List[Tuple[int, Document, float]]] = {}
+        for rank, (doc, score) in enumerate(docs_with_scores):
+            groups.setdefault(_listing_key(doc), []).append((rank, doc, score))
+        keys = list(groups)
+        if len(keys) > top_k:
+            embeddings = self._chunk_embeddings(
+                [doc.id for doc, _ in docs_with_scores if doc.id]
+            )
+            dimension = next((len(e) for e in embeddings.values()), 0)
+            listing_vectors = np.zeros((len(keys), dimension), dtype=np.float32)
+            for row, key in enumerate(keys):
+                vectors = [
+                    embeddings[doc.id] for _, doc, _ in groups[key] if doc.id in embeddings
+                ]
+                if vectors:
+                    listing_vectors[row] = np.mean(vectors, axis=0)
+            norms = np.linalg.norm(listing_vectors, axis=1, keepdims=True)
+            listing_vectors /= np.where(norms == 0, 1.0, norms)
+            # Relevance from the best chunk's rank, so vector, BM25 and fused
+            # rankings are handled alike
+            best_ranks = np.asarray([groups[key][0][0] for key in keys], dtype=np.float32)
+            relevance = 1.0 - best_ranks / len(docs_with_scores)
+            picked = _mmr_select(relevance, listing_vectors, top_k, config.MMR_LAMBDA)
+            keys = [keys[i] for i in picked]
+
+        collapsed: List[Tuple[Document, float]] = []
+        for key in keys[:top_k]:
+            chunks = groups[key][: config.PARENT_MAX_CHUNKS]
+            _, best_doc, best_score = chunks[0]
+            merged = Document(
+                id=key,
+                page_content=_merge_chunks(
+                    [doc.page_content.strip() for _, doc, _ in chunks]
+                ),
+                metadata=best_doc.metadata,
+            )
+            collapsed.append((merged, best_score))
+        return collapsed
+
+    def _fetch_k(self, top_k: int) -> int:
+        if config.PARENT_COLLAPSE_ENABLED:
+            return top_k * config.PARENT_OVERFETCH
+        return top_k
+
+    def _search_with_embedding(
+        self,
+        query: str,
+        embedding: List[float],
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        candidate_keys: Optional[FrozenSet[str]] = None,
+        hybrid: bool = False,
+        lexical: Optional[List[Tuple[Document, float]]] = None,
+        vector: Optional[List[Tuple[Document, float]]] = None,
+    ) -> List[Tuple[Document, float]]:
+        """`vector` holds the vector hits when they were searched already."""
+        fetch_k = self._fetch_k(top_k)
+        if hybrid:
+            ranked = self._search_hybrid(
+                query, embedding, fetch_k, metadata_filter, candidate_keys, lexical, vector
+            )
+        elif vector is not None:
+            ranked = vector
+        else:
+            ranked = self._search_by_vector(
+                embedding, fetch_k, metadata_filter, candidate_keys
+            )
+        if config.PARENT_COLLAPSE_ENABLED:
+            with span("collapse"):
+                return self._collapse_listings(ranked, top_k)
+        return ranked
+
+    def _format_results(
+        self,
+        docs_with_scores: List[Tuple[Document, float]],
+        with_score: bool,
+        query: str,
+    ) -> str:
+        if not docs_with_scores:
+            return NO_DOCUMENTS_FOUND
+        docs, scores = zip(*docs_with_scores)
+        with span("context_build"):
+            return self.context_builder.build(
+                list(docs), list(scores) if with_score else None, query
+            )
+
+    def _search(
+        self,
+        query: str,
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+    ) -> List[Tuple[Document, float]]:
+        candidate_keys = self._candidate_keys(query)
+        with span("embed"):
+            embedding = self.embedding_service.embed_query(query)
+        return self._search_with_embedding(
+            query,
+            embedding,
+            top_k,
+            metadata_filter,
+            candidate_keys,
+            hybrid=self._use_hybrid(mode),
+        )
+
+    def _search_batch(
+        self,
+        queries: List[str],
+        embeddings: List[List[float]],
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """`_search` for many queries, sharing the vector search requests."""
+        candidate_keys = [self._candidate_keys(query) for query in queries]
+        hybrid = self._use_hybrid(mode)
+        fetch_k = self._fetch_k(top_k)
+        vectors = self._search_by_vector_batch(
+            embeddings,
+            max(fetch_k, config.HYBRID_CANDIDATES) if hybrid else fetch_k,
+            metadata_filter,
+            candidate_keys,
+        )
+        return [
+            self._search_with_embedding(
+                query, embedding, top_k, metadata_filter, keys, hybrid, vector=vector
+            )
+            for query, embedding, keys, vector in zip(
+                queries, embeddings, candidate_keys, vectors
+            )
+        ]
+
+    async def _aembed(self, query: str) -> List[float]:
+        with span("embed"):
+            return await self.embedding_service.aembed_query(query)
+
+    async def _asearch(
+        self,
+        query: str,
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+    ) -> List[Tuple[Document, float]]:
+        candidate_keys = self._candidate_keys(query)
+        if not self._use_hybrid(mode):
+            embedding, _ = await asyncio.gather(self._aembed(query), self.aconnect())
+            return await retrieval_executor.run(
+                self._search_with_embedding,
+                query,
+                embedding,
+                top_k,
+                metadata_filter,
+                candidate_keys,
+            )
+
+        # The lexical search runs while the query is being embedded
+        candidates = max(self._fetch_k(top_k), config.HYBRID_CANDIDATES)
+        embedding, lexical = await asyncio.gather(
+            self._aembed(query),
+            retrieval_executor.run(
+                self._search_lexical, query, candidates, metadata_filter, candidate_keys
+            ),
+        )
+        return await retrieval_executor.run(
+            self._search_with_embedding,
+            query,
+            embedding,
+            top_k,
+            metadata_filter,
+            candidate_keys,
+            True,
+            lexical,
         )
 
     def retrieve_docs(
@@ -50,14 +608,9 @@ class ChromaClientService:
         query: str,
         top_k: int = 3,
         metadata_filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
     ) -> List[Document]:
-        if self.client is None:
-            self.connect()
-
-        docs: List[Document] = self.client.similarity_search(
-            query, k=top_k, filter=(metadata_filter or None)
-        )
-        return docs
+        return [doc for doc, _ in self._search(query, top_k, metadata_filter, mode)]
 
     def retrieve_vector(
         self,
@@ -65,23 +618,58 @@ class ChromaClientService:
         top_k: int = 3,
         with_score: bool = False,
         metadata_filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
     ) -> str:
-        if self.client is None:
-            self.connect()
+        """
+        Retrieve chunks for `query`. `mode` is "hybrid" (BM25 and vector
+        search fused by RRF, scores are RRF scores) or "vector"; defaults to
+        `RETRIEVAL_MODE` and falls back to vector when no lexical index exists.
+        With `PARENT_COLLAPSE_ENABLED`, `top_k` counts distinct listings.
+        """
+        docs_with_scores = self._search(query, top_k, metadata_filter, mode)
+        return self._format_results(docs_with_scores, with_score, query)
 
-        if with_score:
-            docs_with_scores: List[Tuple[Document, float]] = (
-                self.client.similarity_search_with_score(
-                    query, k=top_k, filter=(metadata_filter or None)
-                )
-            )
-            try:
-                docs, scores = zip(*docs_with_scores)
-                return _format_docs(list(docs), list(scores))
-            except ValueError:
-                return "Không tìm thấy tài liệu phù hợp."
-        else:
-            docs: List[Document] = self.client.similarity_search(
-                query, k=top_k, filter=(metadata_filter or None)
-            )
-            return _format_docs(docs)
+    async def aretrieve_docs(
+        self,
+        query: str,
+        top_k: int = 3,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+    ) -> List[Document]:
+        docs_with_scores = await self._asearch(query, top_k, metadata_filter, mode)
+        return [doc for doc, _ in docs_with_scores]
+
+    async def aretrieve_vector(
+        self,
+        query: str,
+        top_k: int = 3,
+        with_score: bool = False,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+    ) -> str:
+        docs_with_scores = await self._asearch(query, top_k, metadata_filter, mode)
+        return self._format_results(docs_with_scores, with_score, query)
+
+    async def aretrieve_vector_batch(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        with_score: bool = False,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+    ) -> List[str]:
+        """
+        `aretrieve_vector` for many queries: their embeddings are requested
+        together and the vector searches are sent as multi-query requests.
+        """
+        if not queries:
+            return []
+        with span("embed"):
+            embeddings = await self.embedding_service.aembed_queries(queries)
+        ranked = await retrieval_executor.run(
+            self._search_batch, queries, embeddings, top_k, metadata_filter, mode
+        )
+        return [
+            self._format_results(docs_with_scores, with_score, query)
+            for docs_with_scores, query in zip(ranked, queries)
+        ]
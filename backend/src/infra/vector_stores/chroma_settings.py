@@ -0,0 +1,28 @@
+from chromadb.config import Settings
+from chromadb.telemetry.product import ProductTelemetryClient, ProductTelemetryEvent
+from overrides import override
+
+
+class NoProductTelemetry(ProductTelemetryClient):
+    """
+    Drops Chroma's product telemetry events. The default Posthog client
+    batches them in a dict without a lock, even with telemetry disabled,
+    and raises `KeyError` from queries running on several threads.
+    """
+
+    @override
+    def capture(self, event: ProductTelemetryEvent) -> None:
+        pass
+
+
+def chroma_settings() -> Settings:
+    """
+    Client settings of every Chroma collection the ingestion writes and the
+    API opens. Persistence is explicit, `Chroma` only turns it on for a
+    `persist_directory` without client settings.
+    """
+    return Settings(
+        is_persistent=True,
+        anonymized_telemetry=False,
+        chroma_product_telemetry_impl=f"{__name__}.NoProductTelemetry",
+    )
@@ -1,19 +1,80 @@
+import asyncio
+import time
 import uvicorn
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Any
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
+from src.api.admission import overloaded_handler, rate_limited_handler
+from src.api.middleware import TracingMiddleware
 from src.api.routers.api import api_router
+from src.config.config import config
 from src.config.settings import APP_CONFIGS, SETTINGS
-from src.services.application.rag import RagPipeline
+from src.services.chat_history.writer import chat_history_writer
+from src.utils.admission import Overloaded, RateLimited, admission
+from src.utils.logger import LoggerConfig
+from src.utils.tracing import metrics
 
 load_dotenv()
 
+logger = LoggerConfig(__name__).get()
+
+
+async def _start_rag_service(app: FastAPI) -> None:
+    """
+    Import and build the single `RagPipeline`, then warm it up. Each phase
+    is timed into `app.state.startup`; `/ready` passes once this returns.
+    """
+    timings: dict[str, Any] = app.state.startup
+    started = time.perf_counter()
+    try:
+        from src.services.application.rag import RagPipeline
+
+        timings["import_seconds"] = time.perf_counter() - started
+        phase_started = time.perf_counter()
+        # Builds the LLM, embedding and Chroma clients, off the event loop
+        app.state.rag_service = await asyncio.to_thread(RagPipeline)
+        timings["pipeline_seconds"] = time.perf_counter() - phase_started
+
+        if config.WARMUP_ENABLED:
+            phase_started = time.perf_counter()
+            phases = await app.state.rag_service.warm_up()
+            timings.update(
+                {f"warmup_{phase}_seconds": seconds for phase, seconds in phases.items()}
+            )
+            timings["warmup_seconds"] = time.perf_counter() - phase_started
+    except Exception as e:
+        logger.exception(f"Startup failed: {e}")
+        timings["error"] = str(e)
+        return
+    timings["total_seconds"] = time.perf_counter() - started
+    app.state.ready = True
+    logger.info(
+        "Ready in "
+        + ", ".join(
+            f"{phase}={seconds:.2f}s"
+            for phase, seconds in timings.items()
+            if isinstance(seconds, float)
+        )
+    )
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.rag_service = RagPipeline()
+    app.state.rag_service = None
+    app.state.ready = False
+    app.state.startup = {}
+    metrics.register_gauges("startup", lambda: dict(app.state.startup))
+    metrics.register_gauges("admission", admission.stats)
+    chat_history_writer.start()
+    # Serve /health (and a 503 /ready) while the pipeline starts
+    startup = asyncio.create_task(_start_rag_service(app))
     yield
+    startup.cancel()
+    # Flush pending chat history before the process exits
+    await chat_history_writer.stop()
 
 
 app = FastAPI(**APP_CONFIGS, lifespan=lifespan)
@@ -24,7 +85,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
+app.add_middleware(TracingMiddleware)
+# Fast 429 / 503 with Retry-After instead of slow timeouts under load
+app.add_exception_handler(RateLimited, rate_limited_handler)
+app.add_exception_handler(Overloaded, overloaded_handler)
 
 
 @app.get("/health")
@@ -33,8 +99,23 @@ async def healthcheck() -> dict[str, str]:
 
 
 @app.get("/ready")
-async def readycheck() -> dict[str, str]:
-    return {"status": "ok"}
+async def readycheck() -> JSONResponse:
+    """503 until the pipeline is built and warmed up, with the startup timings."""
+    if not app.state.ready:
+        state = "failed" if "error" in app.state.startup else "starting"
+        return JSONResponse(
+            {"status": state, "startup": app.state.startup},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    return JSONResponse({"status": "ok", "startup": app.state.startup})
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics() -> PlainTextResponse:
+    """Stage latency histograms, token counters and component gauges."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 app.include_router(
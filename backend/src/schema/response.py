@@ -32,3 +32,17 @@ class RagResponse(BaseModel):
             "List of real estates extracted by the model from the retrieved context."
         ),
     )
+
+
+class RagIdsResponse(BaseModel):
+    """
+    Schema representing the structured output from the RAG LLM when listings
+    are hydrated from the listing store.
+    """
+    response: str = Field(
+        description="AI response to the user's input, a brief summary of the finding."
+    )
+    ids: List[str] = Field(
+        default_factory=list,
+        description="Listing keys of the matching real estates, most relevant first.",
+    )
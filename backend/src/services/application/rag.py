@@ -1,28 +1,58 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable
 from dotenv import load_dotenv
 from langchain.tools import StructuredTool
 from src.config.config import config
 from src.constants.llm_factory import LLMFactory
+from src.infra.listing_store.listing_store import ListingStore
 from src.infra.vector_stores.chroma_client import ChromaClientService
 from src.schema.real_estate import RealEstate
 from src.schema.retrieval import SearchArgs
-from src.services.chat_history.chat_history import get_session_history
+from src.services.cache.semantic_cache import SemanticAnswerCache
+from src.services.cache.single_flight import SingleFlight, question_key
+from src.services.chat_history.chat_history import (
+    get_session_tail,
+    session_tail_cache,
+)
+from src.services.chat_history.chat_history import warm_up as warm_up_chat_history
+from src.services.chat_history.writer import chat_history_writer
 from src.services.chat_history.summarize import SummarizeChatService
 from src.services.rest_api import RestAPIGenService
+from src.services.routing.llm_router import create_llm_router
 from src.utils.logger import LoggerConfig
+from src.utils.tokens import count_tokens
+from src.utils.tokens import warm_up as warm_up_tokenizer
+from src.utils.executor import retrieval_executor
+from src.utils.tracing import metrics, span
 import os
 
 logger = LoggerConfig(__name__).get()
 
 load_dotenv()
 
+# Stored roles as LangChain message types, unknown roles count as the user's
+_MESSAGE_TYPES = {
+    "human": "human",
+    "user": "human",
+    "ai": "ai",
+    "assistant": "ai",
+    "system": "system",
+}
+
 
 class RagPipeline:
     def __init__(self):
-        MODEL_NAME = config.GROQ_MODEL
-        API_KEY = config.GROQ_API_KEY
-        self.llm = LLMFactory.create_llm(
-            llm_provider=LLMFactory.Provider.GROQ,
-            config=LLMFactory.Config(model_name=MODEL_NAME, api_key=API_KEY),
+        self.llm = create_llm_router(
+            config.LLM_PROVIDERS,
+            self._llm_configs(),
+            failure_threshold=config.LLM_BREAKER_FAILURES,
+            cooldown_seconds=config.LLM_BREAKER_COOLDOWN_SECONDS,
+            timeout=config.LLM_TIMEOUT_SECONDS,
+            hedge_enabled=config.LLM_HEDGE_ENABLED,
+            hedge_percentile=config.LLM_HEDGE_PERCENTILE,
+            hedge_min_delay=config.LLM_HEDGE_MIN_DELAY_MS / 1000,
+            hedge_max_delay=config.LLM_HEDGE_MAX_DELAY_MS / 1000,
         )
 
         self.chroma_client = ChromaClientService()
@@ -39,6 +69,7 @@ class RagPipeline:
                 "    metadata_filter (dict): filter by metadata.\n"
             ),
             func=self.chroma_client.retrieve_vector,
+            coroutine=self.chroma_client.aretrieve_vector,
             args_schema=SearchArgs,
         )
 
@@ -50,41 +81,317 @@ class RagPipeline:
             llm_with_tools=self.llm_with_tools,
             tools=self.tools,
             base_llm=self.llm,
+            listing_store=ListingStore.open(config.LISTING_STORE_PATH),
+            output_mode=config.RAG_OUTPUT_MODE,
+            routing_mode=config.ROUTING_MODE,
+            search_tool_name="search_docs",
+            context_token_budget=config.RAG_CONTEXT_TOKEN_BUDGET,
+        )
+        # The LLM only copies listing ids when results are hydrated
+        self.chroma_client.context_builder.full = (
+            not self.rest_generator_service.hydrate_results
+        )
+        self.summarize_chat_service = SummarizeChatService(llm=self.llm)
+        self._background_tasks: set[asyncio.Task] = set()
+
+        # Semantic answer cache for history-free questions
+        self.answer_cache = (
+            SemanticAnswerCache(
+                threshold=config.SEMANTIC_CACHE_THRESHOLD,
+                max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+                ttl_seconds=config.SEMANTIC_CACHE_TTL_SECONDS,
+                max_bytes=config.SEMANTIC_CACHE_MAX_BYTES,
+                version_fn=self.chroma_client.collection_version,
+            )
+            if config.SEMANTIC_CACHE_ENABLED
+            else None
+        )
+        # Identical history-free questions in flight at once share one answer
+        self.single_flight = SingleFlight() if config.SINGLE_FLIGHT_ENABLED else None
+        self._register_metrics()
+
+    def _register_metrics(self) -> None:
+        """Expose the components' own counters on `/metrics`."""
+        metrics.register_gauges("retrieval_pool", retrieval_executor.stats)
+        metrics.register_gauges("chat_history_writer", chat_history_writer.stats)
+        metrics.register_gauges("llm", self.llm.stats)
+        metrics.register_gauges(
+            "routing", lambda: dict(self.rest_generator_service.routing_stats)
+        )
+        coalescer = self.chroma_client.embedding_service.coalescer
+        if coalescer is not None:
+            metrics.register_gauges("embedding_batch", coalescer.stats)
+        if self.answer_cache is not None:
+            metrics.register_gauges("answer_cache", self.answer_cache.stats)
+        if self.single_flight is not None:
+            metrics.register_gauges("single_flight", self.single_flight.stats)
+        metrics.register_gauges("chat_history_cache", session_tail_cache.stats)
+
+    async def warm_up(self) -> dict[str, float]:
+        """
+        Load, in parallel, what the first request would otherwise wait for:
+        the Chroma collection with its HNSW, lexical and attribute indexes,
+        the tokenizer, the Bedrock client and the chat history database.
+
+        Returns the seconds each phase took. A failed phase is logged and
+        left to the first request that needs it.
+        """
+
+        async def timed(phase: str, fn: Callable[[], Any]) -> tuple[str, float]:
+            started = time.perf_counter()
+            try:
+                await retrieval_executor.run(fn)
+            except Exception as e:
+                logger.warning(f"Warm-up of {phase} failed: {e}")
+            return phase, time.perf_counter() - started
+
+        phases = await asyncio.gather(
+            timed("vector_store", self.chroma_client.warm_up),
+            timed("tokenizer", warm_up_tokenizer),
+            timed("embeddings", self.chroma_client.embedding_service.warm_up),
+            timed("chat_history", warm_up_chat_history),
         )
-        self.summarize_chat_service = SummarizeChatService()
+        return dict(phases)
+
+    @staticmethod
+    def _llm_configs() -> dict[str, LLMFactory.Config]:
+        """Client settings of every provider the router may use."""
+        common = {
+            "max_retries": config.LLM_MAX_RETRIES,
+            "timeout": config.LLM_TIMEOUT_SECONDS,
+        }
+        configs: dict[str, LLMFactory.Config] = {
+            "groq": LLMFactory.Config(
+                model_name=config.GROQ_MODEL, api_key=config.GROQ_API_KEY, **common
+            ),
+            "bedrock": LLMFactory.Config(
+                model_name=config.BEDROCK_LLM_MODEL,
+                region_name=config.BEDROCK_MODEL_REGION,
+                **common,
+            ),
+        }
+        if config.OPENAI_API_KEY:
+            configs["openai"] = LLMFactory.Config(
+                model_name=config.OPENAI_MODEL, api_key=config.OPENAI_API_KEY, **common
+            )
+        return configs
 
     def get_chat_history(self, session_id: str | None = None) -> list[dict]:
         """
-        Return chat history as a list of {role, content} dicts.
+        Return chat history as a list of {role, content} dicts: the newest
+        `CHAT_HISTORY_TAIL_MESSAGES` messages, or the rolling summary and the
+        messages after it when summaries are enabled.
         """
         if not session_id:
             return []
 
-        history = get_session_history(session_id)
+        if config.CHAT_SUMMARY_ENABLED:
+            return self._get_summarized_history(session_id)
 
-        messages: list[dict] = []
-        for msg in getattr(history, "messages", []):
-            role = getattr(msg, "type", None) or getattr(msg, "role", "")
-            content = getattr(msg, "content", "")
-            messages.append({"role": role, "content": content})
+        tail = get_session_tail(session_id)
+        return [
+            {
+                "role": _MESSAGE_TYPES.get(msg["role"].lower(), "human"),
+                "content": msg["content"],
+            }
+            for msg in tail.messages[-config.CHAT_HISTORY_TAIL_MESSAGES :]
+        ]
+
+    def _get_summarized_history(self, session_id: str) -> list[dict]:
+        """
+        Rolling summary + the most recent messages after its watermark, capped
+        to `CHAT_HISTORY_KEEP_LAST` messages and `CHAT_HISTORY_TOKEN_BUDGET` tokens.
+        """
+        tail = get_session_tail(session_id)
+        summary = tail.summary
+        recent = [msg for msg in tail.messages if msg["id"] > tail.last_message_id]
+        recent = recent[-config.CHAT_HISTORY_KEEP_LAST :]
+
+        budget = config.CHAT_HISTORY_TOKEN_BUDGET
+        summary_message = (
+            {"role": "system", "content": f"Previous conversation summary: {summary}"}
+            if summary
+            else None
+        )
+        if summary_message:
+            budget -= count_tokens(summary_message["content"])
 
-        return messages
+        # Keep the newest messages that fit the budget, at least the last one
+        kept: list[dict] = []
+        for msg in reversed(recent):
+            budget -= count_tokens(msg["content"])
+            if budget < 0 and kept:
+                break
+            kept.append({"role": msg["role"], "content": msg["content"]})
+        kept.reverse()
+
+        return ([summary_message] if summary_message else []) + kept
+
+    def _schedule_summary(self, session_id: str | None) -> None:
+        """Update the rolling summary in the background, off the response path."""
+        if not config.CHAT_SUMMARY_ENABLED or not session_id:
+            return
+        task = asyncio.create_task(self._update_summary(session_id))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _update_summary(self, session_id: str) -> None:
+        # The new turn must be on disk before it can be folded in
+        await chat_history_writer.flush()
+        await self.summarize_chat_service.summarize_incremental(
+            session_id, keep_last_msgs=config.CHAT_HISTORY_KEEP_LAST
+        )
 
     async def get_response(
         self,
         question: str,
         session_id: str | None = None,
         user_id: str | None = None,
+        prefetched: str | None = None,
     ) -> tuple[str, list[RealEstate]]:
-        chat_history = self.get_chat_history(session_id)
+        """`prefetched`: output of the search the router would run for `question`."""
+        # A store round trip on a tail cache miss, and always with Redis
+        with span("history_load"):
+            chat_history = await asyncio.to_thread(self.get_chat_history, session_id)
+
+        if self.single_flight is None or chat_history:
+            return await self._answer(
+                question, chat_history, session_id, user_id, prefetched
+            )
+        # Without history the answer only depends on the question: callers
+        # asking it while it is being answered wait for that answer, and
+        # record the turn in their own session
+        (response, results), shared = await self.single_flight.run(
+            question_key(question),
+            lambda: self._answer(question, [], session_id, user_id, prefetched),
+        )
+        if shared:
+            chat_history_writer.enqueue(session_id, "human", question)
+            chat_history_writer.enqueue(session_id, "ai", response)
+        return response, list(results)
+
+    async def _answer(
+        self,
+        question: str,
+        chat_history: list[dict],
+        session_id: str | None = None,
+        user_id: str | None = None,
+        prefetched: str | None = None,
+    ) -> tuple[str, list[RealEstate]]:
+        # Answers only depend on the question when there is no history
+        query_embedding = None
+        if self.answer_cache is not None and not chat_history:
+            with span("cache_lookup"):
+                query_embedding = (
+                    await self.chroma_client.embedding_service.aembed_query(question)
+                )
+                cached = self.answer_cache.lookup(query_embedding)
+            if cached is not None:
+                response, results = cached
+                logger.info(f"Semantic cache hit: {self.answer_cache.stats()}")
+                chat_history_writer.enqueue(session_id, "human", question)
+                chat_history_writer.enqueue(session_id, "ai", response)
+                return response, results
+
         response, results = await self.rest_generator_service.generate_rest_api(
             question=question,
             chat_history=chat_history,
             session_id=session_id,
             user_id=user_id,
+            prefetched=prefetched,
         )
         logger.info(f"RAG Response: {response}")
+        self._schedule_summary(session_id)
+
+        # Only cache grounded answers, never parse failures or out-of-scope replies
+        if query_embedding is not None and results:
+            self.answer_cache.put(query_embedding, response, results)
         return response, results
 
+    async def _prefetch_searches(self, questions: list[str]) -> list[str | None]:
+        """
+        Run the search the router asks for (`search_docs(query=<question>)`)
+        for every question at once. None for all when the search fails, each
+        question then searches on its own.
+        """
+        args = SearchArgs()
+        try:
+            with span("batch_search"):
+                return await self.chroma_client.aretrieve_vector_batch(
+                    questions,
+                    top_k=args.top_k,
+                    with_score=args.with_score,
+                    metadata_filter=args.metadata_filter,
+                )
+        except Exception as e:
+            logger.warning(f"Batch search of {len(questions)} questions failed: {e}")
+            return [None] * len(questions)
+
+    async def get_responses(
+        self,
+        requests: list[tuple[str, str | None, str | None]],
+        concurrency: int | None = None,
+        window: int | None = None,
+    ) -> AsyncIterator[tuple[int, tuple[str, list[RealEstate]] | Exception]]:
+        """
+        Answer `(question, session_id, user_id)` requests, yielding
+        `(index, (response, results))`, or `(index, exception)` when one
+        fails, in completion order.
+
+        Questions are searched `window` at a time with one batched search,
+        then go through the LLM stages with at most `concurrency` in flight.
+        The next window is searched once fewer than `window` questions wait.
+        """
+        concurrency = concurrency or config.RAG_BATCH_CONCURRENCY
+        window = window or config.RAG_BATCH_WINDOW
+        semaphore = asyncio.Semaphore(concurrency)
+        completed: asyncio.Queue = asyncio.Queue()
+        pending: set[asyncio.Task] = set()
+
+        async def answer(index: int, prefetched: str | None) -> None:
+            question, session_id, user_id = requests[index]
+            async with semaphore:
+                try:
+                    result = await self.get_response(
+                        question, session_id, user_id, prefetched=prefetched
+                    )
+                except Exception as e:
+                    result = e
+            completed.put_nowait((index, result))
+
+        async def schedule() -> None:
+            for start in range(0, len(requests), window):
+                while len(pending) >= window:
+                    await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                questions = [question for question, _, _ in requests[start : start + window]]
+                searches = await self._prefetch_searches(questions)
+                for offset, prefetched in enumerate(searches):
+                    task = asyncio.create_task(answer(start + offset, prefetched))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
 
-rag_service = RagPipeline()
+        scheduler = asyncio.create_task(schedule())
+        try:
+            for _ in range(len(requests)):
+                yield await completed.get()
+        finally:
+            scheduler.cancel()
+            for task in list(pending):
+                task.cancel()
+
+    async def get_response_stream(
+        self,
+        question: str,
+        session_id: str | None = None,
+        user_id: str | None = None,
+    ) -> AsyncIterator[tuple[str, Any]]:
+        with span("history_load"):
+            chat_history = await asyncio.to_thread(self.get_chat_history, session_id)
+        async for event in self.rest_generator_service.generate_rest_api_stream(
+            question=question,
+            chat_history=chat_history,
+            session_id=session_id,
+            user_id=user_id,
+        ):
+            yield event
+        self._schedule_summary(session_id)
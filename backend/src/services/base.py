@@ -7,6 +7,7 @@ from langchain_core.language_models.base import LanguageModelInput
 from langchain_core.messages import ToolMessage
 from abc import ABC, abstractmethod
 from src.constants.prompt import temp_userinput, temp_rag
+from src.utils.admission import Overloaded
 
 
 class BaseGenService(ABC):
@@ -67,6 +68,8 @@ class BaseGenService(ABC):
                     try:
                         output = await tool_inst.ainvoke(call_args)
                         executed_tools.append((name, call_args, output))
+                    except Overloaded:
+                        raise
                     except Exception as e:
                         output = f"[Error executing {name}: {e}]"
 
@@ -77,6 +80,8 @@ class BaseGenService(ABC):
                 try:
                     output = await tool_inst.ainvoke(payload)
                     executed_tools.append((name, payload, output))
+                except Overloaded:
+                    raise
                 except Exception as e:
                     output = f"[Error executing {name}: {e}]"
 
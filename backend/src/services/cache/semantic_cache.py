@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from src.schema.real_estate import RealEstate
+from src.utils.logger import LoggerConfig
+
+logger = LoggerConfig(__name__).get()
+
+
+@dataclass
+class _CacheEntry:
+    answer: str
+    results: List[RealEstate]
+    size_bytes: int
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache keyed by query embeddings.
+
+    Embeddings are stored L2-normalized as rows of a preallocated float32
+    matrix, so a lookup is a single matrix-vector product followed by an
+    argmax. Entries are evicted by LRU order, TTL and a global memory cap, and
+    the whole cache is dropped when `version_fn` reports a new collection
+    version (i.e. the vector store was re-ingested).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 50000,
+        ttl_seconds: float = 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+        version_fn: Optional[Callable[[], Hashable]] = None,
+        initial_capacity: int = 1024,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.version_fn = version_fn
+        self.initial_capacity = initial_capacity
+
+        self._lock = threading.Lock()
+        self._version: Hashable = self._read_version()
+        self._reset()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _reset(self) -> None:
+        self._matrix: np.ndarray | None = None
+        self._expires = np.zeros(0, dtype=np.float64)
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._free: list[int] = []
+        self._high = 0
+        self._bytes = 0
+
+    def _read_version(self) -> Hashable:
+        if self.version_fn is None:
+            return None
+        try:
+            return self.version_fn()
+        except Exception as e:
+            logger.error(f"Failed to read collection version: {e}")
+            return None
+
+    def _check_version(self) -> None:
+        version = self._read_version()
+        if version != self._version:
+            logger.info("Vector store was re-ingested, invalidating answer cache")
+            self._version = version
+            self._reset()
+            self.invalidations += 1
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def _grow(self, dimension: int) -> None:
+        if self._matrix is None:
+            capacity = min(self.initial_capacity, self.max_entries)
+            self._matrix = np.zeros((capacity, dimension), dtype=np.float32)
+            self._expires = np.zeros(capacity, dtype=np.float64)
+            return
+        capacity = min(self._matrix.shape[0] * 2, self.max_entries)
+        matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        matrix[: self._matrix.shape[0]] = self._matrix
+        expires = np.zeros(capacity, dtype=np.float64)
+        expires[: self._expires.shape[0]] = self._expires
+        self._matrix, self._expires = matrix, expires
+
+    def _remove(self, slot: int) -> None:
+        entry = self._entries.pop(slot)
+        self._expires[slot] = 0.0
+        self._bytes -= entry.size_bytes
+        self._free.append(slot)
+
+    def _evict_expired(self, now: float) -> None:
+        if not self._entries:
+            return
+        expired = np.flatnonzero(
+            (self._expires[: self._high] > 0) & (self._expires[: self._high] <= now)
+        )
+        for slot in expired.tolist():
+            self._remove(int(slot))
+            self.evictions += 1
+
+    def lookup(
+        self, embedding: Sequence[float]
+    ) -> tuple[str, List[RealEstate]] | None:
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version()
+            if (
+                self._matrix is None
+                or not self._entries
+                or self._matrix.shape[1] != query.shape[0]
+            ):
+                self.misses += 1
+                return None
+
+            scores = self._matrix[: self._high] @ query
+            # Empty and expired slots never match
+            scores[self._expires[: self._high] <= now] = -np.inf
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry = self._entries[slot]
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return entry.answer, entry.results
+
+    def put(
+        self,
+        embedding: Sequence[float],
+        answer: str,
+        results: List[RealEstate],
+    ) -> None:
+        vector = self._normalize(embedding)
+        size_bytes = (
+            vector.nbytes
+            + len(answer.encode("utf-8"))
+            + sum(len(r.model_dump_json()) for r in results)
+        )
+        if size_bytes > self.max_bytes:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._check_version()
+            if self._matrix is not None and self._matrix.shape[1] != vector.shape[0]:
+                self._reset()
+            self._evict_expired(now)
+
+            while self._entries and (
+                len(self._entries) >= self.max_entries
+                or self._bytes + size_bytes > self.max_bytes
+            ):
+                slot, _ = next(iter(self._entries.items()))
+                self._remove(slot)
+                self.evictions += 1
+
+            if self._free:
+                slot = self._free.pop()
+            else:
+                if self._matrix is None or self._high >= self._matrix.shape[0]:
+                    self._grow(vector.shape[0])
+                slot = self._high
+                self._high += 1
+
+            self._matrix[slot] = vector
+            self._expires[slot] = now + self.ttl_seconds
+            self._entries[slot] = _CacheEntry(
+                answer=answer,
+                results=results,
+                size_bytes=size_bytes,
+            )
+            self._bytes += size_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,66 @@
+import asyncio
+import re
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from src.utils.logger import LoggerConfig
+
+logger = LoggerConfig(__name__).get()
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+def question_key(question: str) -> str:
+    """Questions differing only in case, Unicode form or spacing share a key."""
+    return _SPACES_RE.sub(" ", unicodedata.normalize("NFC", question).casefold()).strip()
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+
+    The first caller starts the call as its own task and every caller
+    arriving while it runs awaits that task, so a caller that goes away
+    cancels neither the call nor the others' wait. Keys are forgotten as
+    soon as the call finishes: this de-duplicates in-flight work only, it
+    caches nothing.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.collapsed = 0
+
+    async def run(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Result of `fn()`, or of the in-flight call with the same `key`.
+        The flag is True when the result came from another caller's call.
+        """
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.collapsed += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Every caller may have gone away
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Single-flight call failed: {task.exception()}")
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.collapsed
+        return {
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "collapse_rate": (self.collapsed / calls) if calls else 0.0,
+            "in_flight": len(self._in_flight),
+        }
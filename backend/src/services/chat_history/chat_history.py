@@ -1,93 +1,207 @@
+import threading
+import time
+from collections import OrderedDict
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.messages import SystemMessage
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base
-from sqlalchemy.exc import SQLAlchemyError
+from src.config.config import config
+from src.services.chat_history.store import ChatHistoryStore, SessionTail
+
+
+def create_chat_history_store() -> ChatHistoryStore:
+    """The store selected by `CHAT_HISTORY_BACKEND`"""
+    if config.CHAT_HISTORY_BACKEND == "redis":
+        from src.services.chat_history.redis_store import RedisChatHistoryStore
+
+        return RedisChatHistoryStore.from_url(
+            config.REDIS_URL,
+            prefix=config.CHAT_HISTORY_REDIS_PREFIX,
+            ttl_seconds=config.CHAT_HISTORY_TTL_SECONDS,
+            max_messages=config.CHAT_HISTORY_REDIS_MAX_MESSAGES,
+        )
+    if config.CHAT_HISTORY_BACKEND == "sql":
+        from src.services.chat_history.sql_store import SQLAlchemyChatHistoryStore
+
+        return SQLAlchemyChatHistoryStore(config.CHAT_HISTORY_DATABASE_URL)
+    raise ValueError(f"Unknown CHAT_HISTORY_BACKEND: {config.CHAT_HISTORY_BACKEND}")
+
+
+class SessionTailCache:
+    """
+    In-process LRU of the tails of recently active sessions, so a turn reads
+    its history without a round trip to the store. Off for stores shared by
+    several nodes.
+
+    Writes of this process go through it: `save_messages` appends the
+    committed messages, `save_summary` moves the summary watermark. Entries
+    expire after `ttl_seconds` to bound staleness when several processes
+    write the same session.
+    """
+
+    def __init__(self, max_sessions: int, tail: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.tail = tail
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, SessionTail]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every write, a load that raced a write is not cached
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str) -> SessionTail | None:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                del self._entries[session_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            # A copy, writers append to the cached entry from other threads
+            return SessionTail(
+                entry.summary, entry.last_message_id, list(entry.messages), entry.loaded_at
+            )
 
-# Define the SQLite database
-DATABASE_URL = "sqlite:///chat_history.db"
-Base = declarative_base()
+    def put(self, session_id: str, tail: SessionTail, version: int) -> None:
+        """Cache `tail`, loaded when the cache was at `version`."""
+        if self.max_sessions <= 0:
+            return
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[session_id] = tail
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def append(self, items: list[tuple[str, dict]]) -> None:
+        """
+        Add committed `(session_id, message)` items to the cached tails.
+        A tail loaded after the commit already holds them and is skipped.
+        """
+        with self._lock:
+            self.version += 1
+            for session_id, message in items:
+                entry = self._entries.get(session_id)
+                if entry is None:
+                    continue
+                if entry.messages and message["id"] <= entry.messages[-1]["id"]:
+                    continue
+                entry.messages.append(message)
+                del entry.messages[: -self.tail]
+
+    def set_summary(self, session_id: str, summary: str, last_message_id: int) -> None:
+        with self._lock:
+            self.version += 1
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.summary = summary
+                entry.last_message_id = last_message_id
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+def _cached_sessions(store: ChatHistoryStore) -> int:
+    return 0 if store.shared else config.CHAT_HISTORY_CACHE_SESSIONS
+
+
+chat_history_store = create_chat_history_store()
+
+session_tail_cache = SessionTailCache(
+    max_sessions=_cached_sessions(chat_history_store),
+    tail=max(config.CHAT_HISTORY_TAIL_MESSAGES, config.CHAT_HISTORY_KEEP_LAST),
+    ttl_seconds=config.CHAT_HISTORY_CACHE_TTL_SECONDS,
+)
+
+
+def use_store(store: ChatHistoryStore) -> None:
+    """Replace the chat history store, e.g. by a fake one in benchmarks."""
+    global chat_history_store
+    chat_history_store = store
+    session_tail_cache.clear()
+    session_tail_cache.max_sessions = _cached_sessions(store)
+
+
+def warm_up() -> None:
+    chat_history_store.warm_up()
+
+
+def save_messages(items: list[tuple[str, str, str]]):
+    """
+    Persist `(session_id, role, content)` items in a single round trip
+    and append them to the cached session tails.
+    """
+    if not items:
+        return
+    session_tail_cache.append(chat_history_store.save_messages(items))
 
 
-class Session(Base):
-    __tablename__ = "sessions"
-    id = Column(Integer, primary_key=True)
-    session_id = Column(String, unique=True, nullable=False)
-    messages = relationship("Message", back_populates="session")
+def save_message(session_id: str, role: str, content: str):
+    save_messages([(session_id, role, content)])
 
 
-class Message(Base):
-    __tablename__ = "messages"
-    id = Column(Integer, primary_key=True)
-    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
-    role = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
-    session = relationship("Session", back_populates="messages")
+def load_session_messages(session_id: str, after_id: int = 0) -> list[dict]:
+    """Messages of a session with `id > after_id`, as `{id, role, content}` dicts"""
+    return chat_history_store.load_session_messages(session_id, after_id)
 
 
-engine = create_engine(DATABASE_URL)
-Base.metadata.create_all(engine)
-SessionLocal = sessionmaker(bind=engine)
+def load_session_tail(session_id: str, limit: int) -> SessionTail:
+    """Newest `limit` messages of a session and its summary"""
+    return chat_history_store.load_session_tail(session_id, limit)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def get_session_tail(session_id: str) -> SessionTail:
+    """
+    `load_session_tail` through the session tail cache. A failed load raises
+    and caches nothing.
+    """
+    tail = session_tail_cache.get(session_id)
+    if tail is None:
+        version = session_tail_cache.version
+        tail = load_session_tail(session_id, session_tail_cache.tail)
+        session_tail_cache.put(session_id, tail, version)
+    return tail
 
 
-def save_message(session_id: str, role: str, content: str):
-    db = SessionLocal()
-    try:
-        session = db.query(Session).filter(Session.session_id == session_id).first()
-        if not session:
-            session = Session(session_id=session_id)
-            db.add(session)
-            db.commit()
-            db.refresh(session)
-
-        # Add message to the session
-        db.add(Message(session_id=session.id, role=role, content=content))
-        db.commit()
-
-    except SQLAlchemyError as e:
-        db.rollback()
-        raise e
-    finally:
-        db.close()
+def load_summary(session_id: str) -> tuple[str, int] | None:
+    """Return `(summary, last_message_id)` of a session, None if not summarized yet"""
+    return chat_history_store.load_summary(session_id)
+
+
+def save_summary(session_id: str, summary: str, last_message_id: int):
+    chat_history_store.save_summary(session_id, summary, last_message_id)
+    session_tail_cache.set_summary(session_id, summary, last_message_id)
 
 
 def load_session_history(session_id: str) -> BaseChatMessageHistory:
-    db = SessionLocal()
     chat_history = ChatMessageHistory()
-    try:
-        session = db.query(Session).filter(Session.session_id == session_id).first()
-        if session:
-            messages = (
-                db.query(Message)
-                .filter(Message.session_id == session.id)
-                .order_by(Message.id)
-                .all()
-            )
-            for message in messages:
-                role = (message.role or "").lower()
-                content = message.content or ""
-                if role == "human" or role == "user":
-                    chat_history.add_user_message(content)
-                elif role == "ai" or role == "assistant":
-                    chat_history.add_ai_message(content)
-                elif role == "system":
-                    chat_history.add_message(SystemMessage(content=content))
-                else:
-                    chat_history.add_user_message(content)
-
-    except SQLAlchemyError:
-        pass
-    finally:
-        db.close()
+    for message in load_session_messages(session_id):
+        role = (message["role"] or "").lower()
+        content = message["content"] or ""
+        if role == "human" or role == "user":
+            chat_history.add_user_message(content)
+        elif role == "ai" or role == "assistant":
+            chat_history.add_ai_message(content)
+        elif role == "system":
+            chat_history.add_message(SystemMessage(content=content))
+        else:
+            chat_history.add_user_message(content)
     return chat_history
 
 
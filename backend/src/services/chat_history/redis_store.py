@@ -0,0 +1,136 @@
+import json
+import time
+from collections import defaultdict
+
+from src.services.chat_history.store import ChatHistoryStore, SessionTail
+from src.utils.logger import LoggerConfig
+
+logger = LoggerConfig(__name__).get()
+
+
+class RedisChatHistoryStore(ChatHistoryStore):
+    """
+    Chat history in Redis, shared by every node of a deployment.
+
+    A session is three keys: a list of JSON messages, an id counter and a
+    summary hash. Every write refreshes the expiry of all three, so a
+    session lives `ttl_seconds` after its last activity, and the list is
+    trimmed to its newest `max_messages`. Keys carry the session id as hash
+    tag and stay in one slot on Redis Cluster.
+
+    `client` is anything speaking the redis-py API with `decode_responses=True`.
+    """
+
+    shared = True
+
+    def __init__(self, client, prefix: str = "chat", ttl_seconds: int = 0, max_messages: int = 0):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisChatHistoryStore":
+        import redis
+
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+
+    def _keys(self, session_id: str) -> tuple[str, str, str]:
+        base = f"{self.prefix}:{{{session_id}}}"
+        return f"{base}:messages", f"{base}:seq", f"{base}:summary"
+
+    def _touch(self, pipe, keys) -> None:
+        if self.ttl_seconds > 0:
+            for key in keys:
+                pipe.expire(key, self.ttl_seconds)
+
+    def warm_up(self) -> None:
+        self.client.ping()
+
+    def save_messages(self, items: list[tuple[str, str, str]]) -> list[tuple[str, dict]]:
+        """
+        Persist `(session_id, role, content)` items in two pipelined round
+        trips: one reserving a block of ids per session, one pushing them.
+        """
+        if not items:
+            return []
+        by_session: dict[str, list[tuple[str, str]]] = defaultdict(list)
+        for session_id, role, content in items:
+            by_session[session_id].append((role, content))
+
+        pipe = self.client.pipeline(transaction=False)
+        for session_id, messages in by_session.items():
+            pipe.incrby(self._keys(session_id)[1], len(messages))
+        last_ids = pipe.execute()
+
+        next_id = {}
+        pipe = self.client.pipeline(transaction=False)
+        for (session_id, messages), last_id in zip(by_session.items(), last_ids):
+            messages_key, seq_key, summary_key = self._keys(session_id)
+            first_id = int(last_id) - len(messages) + 1
+            next_id[session_id] = first_id
+            pipe.rpush(
+                messages_key,
+                *(
+                    json.dumps({"id": first_id + i, "role": role, "content": content})
+                    for i, (role, content) in enumerate(messages)
+                ),
+            )
+            if self.max_messages > 0:
+                pipe.ltrim(messages_key, -self.max_messages, -1)
+            self._touch(pipe, (messages_key, seq_key, summary_key))
+        pipe.execute()
+
+        saved = []
+        for session_id, role, content in items:
+            saved.append(
+                (session_id, {"id": next_id[session_id], "role": role, "content": content})
+            )
+            next_id[session_id] += 1
+        return saved
+
+    def load_session_messages(self, session_id: str, after_id: int = 0) -> list[dict]:
+        try:
+            entries = self.client.lrange(self._keys(session_id)[0], 0, -1)
+        except Exception as e:
+            logger.warning(f"Failed to load messages of session {session_id}: {e}")
+            return []
+        messages = [json.loads(entry) for entry in entries]
+        return [message for message in messages if message["id"] > after_id]
+
+    def load_session_tail(self, session_id: str, limit: int) -> SessionTail:
+        """Newest `limit` messages of a session and its summary, in one round trip"""
+        messages_key, _, summary_key = self._keys(session_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lrange(messages_key, -limit, -1)
+        pipe.hgetall(summary_key)
+        entries, summary = pipe.execute()
+        return SessionTail(
+            summary=summary.get("summary", ""),
+            last_message_id=int(summary.get("last_message_id", 0)),
+            messages=[json.loads(entry) for entry in entries],
+        )
+
+    def load_summary(self, session_id: str) -> tuple[str, int] | None:
+        try:
+            summary = self.client.hgetall(self._keys(session_id)[2])
+        except Exception as e:
+            logger.warning(f"Failed to load the summary of session {session_id}: {e}")
+            return None
+        if not summary:
+            return None
+        return summary["summary"], int(summary["last_message_id"])
+
+    def save_summary(self, session_id: str, summary: str, last_message_id: int) -> None:
+        keys = self._keys(session_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(
+            keys[2],
+            mapping={
+                "summary": summary,
+                "last_message_id": last_message_id,
+                "updated_at": time.time(),
+            },
+        )
+        self._touch(pipe, keys)
+        pipe.execute()
@@ -0,0 +1,204 @@
+from datetime import datetime, timezone
+from sqlalchemy import (
+    create_engine,
+    DateTime,
+    event,
+    select,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker, relationship, declarative_base
+from sqlalchemy.exc import SQLAlchemyError
+from src.services.chat_history.store import ChatHistoryStore, SessionTail
+
+Base = declarative_base()
+
+
+class Session(Base):
+    __tablename__ = "sessions"
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, unique=True, nullable=False)
+    messages = relationship("Message", back_populates="session")
+
+
+class Message(Base):
+    __tablename__ = "messages"
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
+    role = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    session = relationship("Session", back_populates="messages")
+
+    # Serves "messages of a session in insertion order" without a table scan
+    __table_args__ = (Index("ix_messages_session_id_id", "session_id", "id"),)
+
+
+class SessionSummary(Base):
+    """Rolling summary of a session, covering every message up to `last_message_id`"""
+
+    __tablename__ = "session_summaries"
+    session_id = Column(String, primary_key=True)
+    summary = Column(Text, nullable=False)
+    last_message_id = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+class SQLAlchemyChatHistoryStore(ChatHistoryStore):
+    """
+    Chat history in a relational database: a SQLite file per node by
+    default, or a PostgreSQL database shared by every node.
+    """
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url)
+        self.shared = self.engine.dialect.name != "sqlite"
+        if not self.shared:
+            event.listen(self.engine, "connect", _set_sqlite_pragmas)
+        # Upserts below use ON CONFLICT, spelled alike by both dialects
+        self._insert = (
+            postgresql_insert if self.engine.dialect.name == "postgresql" else sqlite_insert
+        )
+        Base.metadata.create_all(self.engine)
+        # `create_all` skips indexes of tables that already exist
+        for index in Message.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        self.SessionLocal = sessionmaker(bind=self.engine)
+
+    def warm_up(self) -> None:
+        """Open the first pooled connection, applying the SQLite pragmas."""
+        with self.engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+
+    def save_messages(self, items: list[tuple[str, str, str]]) -> list[tuple[str, dict]]:
+        """
+        Persist `(session_id, role, content)` items in a single transaction.
+        Missing sessions are upserted, so a batch costs one commit.
+        """
+        if not items:
+            return []
+        db = self.SessionLocal()
+        try:
+            session_ids = list(dict.fromkeys(session_id for session_id, _, _ in items))
+            db.execute(
+                self._insert(Session)
+                .values([{"session_id": session_id} for session_id in session_ids])
+                .on_conflict_do_nothing(index_elements=["session_id"])
+            )
+            pk_by_session_id = dict(
+                db.execute(
+                    select(Session.session_id, Session.id).where(
+                        Session.session_id.in_(session_ids)
+                    )
+                ).all()
+            )
+
+            # Add messages to their sessions
+            rows = [
+                Message(
+                    session_id=pk_by_session_id[session_id], role=role, content=content
+                )
+                for session_id, role, content in items
+            ]
+            db.add_all(rows)
+            db.flush()
+            saved = [
+                (session_id, {"id": row.id, "role": role, "content": content})
+                for (session_id, role, content), row in zip(items, rows)
+            ]
+            db.commit()
+            return saved
+
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
+    def load_session_messages(self, session_id: str, after_id: int = 0) -> list[dict]:
+        db = self.SessionLocal()
+        try:
+            rows = db.execute(
+                select(Message.id, Message.role, Message.content)
+                .join(Session, Session.id == Message.session_id)
+                .where(Session.session_id == session_id, Message.id > after_id)
+                .order_by(Message.id)
+            ).all()
+            return [
+                {"id": id, "role": role, "content": content} for id, role, content in rows
+            ]
+        except SQLAlchemyError:
+            return []
+        finally:
+            db.close()
+
+    def load_session_tail(self, session_id: str, limit: int) -> SessionTail:
+        """
+        Newest `limit` messages of a session and its summary, read backwards
+        along `ix_messages_session_id_id` instead of loading the whole session.
+        """
+        db = self.SessionLocal()
+        try:
+            rows = db.execute(
+                select(Message.id, Message.role, Message.content)
+                .join(Session, Session.id == Message.session_id)
+                .where(Session.session_id == session_id)
+                .order_by(Message.id.desc())
+                .limit(limit)
+            ).all()
+            summary = db.get(SessionSummary, session_id)
+            return SessionTail(
+                summary=summary.summary if summary else "",
+                last_message_id=summary.last_message_id if summary else 0,
+                messages=[
+                    {"id": id, "role": role, "content": content}
+                    for id, role, content in reversed(rows)
+                ],
+            )
+        finally:
+            db.close()
+
+    def load_summary(self, session_id: str) -> tuple[str, int] | None:
+        db = self.SessionLocal()
+        try:
+            row = db.get(SessionSummary, session_id)
+            return (row.summary, row.last_message_id) if row else None
+        except SQLAlchemyError:
+            return None
+        finally:
+            db.close()
+
+    def save_summary(self, session_id: str, summary: str, last_message_id: int) -> None:
+        db = self.SessionLocal()
+        try:
+            values = {
+                "session_id": session_id,
+                "summary": summary,
+                "last_message_id": last_message_id,
+                "updated_at": datetime.now(timezone.utc),
+            }
+            db.execute(
+                self._insert(SessionSummary)
+                .values(**values)
+                .on_conflict_do_update(index_elements=["session_id"], set_=values)
+            )
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
@@ -0,0 +1,56 @@
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SessionTail:
+    """Newest messages of a session (`{id, role, content}`, oldest first) and its summary"""
+
+    summary: str = ""
+    last_message_id: int = 0
+    messages: list[dict] = field(default_factory=list)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+class ChatHistoryStore(ABC):
+    """
+    Where chat messages and rolling summaries are kept.
+
+    Messages get ids increasing in insertion order within their session,
+    summaries record the id of the last message they cover. Write failures
+    and failed tail loads raise, other read failures return empty results:
+    a tail is cached and decides whether an answer can be shared, an empty
+    one must mean an empty session.
+    """
+
+    # Whether other nodes write the same sessions: their tails must not be
+    # cached in process, writes elsewhere would not show up
+    shared: bool = False
+
+    @abstractmethod
+    def warm_up(self) -> None:
+        """Open the connection (pool) before the first request needs it."""
+
+    @abstractmethod
+    def save_messages(self, items: list[tuple[str, str, str]]) -> list[tuple[str, dict]]:
+        """
+        Persist `(session_id, role, content)` items in one round trip,
+        returning the saved `(session_id, {id, role, content})` messages.
+        """
+
+    @abstractmethod
+    def load_session_messages(self, session_id: str, after_id: int = 0) -> list[dict]:
+        """Messages of a session with `id > after_id`, as `{id, role, content}` dicts"""
+
+    @abstractmethod
+    def load_session_tail(self, session_id: str, limit: int) -> SessionTail:
+        """Newest `limit` messages of a session and its summary, raises when unreadable"""
+
+    @abstractmethod
+    def load_summary(self, session_id: str) -> tuple[str, int] | None:
+        """Return `(summary, last_message_id)` of a session, None if not summarized yet"""
+
+    @abstractmethod
+    def save_summary(self, session_id: str, summary: str, last_message_id: int) -> None:
+        """Replace the summary of a session."""
@@ -1,18 +1,79 @@
+import asyncio
+from langchain_core.language_models.base import LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
 from src.config.config import config
 from src.constants.llm_factory import LLMFactory
+from src.constants.prompt import SUMMARY_TEXT
+from src.services.chat_history.chat_history import (
+    load_session_messages,
+    load_summary,
+    save_summary,
+)
 from src.utils.logger import LoggerConfig
 
 logger = LoggerConfig(__name__).get()
 
 
 class SummarizeChatService:
-    def __init__(self):
-        MODEL_NAME = config.GROQ_MODEL
-        API_KEY = config.GROQ_API_KEY
-        self.llm = LLMFactory.create_llm(
-            llm_provider=LLMFactory.Provider.GROQ,
-            config=LLMFactory.Config(model_name=MODEL_NAME, api_key=API_KEY),
-        )
+    def __init__(self, llm: Runnable[LanguageModelInput, BaseMessage] | None = None):
+        # Share the caller's chat model (and its HTTP clients) when given one
+        if llm is None:
+            llm = LLMFactory.create_llm(
+                llm_provider=LLMFactory.Provider.GROQ,
+                config=LLMFactory.Config(
+                    model_name=config.GROQ_MODEL, api_key=config.GROQ_API_KEY
+                ),
+            )
+        self.llm = llm
+        # Sessions with a summarization in flight
+        self._running: set[str] = set()
+
+    async def summarize_incremental(
+        self, session_id: str, keep_last_msgs: int = 6
+    ) -> str | None:
+        """
+        Fold the messages newer than the stored watermark, except the last
+        `keep_last_msgs` ones, into the persisted summary of the session.
+        Only the new messages are sent to the LLM.
+        """
+        if session_id in self._running:
+            return None
+        self._running.add(session_id)
+        try:
+            stored = await asyncio.to_thread(load_summary, session_id)
+            summary, watermark = stored if stored else ("", 0)
+
+            new_msgs = await asyncio.to_thread(
+                load_session_messages, session_id, watermark
+            )
+            to_fold = new_msgs[:-keep_last_msgs] if keep_last_msgs else new_msgs
+            if not to_fold:
+                return summary or None
+
+            summary_prompt = SUMMARY_TEXT.format(
+                summary=summary or "(empty)",
+                messages="\n".join(
+                    f"{msg['role'].capitalize()}: {msg['content']}" for msg in to_fold
+                ),
+            )
+            summary_msg = await self.llm.ainvoke(summary_prompt)
+            new_summary = str(
+                summary_msg.content if hasattr(summary_msg, "content") else summary_msg
+            ).strip()
+
+            await asyncio.to_thread(
+                save_summary, session_id, new_summary, to_fold[-1]["id"]
+            )
+            logger.info(
+                f"Folded {len(to_fold)} messages into the summary of session {session_id}"
+            )
+            return new_summary
+        except Exception as e:
+            logger.error(f"Error to update rolling summary: {e}")
+            return None
+        finally:
+            self._running.discard(session_id)
 
     def summarize_and_truncate_history(
         self,
@@ -0,0 +1,121 @@
+import asyncio
+
+from src.config.config import config
+from src.services.chat_history.chat_history import save_messages
+from src.utils.logger import LoggerConfig
+from src.utils.tracing import span
+
+logger = LoggerConfig(__name__).get()
+
+
+class ChatHistoryWriter:
+    """
+    Write-behind chat history writer.
+
+    Request handlers only enqueue messages; a background task drains the
+    queue and group-commits up to `batch_size` messages per transaction on a
+    worker thread, so the event loop never waits on disk. Messages are
+    written in enqueue order.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 64,
+        flush_interval: float = 0.05,
+        max_queue_size: int = 10000,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run(), name="chat-history-writer")
+
+    def enqueue(self, session_id: str, role: str, content: str) -> None:
+        if not self.running:
+            self.start()
+        try:
+            self._queue.put_nowait((session_id, role, content))
+        except asyncio.QueueFull:
+            logger.error("Chat history queue is full, dropping message")
+            self.failed += 1
+
+    async def _next_batch(self) -> list[tuple[str, str, str]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _write(self, batch: list[tuple[str, str, str]]) -> None:
+        try:
+            # Off the request path, only the stage histogram sees it
+            with span("history_write"):
+                await asyncio.to_thread(save_messages, batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} chat messages: {e}")
+            self.failed += len(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            await self._write(batch)
+
+    async def flush(self) -> None:
+        """Wait until every enqueued message has been written."""
+        if self.running:
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        """Flush pending messages and stop the background task."""
+        if not self.running:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
+
+
+chat_history_writer = ChatHistoryWriter(
+    batch_size=config.CHAT_HISTORY_BATCH_SIZE,
+    flush_interval=config.CHAT_HISTORY_FLUSH_INTERVAL_MS / 1000,
+)
@@ -1,28 +1,73 @@
+import asyncio
 import json
-from typing import List
+from collections import Counter
+from typing import Any, AsyncIterator, List
+from uuid import uuid4
 from groq import BadRequestError
-from langchain_core.messages import BaseMessage, ToolMessage
-from src.constants.prompt import RAG_STRUCTURED_SUFFIX
+from langchain.tools import StructuredTool
+from langchain_core.language_models.base import LanguageModelInput
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.runnables import Runnable
+from src.constants.prompt import RAG_HYDRATE_SUFFIX, RAG_STRUCTURED_SUFFIX
+from src.infra.listing_store.listing_store import ListingStore
 from src.schema.real_estate import RealEstate
-from src.schema.response import RagResponse
+from src.schema.response import RagIdsResponse, RagResponse
 from src.services.base import BaseGenService
-from src.services.chat_history.chat_history import save_message
+from src.services.chat_history.writer import chat_history_writer
+from src.services.routing.intent_classifier import (
+    CHITCHAT,
+    SEARCH,
+    IntentClassifier,
+)
+from src.utils.admission import Overloaded, admission
+from src.utils.json_stream import StructuredOutputStreamParser
 from src.utils.logger import LoggerConfig
+from src.utils.tokens import count_tokens, truncate_to_tokens
+from src.utils.tracing import record_tokens, span
 
 logger = LoggerConfig(__name__).get()
 
 
-def build_context(messages: List[BaseMessage]) -> str:
+def build_context(messages: List[BaseMessage], token_budget: int | None = None) -> str:
     tool_chunks = []
     for m in messages:
         if isinstance(m, ToolMessage):
             tool_chunks.append(str(m.content))
     context_str = "\n\n--- Retrieved Documents ---\n\n".join(tool_chunks)
+    # Each search result fits the budget on its own, several may not
+    if token_budget is not None:
+        context_str = truncate_to_tokens(context_str, token_budget)
     return context_str
 
 
 class RestAPIGenService(BaseGenService):
     """Generator service for REST API"""
+
+    def __init__(
+        self,
+        llm_with_tools: Runnable[LanguageModelInput, BaseMessage],
+        tools: dict[str, StructuredTool],
+        base_llm: Runnable[LanguageModelInput, BaseMessage] | None = None,
+        listing_store: ListingStore | None = None,
+        output_mode: str = "full",
+        routing_mode: str = "llm",
+        search_tool_name: str = "search_docs",
+        classifier: IntentClassifier | None = None,
+        context_token_budget: int | None = None,
+    ):
+        super().__init__(llm_with_tools=llm_with_tools, tools=tools, base_llm=base_llm)
+        self.listing_store = listing_store
+        # Hydrate results from the listing store when it is available, the LLM
+        # then only generates the summary and the listing ids
+        self.hydrate_results = output_mode == "hydrate" and listing_store is not None
+        # The routing prompt asks for `search_docs(query=<question>)`, so that
+        # search can start before (or instead of) the routing LLM call
+        self.routing_mode = routing_mode
+        self.search_tool_name = search_tool_name
+        self.classifier = classifier or IntentClassifier()
+        self.routing_stats: Counter = Counter()
+        self.context_token_budget = context_token_budget
+
     async def _initial_llm_call(
         self,
         question: str,
@@ -38,67 +83,222 @@ class RestAPIGenService(BaseGenService):
         messages = self.prompt_userinput.format_messages(
             question=question, chat_history=formatted_history
         )
-        logger.info(f"Messages: {messages}")
-        try:
-            ai_msg = await self.llm_with_tools.ainvoke(messages)
-        except BadRequestError as e:
-            logger.error(
-                f"Tool calling failed with GROQ, falling back to base LLM: {e}"
-            )
-            ai_msg = await self.llm.ainvoke(messages)
+        logger.debug(f"Messages: {messages}")
+        async with admission.stage("route_llm"):
+            with span("route_llm"):
+                try:
+                    ai_msg = await self.llm_with_tools.ainvoke(messages)
+                except BadRequestError as e:
+                    logger.error(
+                        f"Tool calling failed with GROQ, falling back to base LLM: {e}"
+                    )
+                    ai_msg = await self.llm.ainvoke(messages)
+        record_tokens("route_llm", messages, ai_msg)
 
-        logger.info(f"AI Message: {ai_msg}")
+        logger.debug(f"AI Message: {ai_msg}")
 
         return ai_msg, messages
 
+    def _speculative_args(self, question: str) -> dict:
+        """Arguments the routing prompt tells the LLM to call the search tool with."""
+        return {"query": question}
+
+    def _matches_speculation(self, tool_calls: list, question: str) -> bool:
+        """Whether the routed tool calls are exactly the speculative search."""
+        if len(tool_calls) != 1:
+            return False
+        if tool_calls[0]["name"].lower() != self.search_tool_name:
+            return False
+        args_schema = self.tools[self.search_tool_name].args_schema
+        try:
+            routed = args_schema.model_validate(tool_calls[0]["args"])
+        except Exception:
+            return False
+        expected = args_schema.model_validate(self._speculative_args(question))
+        routed.query = routed.query.strip()
+        expected.query = expected.query.strip()
+        return routed == expected
+
+    def _local_route(self, question: str) -> AIMessage:
+        """The search tool call the routing LLM would make for `question`."""
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": self.search_tool_name,
+                    "args": self._speculative_args(question),
+                    "id": f"local-{uuid4().hex[:12]}",
+                }
+            ],
+        )
+
     async def _create_message(
         self,
         question: str,
         chat_history: list[dict],
         session_id: str | None = None,
         user_id: str | None = None,
+        prefetched: str | None = None,
     ):
+        """
+        `prefetched` is the output of the speculative search, when it was
+        already run (e.g. for a whole batch of questions at once).
+        """
+        intent = None
+        if self.routing_mode == "classifier":
+            intent = self.classifier.classify(question, chat_history)
+            logger.info(f"Intent: {intent}")
+            if intent.label == SEARCH:
+                self.routing_stats["classifier_skips"] += 1
+                ai_msg = self._local_route(question)
+                messages = self.prompt_userinput.format_messages(
+                    question=question,
+                    chat_history="\n".join(
+                        f"{msg['role'].capitalize()}: {msg['content']}"
+                        for msg in chat_history
+                    ),
+                )
+                messages.append(ai_msg)
+                if prefetched is not None:
+                    messages.append(
+                        ToolMessage(
+                            content=prefetched, tool_call_id=ai_msg.tool_calls[0]["id"]
+                        )
+                    )
+                    return True, messages
+                with span("tools"):
+                    messages = await self._execute_tools(
+                        ai_msg.tool_calls, messages, session_id, user_id
+                    )
+                return True, messages
+
+        speculation = None
+        if prefetched is not None:
+            speculation = asyncio.get_running_loop().create_future()
+            speculation.set_result(prefetched)
+        # Small talk almost never searches, don't spend a query on it
+        elif self.routing_mode in ("speculative", "classifier") and (
+            intent is None or intent.label != CHITCHAT
+        ):
+            # Search while the routing LLM decides whether to search
+            speculation = asyncio.create_task(
+                self.tools[self.search_tool_name].ainvoke(
+                    self._speculative_args(question)
+                )
+            )
+            # A discarded speculation must not log "exception never retrieved"
+            speculation.add_done_callback(lambda t: t.cancelled() or t.exception())
+
         # Phase 1: Initial LLM call with chat history
-        ai_msg, messages = await self._initial_llm_call(
-            question, chat_history, session_id, user_id
-        )
+        try:
+            ai_msg, messages = await self._initial_llm_call(
+                question, chat_history, session_id, user_id
+            )
+        except BaseException:
+            if speculation is not None:
+                speculation.cancel()
+            raise
         messages.append(ai_msg)
         tool_calls = ai_msg.tool_calls
         logger.info(f"Tool calls: {tool_calls}")
         if not tool_calls:
+            if speculation is not None:
+                speculation.cancel()
+                self.routing_stats["speculation_wasted"] += 1
             # No tool calls, return respone directly
             answer = self.clear_think.sub("", ai_msg.content).strip()
             return False, answer
 
         # Phase 2: Executed tools
-        messages = await self._execute_tools(tool_calls, messages, session_id, user_id)
+        if speculation is not None and self._matches_speculation(tool_calls, question):
+            self.routing_stats["speculation_hits"] += 1
+            try:
+                # Only the time still spent waiting for the search
+                with span("tools"):
+                    output = await speculation
+            except Overloaded:
+                raise
+            except Exception as e:
+                output = f"[Error executing {self.search_tool_name}: {e}]"
+            messages.append(
+                ToolMessage(content=output, tool_call_id=tool_calls[0].get("id"))
+            )
+            return True, messages
+
+        if speculation is not None:
+            speculation.cancel()
+            self.routing_stats["speculation_misses"] += 1
+        with span("tools"):
+            messages = await self._execute_tools(
+                tool_calls, messages, session_id, user_id
+            )
 
         return True, messages
 
-    async def _rag_generation(
+    def _build_rag_prompt(
         self,
         messages: list,
         question: str,
         chat_history: list[dict],
-        session_id: str | None = None,
-        user_id: str | None = None,
-    ) -> tuple[str, list[RealEstate]]:
-        """Phase 3: RAG generation with context from tools"""
-        context_str = build_context(messages)
+    ) -> str:
+        context_str = build_context(messages, self.context_token_budget)
+        history_str = "\n".join(
+            f"{msg['role'].capitalize()}: {msg['content']}" for msg in chat_history
+        )
 
         # RAG prompt with context
         base_prompt = self.prompt_rag.format(
-            chat_history="\n".join(
-                f"{msg['role'].capitalize()}: {msg['content']}" for msg in chat_history
-            ),
+            chat_history=history_str,
             question=question,
             context=context_str,
         )
         # Structured prompt
-        final_prompt = f"{base_prompt}\n\n{RAG_STRUCTURED_SUFFIX}"
+        suffix = RAG_HYDRATE_SUFFIX if self.hydrate_results else RAG_STRUCTURED_SUFFIX
+        final_prompt = f"{base_prompt}\n\n{suffix}"
+        logger.info(
+            f"RAG prompt tokens: {count_tokens(final_prompt)} "
+            f"(context {count_tokens(context_str)}, history {count_tokens(history_str)})"
+        )
+        return final_prompt
+
+    def _parse_rag_output(self, response_text: str) -> tuple[str, list[RealEstate]]:
+        with span("parse"):
+            return self._parse_rag_json(response_text)
+
+    def _parse_rag_json(self, response_text: str) -> tuple[str, list[RealEstate]]:
+        try:
+            response_json = json.loads(response_text)
+            if self.hydrate_results:
+                ids_output = RagIdsResponse.model_validate(response_json)
+                answer = ids_output.response
+                results = self.listing_store.hydrate(ids_output.ids)
+            else:
+                rag_output = RagResponse.model_validate(response_json)
+                answer = rag_output.response
+                results = rag_output.result
+        except Exception as e:
+            logger.error(f"Failed to parse structured RAG output as JSON: {e}")
+            answer = response_text
+            results = []
+        return answer, results
+
+    async def _rag_generation(
+        self,
+        messages: list,
+        question: str,
+        chat_history: list[dict],
+        session_id: str | None = None,
+        user_id: str | None = None,
+    ) -> tuple[str, list[RealEstate]]:
+        """Phase 3: RAG generation with context from tools"""
+        with span("context_build"):
+            final_prompt = self._build_rag_prompt(messages, question, chat_history)
 
         # Parse response as structured RAG output
-        llm_response = await self.llm.ainvoke(final_prompt)
+        async with admission.stage("rag_llm"):
+            with span("rag_llm"):
+                llm_response = await self.llm.ainvoke(final_prompt)
+        record_tokens("rag_llm", final_prompt, llm_response)
         raw_content = (
             llm_response.content
             if isinstance(llm_response.content, str)
@@ -106,36 +306,88 @@ class RestAPIGenService(BaseGenService):
         )
         response_text = self.clear_think.sub("", raw_content).strip()
 
-        # Cleaning
-        #response_text = response_text.replace("```json", "").replace("```", "")
-        
-        print("*" * 30)
-        print(response_text)
-        print("*" * 30)
-        try:
-            response_json = json.loads(response_text)
-            rag_output = RagResponse.model_validate(response_json)
-            answer = rag_output.response
-            results = rag_output.result
-        except Exception as e:
-            logger.error(f"Failed to parse structured RAG output as JSON: {e}")
-            answer = response_text
-            results = []
+        logger.debug(f"RAG output: {response_text}")
+        answer, results = self._parse_rag_output(response_text)
 
         logger.info(f"Answer: {answer}")
-        logger.info(f"Results: {results}")
+        logger.debug(f"Results: {results}")
         return answer, results
 
+    async def _rag_generation_stream(
+        self,
+        messages: list,
+        question: str,
+        chat_history: list[dict],
+        session_id: str | None = None,
+        user_id: str | None = None,
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Phase 3 (streaming): yield `("token", delta)` for the `response` text
+        and `("real_estate", RealEstate)` for each `result` element as soon as
+        the LLM has closed it, then `("answer", answer)` once generation ends.
+        """
+        with span("context_build"):
+            final_prompt = self._build_rag_prompt(messages, question, chat_history)
+        list_key = "ids" if self.hydrate_results else "result"
+        parser = StructuredOutputStreamParser(text_key="response", list_keys=(list_key,))
+        raw_parts: list[str] = []
+        emitted = 0
+        seen_ids: set[str] = set()
+
+        usage_chunk = None
+        async with admission.stage("rag_llm"):
+            with span("rag_llm"):
+                async for chunk in self.llm.astream(final_prompt):
+                    if getattr(chunk, "usage_metadata", None):
+                        usage_chunk = chunk
+                    content = chunk.content if isinstance(chunk.content, str) else ""
+                    if not content:
+                        continue
+                    raw_parts.append(content)
+                    for kind, value in parser.feed(content):
+                        if kind == "text":
+                            yield "token", value
+                            continue
+                        if self.hydrate_results:
+                            if str(value) in seen_ids:
+                                continue
+                            seen_ids.add(str(value))
+                            for real_estate in self.listing_store.hydrate([str(value)]):
+                                yield "real_estate", real_estate
+                                emitted += 1
+                            continue
+                        try:
+                            yield "real_estate", RealEstate.model_validate(value)
+                            emitted += 1
+                        except Exception as e:
+                            logger.error(
+                                f"Skipping invalid streamed real estate item: {e}"
+                            )
+        record_tokens("rag_llm", final_prompt, usage_chunk or "".join(raw_parts))
+
+        response_text = self.clear_think.sub("", "".join(raw_parts)).strip()
+        if parser.started:
+            answer = parser.text
+        else:
+            # The model ignored the JSON format, send the raw text at once
+            answer, _ = self._parse_rag_output(response_text)
+            yield "token", answer
+
+        logger.info(f"Answer: {answer}")
+        logger.info(f"Streamed {emitted} real estate results")
+        yield "answer", answer
+
     async def generate_rest_api(
         self,
         question: str,
         chat_history: list[dict],
         session_id: str | None = None,
         user_id: str | None = None,
+        prefetched: str | None = None,
     ) -> tuple[str, list[RealEstate]]:
         try:
             has_tools, result = await self._create_message(
-                question, chat_history, session_id, user_id
+                question, chat_history, session_id, user_id, prefetched
             )
 
             if not has_tools:
@@ -151,12 +403,54 @@ class RestAPIGenService(BaseGenService):
                 session_id=session_id,
                 user_id=user_id,
             )
-            # Save to db
-            save_message(session_id, "human", question)
-            save_message(session_id, "ai", answer)
+            # Save to db (write-behind)
+            chat_history_writer.enqueue(session_id, "human", question)
+            chat_history_writer.enqueue(session_id, "ai", answer)
 
             return answer, results
 
         except Exception as e:
             logger.error(f"Error to generate REST api: {e}")
             raise
+
+    async def generate_rest_api_stream(
+        self,
+        question: str,
+        chat_history: list[dict],
+        session_id: str | None = None,
+        user_id: str | None = None,
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Streaming variant of `generate_rest_api`. Yields `("token", str)`,
+        `("real_estate", RealEstate)` and finally `("answer", str)`.
+        """
+        try:
+            has_tools, result = await self._create_message(
+                question, chat_history, session_id, user_id
+            )
+
+            if not has_tools:
+                answer = self.clear_think.sub("", str(result)).strip()
+                yield "token", answer
+                yield "answer", answer
+                return
+
+            answer = ""
+            async for kind, value in self._rag_generation_stream(
+                messages=result,
+                question=question,
+                chat_history=chat_history,
+                session_id=session_id,
+                user_id=user_id,
+            ):
+                if kind == "answer":
+                    answer = value
+                yield kind, value
+
+            # Save to db (write-behind)
+            chat_history_writer.enqueue(session_id, "human", question)
+            chat_history_writer.enqueue(session_id, "ai", answer)
+
+        except Exception as e:
+            logger.error(f"Error to stream REST api: {e}")
+            raise
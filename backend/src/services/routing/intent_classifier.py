@@ -0,0 +1,62 @@
+import re
+from dataclasses import dataclass
+
+from src.infra.attribute_index.constraints import parse_constraints
+from src.infra.lexical_index.lexical_index import fold_diacritics
+
+SEARCH = "search"
+CHITCHAT = "chitchat"
+UNKNOWN = "unknown"
+
+# Folded words that only show up in real-estate questions
+_DOMAIN_RE = re.compile(
+    r"\b("
+    r"bat dong san|nha dat|nha pho|nha rieng|can ho|chung cu|biet thu|dat nen|"
+    r"tho cu|mat tien|\bhem\b|phong tro|van phong|mat bang|du an|so hong|so do|"
+    r"phap ly|dien tich|phong ngu|toilet|\bm2\b|\bty\b|trieu|gia ban|gia thue|"
+    r"cho thue|can ban|can mua|mua ban|\bquan\b|\bhuyen\b|\bphuong\b|\bduong\b|"
+    r"real estate|apartment|condo|house|villa|land|rent|listing|property|"
+    r"bedroom|district"
+    r")"
+)
+_GREETING_RE = re.compile(
+    r"^\s*(xin chao|chao|hello|hi|hey|cam on|thank|thanks|ok|oke|bye|tam biet|"
+    r"ban la ai|who are you)\b"
+)
+# Follow-ups that only make sense with the previous turns
+_FOLLOW_UP_RE = re.compile(
+    r"\b(can (do|nay|kia|thu \d+)|cai (do|nay)|no|vua roi|o tren|that|that one|"
+    r"it|them|those)\b"
+)
+
+
+@dataclass
+class Intent:
+    label: str
+    reason: str
+
+
+class IntentClassifier:
+    """
+    Keyword and constraint rules deciding whether a question clearly needs a
+    listing search. Only `SEARCH` is acted upon (the routing LLM call is
+    skipped); anything else goes through the routing LLM as before.
+    """
+
+    def __init__(self, min_domain_hits: int = 2):
+        self.min_domain_hits = min_domain_hits
+
+    def classify(self, question: str, chat_history: list[dict] | None = None) -> Intent:
+        text = fold_diacritics(question).strip()
+        if not text:
+            return Intent(UNKNOWN, "empty")
+        domain_hits = len(_DOMAIN_RE.findall(text))
+        if domain_hits == 0 and _GREETING_RE.search(text):
+            return Intent(CHITCHAT, "greeting")
+        if chat_history and _FOLLOW_UP_RE.search(text):
+            return Intent(UNKNOWN, "follow-up")
+        if parse_constraints(question).names_listing:
+            return Intent(SEARCH, "constraints")
+        if domain_hits >= self.min_domain_hits:
+            return Intent(SEARCH, f"{domain_hits} domain keywords")
+        return Intent(UNKNOWN, f"{domain_hits} domain keywords")
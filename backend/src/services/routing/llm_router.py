@@ -0,0 +1,397 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.language_models.base import LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from src.constants.llm_factory import LLMFactory
+from src.utils.logger import LoggerConfig
+
+logger = LoggerConfig(__name__).get()
+
+
+class LLMUnavailableError(RuntimeError):
+    """Every provider's circuit is open."""
+
+
+def _is_client_error(error: BaseException) -> bool:
+    """4xx other than 429: the request itself is bad, another provider won't help."""
+    status = getattr(error, "status_code", None) or getattr(
+        getattr(error, "response", None), "status_code", None
+    )
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+
+class ProviderStats:
+    """Rolling latency and error statistics of one provider."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(latency)
+            self._outcomes.append(True)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            self._outcomes.append(False)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile in seconds, None until `min_samples` successes."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            return float(np.percentile(self._latencies, q))
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1.0 - sum(self._outcomes) / len(self._outcomes)
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.error_rate(),
+            "p50_seconds": p50,
+            "p95_seconds": p95,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. Once `cooldown_seconds`
+    have passed a single probe request is let through (half-open); its outcome
+    closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # Probe again too when a previous probe never reported back
+            if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = self.HALF_OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+@dataclass
+class LLMBackend:
+    name: str
+    runnable: Runnable[LanguageModelInput, BaseMessage]
+    stats: ProviderStats = field(default_factory=ProviderStats)
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+    def succeeded(self, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            self.stats.record_success(latency)
+        self.breaker.record_success()
+
+    def failed(self, error: BaseException) -> None:
+        # The provider answered, it just rejected this request
+        if _is_client_error(error):
+            self.breaker.record_success()
+            return
+        logger.warning(f"LLM provider {self.name} failed: {error!r}")
+        self.stats.record_error()
+        self.breaker.record_failure()
+
+
+class LLMRouter(Runnable[LanguageModelInput, BaseMessage]):
+    """
+    Chat model runnable spread over several providers, in preference order.
+
+    - Providers with an open circuit are skipped.
+    - When the first request hasn't answered after the provider's
+      `hedge_percentile` latency (clamped to the hedge delay bounds), a
+      hedged duplicate goes to the next provider. The first answer wins
+      and the other request is cancelled.
+    - A failed request fails over to the next provider at once.
+    - Every call has a deadline, `timeout` seconds by default, or a
+      per-call `timeout=` keyword argument.
+
+    `bind_tools` returns a router over the tool-bound models that shares
+    the same statistics and circuits.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[LLMBackend],
+        timeout: float = 30.0,
+        hedge_enabled: bool = True,
+        hedge_percentile: float = 95.0,
+        hedge_min_delay: float = 0.3,
+        hedge_max_delay: float = 5.0,
+    ):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = list(backends)
+        self.timeout = timeout
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+
+    def _settings(self) -> dict:
+        return {
+            "timeout": self.timeout,
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_percentile": self.hedge_percentile,
+            "hedge_min_delay": self.hedge_min_delay,
+            "hedge_max_delay": self.hedge_max_delay,
+        }
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "LLMRouter":
+        return LLMRouter(
+            [
+                replace(backend, runnable=backend.runnable.bind_tools(tools, **kwargs))
+                for backend in self.backends
+            ],
+            **self._settings(),
+        )
+
+    def stats(self) -> dict:
+        return {
+            backend.name: {**backend.stats.snapshot(), "circuit": backend.breaker.state}
+            for backend in self.backends
+        }
+
+    def _candidates(self) -> Iterator[LLMBackend]:
+        """Backends in preference order, checking each circuit only when reached."""
+        available = False
+        for backend in self.backends:
+            if backend.breaker.allow():
+                available = True
+                yield backend
+        if not available:
+            raise LLMUnavailableError(
+                f"No LLM provider available, open circuits: "
+                f"{[backend.name for backend in self.backends]}"
+            )
+
+    def _hedge_delay(self, backend: LLMBackend) -> float:
+        delay = backend.stats.percentile(self.hedge_percentile)
+        if delay is None:
+            return self.hedge_max_delay
+        return min(max(delay, self.hedge_min_delay), self.hedge_max_delay)
+
+    def invoke(
+        self,
+        input: LanguageModelInput,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> BaseMessage:
+        """Sequential failover; hedging and deadlines need the async path."""
+        kwargs.pop("timeout", None)
+        last_error: Optional[BaseException] = None
+        for backend in self._candidates():
+            started = time.monotonic()
+            try:
+                result = backend.runnable.invoke(input, config, **kwargs)
+            except Exception as e:
+                backend.failed(e)
+                if _is_client_error(e):
+                    raise
+                last_error = e
+                continue
+            backend.succeeded(time.monotonic() - started)
+            return result
+        raise last_error
+
+    async def ainvoke(
+        self,
+        input: LanguageModelInput,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> BaseMessage:
+        timeout = kwargs.pop("timeout", None) or self.timeout
+        deadline = time.monotonic() + timeout
+        candidates = self._candidates()
+        # task -> (backend, started_at, is_hedge)
+        running: dict[asyncio.Task, tuple[LLMBackend, float, bool]] = {}
+        last_error: Optional[BaseException] = None
+        hedge_at: Optional[float] = None
+
+        def launch(is_hedge: bool) -> bool:
+            nonlocal hedge_at
+            backend = next(candidates, None)
+            if backend is None:
+                return False
+            task = asyncio.create_task(backend.runnable.ainvoke(input, config, **kwargs))
+            running[task] = (backend, time.monotonic(), is_hedge)
+            # At most one hedge per request in flight
+            if is_hedge:
+                backend.stats.hedges += 1
+                hedge_at = None
+            elif self.hedge_enabled and len(self.backends) > 1:
+                hedge_at = time.monotonic() + self._hedge_delay(backend)
+            return True
+
+        try:
+            launch(is_hedge=False)
+            while running:
+                now = time.monotonic()
+                if now >= deadline:
+                    for backend, _, _ in running.values():
+                        backend.failed(TimeoutError())
+                    raise TimeoutError(f"LLM call exceeded its {timeout:.1f}s deadline")
+                wait = deadline - now
+                if hedge_at is not None:
+                    wait = min(wait, max(hedge_at - now, 0.0))
+                done, _ = await asyncio.wait(
+                    running, timeout=wait, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    if hedge_at is not None and time.monotonic() >= hedge_at:
+                        hedge_at = None
+                        launch(is_hedge=True)
+                    continue
+                for task in done:
+                    backend, started, is_hedge = running.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        backend.failed(e)
+                        if _is_client_error(e):
+                            raise
+                        last_error = e
+                        continue
+                    backend.succeeded(time.monotonic() - started)
+                    if is_hedge:
+                        backend.stats.hedge_wins += 1
+                    return result
+                # Every request in flight failed, fail over
+                if not running and not launch(is_hedge=False):
+                    break
+        finally:
+            for task in running:
+                task.cancel()
+        raise last_error
+
+    async def astream(
+        self,
+        input: LanguageModelInput,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[BaseMessage]:
+        """
+        Stream from the first healthy provider, failing over while nothing
+        has been yielded yet. The deadline applies to the first chunk.
+        """
+        timeout = kwargs.pop("timeout", None) or self.timeout
+        deadline = time.monotonic() + timeout
+        last_error: Optional[BaseException] = None
+        for backend in self._candidates():
+            stream = backend.runnable.astream(input, config, **kwargs)
+            started = time.monotonic()
+            try:
+                first = await asyncio.wait_for(
+                    anext(stream), max(deadline - time.monotonic(), 0.0)
+                )
+            except StopAsyncIteration:
+                backend.succeeded()
+                return
+            except asyncio.TimeoutError:
+                backend.failed(TimeoutError())
+                await stream.aclose()
+                raise TimeoutError(
+                    f"LLM stream produced nothing within its {timeout:.1f}s deadline"
+                )
+            except Exception as e:
+                backend.failed(e)
+                await stream.aclose()
+                if _is_client_error(e):
+                    raise
+                last_error = e
+                continue
+            # Time to first chunk is the latency that matters for hedging
+            backend.succeeded(time.monotonic() - started)
+            yield first
+            async for chunk in stream:
+                yield chunk
+            return
+        raise last_error
+
+
+def create_llm_router(
+    providers: List[str],
+    configs: dict[str, LLMFactory.Config],
+    failure_threshold: int = 5,
+    cooldown_seconds: float = 30.0,
+    stats_window: int = 200,
+    **router_kwargs: Any,
+) -> LLMRouter:
+    """
+    Router over `providers` (e.g. ["groq", "bedrock"]) in preference order.
+    Providers without a config, or whose client can't be built, are skipped.
+    """
+    backends = []
+    for name in providers:
+        if name not in configs:
+            logger.warning(f"LLM provider {name} is not configured, skipping it")
+            continue
+        try:
+            llm = LLMFactory.create_llm(
+                llm_provider=LLMFactory.Provider(name), config=configs[name]
+            )
+        except Exception as e:
+            logger.warning(f"LLM provider {name} unavailable, skipping it: {e}")
+            continue
+        backends.append(
+            LLMBackend(
+                name=name,
+                runnable=llm,
+                stats=ProviderStats(window=stats_window),
+                breaker=CircuitBreaker(failure_threshold, cooldown_seconds),
+            )
+        )
+    return LLMRouter(backends, **router_kwargs)
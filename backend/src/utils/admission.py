@@ -0,0 +1,261 @@
+import asyncio
+import contextlib
+import math
+import time
+from collections import OrderedDict, deque
+from typing import AsyncContextManager, AsyncIterator, Deque, Dict, Tuple
+
+from src.config.config import config
+
+
+class Overloaded(Exception):
+    """A stage's wait queue is full, or a request waited too long for a slot."""
+
+    def __init__(self, stage: str, reason: str, retry_after: int):
+        super().__init__(f"{stage} is overloaded: {reason}")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class RateLimited(Exception):
+    """A user sent requests faster than their token bucket refills."""
+
+    def __init__(self, user_key: str, retry_after: int):
+        super().__init__(f"Rate limit exceeded for {user_key}")
+        self.user_key = user_key
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """
+    At most `limit` concurrent calls of one stage, and at most `max_queue`
+    calls waiting for a slot, each for at most `queue_timeout` seconds.
+    Callers past either bound get `Overloaded` at once instead of piling up
+    on the provider.
+
+    Freed slots are handed to the oldest waiter. Waiters are plain futures
+    of the running loop, so the limiter is not bound to one event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int,
+    ):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.active = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.max_queue_depth = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def is_full(self) -> bool:
+        return self.active >= self.limit and self.queued >= self.max_queue
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise Overloaded(self.name, "queue is full", self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        timer = asyncio.get_running_loop().call_later(
+            self.queue_timeout, self._expire, waiter
+        )
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as the caller went away
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        except Overloaded:
+            self.rejected_timeout += 1
+            raise
+        finally:
+            timer.cancel()
+        self.admitted += 1
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            self._discard(waiter)
+            waiter.set_exception(
+                Overloaded(
+                    self.name,
+                    f"no slot within {self.queue_timeout:g}s",
+                    self.retry_after,
+                )
+            )
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        with contextlib.suppress(ValueError):
+            self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the waiter, `active` is unchanged
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.active,
+            "queued": self.queued,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+class TokenBuckets:
+    """
+    A token bucket per key, refilled at `rate` tokens per second up to
+    `burst`. Past `max_keys` keys the least recently seen one is forgotten.
+    A `rate` of 0 is not limited.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> (tokens, last refill), least recently seen first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, cost: int = 1, debt: bool = False) -> None:
+        """
+        Take `cost` tokens from `key`'s bucket, `RateLimited` when it holds
+        fewer. With `debt`, a bucket holding any token pays the whole cost
+        and may go negative, admitting nothing until refilled above zero.
+        """
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        tokens, refilled_at = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - refilled_at) * self.rate)
+        required = 0 if debt else cost
+        if tokens < cost and tokens <= required:
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            raise RateLimited(key, max(1, math.ceil((required - tokens) / self.rate)))
+        self._buckets[key] = (tokens - cost, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+
+class AdmissionController:
+    """
+    Admission control for LLM-bound work: a `StageLimiter` per stage
+    (`route_llm`, `rag_llm`, `embed`), a token bucket per user, refilled at
+    `user_rate` requests per second up to `user_burst`, and a separate one
+    per user for batch questions, refilled at `batch_rate` up to `batch_burst`.
+
+    A stage with a limit of 0 and a rate of 0 are not limited.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        max_queue: int = 256,
+        queue_timeout: float = 10.0,
+        retry_after: int = 2,
+        user_rate: float = 0.0,
+        user_burst: int = 20,
+        batch_rate: float = 0.0,
+        batch_burst: int = 1000,
+        max_users: int = 100_000,
+    ):
+        self.stages = {
+            name: StageLimiter(name, limit, max_queue, queue_timeout, retry_after)
+            for name, limit in limits.items()
+            if limit > 0
+        }
+        self.retry_after = retry_after
+        self.users = TokenBuckets(user_rate, user_burst, max_users)
+        self.batches = TokenBuckets(batch_rate, batch_burst, max_users)
+        self.rejected_at_entry = 0
+
+    def stage(self, name: str) -> AsyncContextManager:
+        """Hold a slot of stage `name` for the duration of the block."""
+        limiter = self.stages.get(name)
+        return limiter.slot() if limiter is not None else contextlib.nullcontext()
+
+    def check_rate(self, user_key: str) -> None:
+        """Take a token from `user_key`'s bucket, `RateLimited` when it is empty."""
+        self.users.take(user_key)
+
+    def check_batch_rate(self, user_key: str, questions: int) -> None:
+        """
+        Charge a batch of `questions` to `user_key`'s batch bucket. Any batch
+        is admitted while the bucket is not in debt, so its size is bounded
+        by `RAG_BATCH_MAX_ITEMS` alone, and the user's next batch waits
+        until the bucket has refilled what this one took.
+        """
+        self.batches.take(user_key, questions, debt=True)
+
+    def check_capacity(self) -> None:
+        """`Overloaded` when a stage could not even queue a new request."""
+        for limiter in self.stages.values():
+            if limiter.is_full():
+                self.rejected_at_entry += 1
+                raise Overloaded(limiter.name, "queue is full", self.retry_after)
+
+    def stats(self) -> dict:
+        return {
+            "rate_limited": self.users.rejected,
+            "batch_rate_limited": self.batches.rejected,
+            "rejected_at_entry": self.rejected_at_entry,
+            "tracked_users": len(self.users),
+            **{name: limiter.stats() for name, limiter in self.stages.items()},
+        }
+
+
+admission = AdmissionController(
+    limits={
+        "route_llm": config.ADMISSION_ROUTE_LLM_CONCURRENCY,
+        "rag_llm": config.ADMISSION_RAG_LLM_CONCURRENCY,
+        "embed": config.ADMISSION_EMBED_CONCURRENCY,
+    },
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    queue_timeout=config.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    retry_after=config.ADMISSION_RETRY_AFTER_SECONDS,
+    user_rate=config.USER_RATE_LIMIT_PER_SECOND,
+    user_burst=config.USER_RATE_LIMIT_BURST,
+    batch_rate=config.BATCH_RATE_LIMIT_PER_SECOND,
+    batch_burst=config.BATCH_RATE_LIMIT_BURST,
+)
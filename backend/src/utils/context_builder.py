@@ -0,0 +1,252 @@
+import json
+import re
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from langchain_core.documents import Document
+
+from src.infra.lexical_index.lexical_index import fold_diacritics
+from src.utils.tokens import count_tokens, truncate_to_tokens
+
+NO_DOCUMENTS_FOUND = "Không tìm thấy tài liệu phù hợp."
+
+# Short key -> meaning, the legend is only sent for the keys a context uses
+_LEGEND = {
+    "id": "listing key",
+    "addr": "address",
+    "m2": "area in m²",
+    "tx": "transaction type",
+    "br": "bedrooms",
+    "fl": "floors",
+    "size": "width x length in m",
+    "road": "street width in m",
+    "dir": "direction",
+    "img": "image urls",
+    "geo": "latitude,longitude",
+}
+
+
+def _number(value: Any) -> str:
+    try:
+        return f"{round(float(value), 2):g}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _price(metadata: Dict[str, Any]) -> Optional[str]:
+    price = metadata.get("price")
+    if price in (None, ""):
+        return None
+    unit = metadata.get("priceUnit")
+    if unit:
+        return f"{_number(price)} {unit}"
+    try:
+        value = float(price)
+    except (TypeError, ValueError):
+        return str(price)
+    if value >= 1e9:
+        return f"{_number(value / 1e9)} tỷ"
+    if value >= 1e6:
+        return f"{_number(value / 1e6)} triệu"
+    return _number(value)
+
+
+def _size(metadata: Dict[str, Any]) -> Optional[str]:
+    width, length = metadata.get("width"), metadata.get("length")
+    if not width or not length:
+        return None
+    return f"{_number(width)}x{_number(length)}"
+
+
+def _contact(metadata: Dict[str, Any]) -> Optional[str]:
+    parts = [
+        str(metadata[key])
+        for key in ("contact_name", "contact_phone", "contact_zalo", "contact_email")
+        if metadata.get(key)
+    ]
+    return ", ".join(parts) or None
+
+
+def _images(metadata: Dict[str, Any]) -> Optional[str]:
+    images = metadata.get("image") or metadata.get("images")
+    if isinstance(images, str):
+        try:
+            images = json.loads(images)
+        except ValueError:
+            return images
+    if isinstance(images, (list, tuple)):
+        return " ".join(str(image) for image in images) or None
+    return None
+
+
+def _geo(metadata: Dict[str, Any]) -> Optional[str]:
+    lat = metadata.get("lat") or metadata.get("latitude")
+    lng = metadata.get("lng") or metadata.get("longitude")
+    return f"{lat},{lng}" if lat and lng else None
+
+
+def _first(
+    *keys: str, fmt: Callable[[Any], str] = str
+) -> Callable[[Dict[str, Any]], Optional[str]]:
+    def get(metadata: Dict[str, Any]) -> Optional[str]:
+        for key in keys:
+            if metadata.get(key) not in (None, ""):
+                return fmt(metadata[key])
+        return None
+
+    return get
+
+
+# Projected fields, in output order: short key -> value getter
+_FIELDS: Dict[str, Callable[[Dict[str, Any]], Optional[str]]] = {
+    "id": _first("listing_key", "listing_id"),
+    "title": _first("title"),
+    "addr": _first("address"),
+    "price": _price,
+    "m2": _first("area", fmt=_number),
+    "type": _first("type", "propertyType"),
+    "tx": _first("transactionType"),
+    "legal": _first("legal", "legalStatus"),
+    "br": _first("bedrooms", fmt=_number),
+    "fl": _first("floors", fmt=_number),
+    "size": _size,
+    "road": _first("street_width", fmt=_number),
+    "dir": _first("direction"),
+    "contact": _contact,
+    "url": _first("url"),
+    "posted": _first("publishedAt"),
+    "updated": _first("updatedAt"),
+    "img": _images,
+    "geo": _geo,
+}
+# Always projected: what identifies and summarizes a listing
+_BASE_FIELDS = ("id", "title", "addr", "price", "m2", "type", "tx")
+# Folded question words -> the extra fields they ask about
+_INTENT_FIELDS = (
+    (r"phap ly|so hong|so do|giay to|legal", ("legal",)),
+    (r"phong ngu|\bpn\b|bedroom|\bphong\b", ("br",)),
+    (r"\btang\b|\blau\b|floor|storey", ("fl",)),
+    (
+        r"mat tien|\bngang\b|\bdai\b|kich thuoc|\bhem\b|duong rong|duong truoc|"
+        r"width|frontage",
+        ("size", "road"),
+    ),
+    (r"\bhuong\b|direction|facing", ("dir",)),
+    (r"lien he|sdt|so dien thoai|zalo|moi gioi|contact|phone|email", ("contact",)),
+    (r"\blink\b|\burl\b|nguon|source", ("url",)),
+    (r"moi dang|gan day|ngay dang|cap nhat|recent|latest|posted", ("posted", "updated")),
+)
+
+# Lines of the ingested listing text repeating a projected field
+_FIELD_LINES = {"dia chi": "addr", "dien tich": "m2", "gia": "price"}
+
+
+def project_fields(question: str, full: bool = False) -> Tuple[str, ...]:
+    """
+    Short keys of the metadata fields worth sending for `question`. `full`
+    (the LLM generates every listing field) projects all of them, images and
+    coordinates are only worth their tokens when the LLM has to copy them.
+    """
+    if full:
+        return tuple(_FIELDS)
+    folded = fold_diacritics(question or "")
+    wanted = set(_BASE_FIELDS)
+    for pattern, fields in _INTENT_FIELDS:
+        if re.search(pattern, folded):
+            wanted.update(fields)
+    return tuple(key for key in _FIELDS if key in wanted)
+
+
+def _compact_text(text: str, header_fields: Collection[str]) -> str:
+    """Squeeze whitespace and drop the lines the header already carries."""
+    lines = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        label = fold_diacritics(line.partition(":")[0])
+        if not line or _FIELD_LINES.get(label) in header_fields:
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class ContextBuilder:
+    """
+    Formats retrieved listings for the RAG prompt within a token budget.
+
+    Each listing is one line of projected, abbreviated metadata followed by
+    its text. Listings are added best first; a listing's text is cut to
+    `max_doc_tokens` and to whatever budget is left, and listings that no
+    longer fit are dropped.
+    """
+
+    def __init__(self, token_budget: int, max_doc_tokens: int, full: bool = False):
+        self.token_budget = token_budget
+        self.max_doc_tokens = max_doc_tokens
+        self.full = full
+
+    @staticmethod
+    def _legend(keys: Collection[str]) -> str:
+        legend = ", ".join(f"{key}={_LEGEND[key]}" for key in _LEGEND if key in keys)
+        return f"Fields: {legend}" if legend else ""
+
+    @staticmethod
+    def _header(
+        idx: int, metadata: Dict[str, Any], fields: Sequence[str], score: Optional[float]
+    ) -> Tuple[str, List[str]]:
+        used = []
+        parts = []
+        for key in fields:
+            value = _FIELDS[key](metadata)
+            if value is None:
+                continue
+            used.append(key)
+            parts.append(f"{key}: {' '.join(str(value).split())}")
+        if score is not None:
+            parts.append(f"score: {score:.4f}")
+        return f"[{idx}] " + " | ".join(parts), used
+
+    def build(
+        self,
+        docs: Sequence[Document],
+        scores: Optional[Sequence[float]] = None,
+        question: str = "",
+    ) -> str:
+        """`docs` are ranked best first, `scores` are only shown when given."""
+        if not docs:
+            return NO_DOCUMENTS_FOUND
+        fields = project_fields(question, self.full)
+        # Reserve room for the legend of every projected field
+        budget = self.token_budget - count_tokens(self._legend(fields))
+        blocks: List[str] = []
+        used_keys: set[str] = set()
+        for idx, doc in enumerate(docs):
+            header, used = self._header(
+                idx + 1,
+                getattr(doc, "metadata", {}) or {},
+                fields,
+                scores[idx] if scores else None,
+            )
+            header_tokens = count_tokens(header) + 1
+            if header_tokens > budget:
+                break
+            content = truncate_to_tokens(
+                _compact_text(doc.page_content, used),
+                min(self.max_doc_tokens, budget - header_tokens),
+            )
+            block = f"{header}\n{content}" if content else header
+            budget -= count_tokens(block) + 1
+            blocks.append(block)
+            used_keys.update(used)
+
+        legend = self._legend(used_keys)
+        if legend:
+            blocks.insert(0, legend)
+        return "\n\n".join(blocks)
@@ -0,0 +1,82 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from src.config.config import config
+
+T = TypeVar("T")
+
+
+class InstrumentedThreadPool:
+    """
+    Dedicated, sized thread pool for blocking I/O (Bedrock embedding calls,
+    Chroma queries) awaited from the event loop.
+
+    Unlike the default loop executor it is not shared with unrelated
+    `to_thread` work, and it reports queue depth, active workers and the time
+    tasks spent waiting for a worker.
+    """
+
+    def __init__(self, max_workers: int, name: str):
+        self.max_workers = max_workers
+        self.name = name
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+
+    def _track(self, fn: Callable[[], T], submitted_at: float) -> T:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_wait_seconds += time.perf_counter() - submitted_at
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        loop = asyncio.get_running_loop()
+        # Keep the caller's context (e.g. its request trace) in the worker
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor,
+            self._track,
+            partial(context.run, fn, *args, **kwargs),
+            time.perf_counter(),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "max_queue_depth": self.max_queue_depth,
+                "avg_wait_seconds": (
+                    self.total_wait_seconds / self.completed if self.completed else 0.0
+                ),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+retrieval_executor = InstrumentedThreadPool(
+    max_workers=config.RETRIEVAL_MAX_WORKERS, name="retrieval"
+)
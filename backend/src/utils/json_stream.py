@@ -0,0 +1,238 @@
+import json
+from typing import Any, Iterable
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+# Stands in for a surrogate escape without its pair, which no encoder accepts
+_REPLACEMENT = "\ufffd"
+
+
+class StructuredOutputStreamParser:
+    """
+    Incremental parser for the structured RAG output
+    (`{"response": "...", "result": [...]}`).
+
+    Text is fed chunk by chunk as the LLM streams it. `feed` returns the
+    events that became available with that chunk:
+
+    - `("text", delta)`: newly decoded characters of the `text_key` string.
+    - `("item", value)`: one element of a `list_keys` array, emitted as soon
+      as that element is closed.
+
+    Anything before the first top-level `{` (markdown fences, `<think>` blocks)
+    is ignored.
+    """
+
+    def __init__(
+        self,
+        text_key: str = "response",
+        list_keys: Iterable[str] = ("result",),
+    ):
+        self.text_key = text_key
+        self.list_keys = set(list_keys)
+
+        self._raw = ""
+        self._pos = 0
+        self._prefix = ""
+        self._started = False
+        self._finished = False
+
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._unicode: str | None = None
+        # High half of a `\ud83d\ude00` pair, waiting for the low half
+        self._high_surrogate: int | None = None
+
+        self._expect_key = False
+        self._key_chars: list[str] = []
+        self._is_key = False
+        self._current_key: str | None = None
+
+        self._streaming_text = False
+        self._list_active = False
+        self._item_start: int | None = None
+
+        self.text = ""
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        events: list[tuple[str, Any]] = []
+        if not chunk or self._finished:
+            return events
+
+        self._raw += chunk
+        text_delta: list[str] = []
+
+        while self._pos < len(self._raw) and not self._finished:
+            pos = self._pos
+            ch = self._raw[pos]
+            self._pos += 1
+
+            if not self._started:
+                self._prefix += ch
+                if ch == "{" and not self._in_think():
+                    self._started = True
+                    self._stack.append("{")
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                self._consume_string_char(ch, pos, text_delta, events)
+                continue
+
+            depth = len(self._stack)
+
+            if self._list_active and depth == 2 and self._item_start is not None:
+                # Scalar (non-string) list item such as a number or null
+                if ch in ",]" or ch.isspace():
+                    self._emit_item(self._raw[self._item_start : pos], events)
+                    self._item_start = None
+
+            if ch == '"':
+                self._in_string = True
+                if depth == 1 and self._expect_key:
+                    self._is_key = True
+                    self._key_chars = []
+                elif depth == 1 and self._current_key == self.text_key:
+                    self._streaming_text = True
+                elif self._list_active and depth == 2:
+                    self._item_start = pos
+            elif ch in "{[":
+                if self._list_active and depth == 2:
+                    self._item_start = pos
+                if depth == 1 and ch == "[" and self._current_key in self.list_keys:
+                    self._list_active = True
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                depth = len(self._stack)
+                if self._list_active and depth == 2 and self._item_start is not None:
+                    self._emit_item(self._raw[self._item_start : pos + 1], events)
+                    self._item_start = None
+                elif self._list_active and depth == 1:
+                    self._list_active = False
+                if depth == 0:
+                    self._finished = True
+            elif ch == ":" and depth == 1:
+                self._expect_key = False
+            elif ch == "," and depth == 1:
+                self._expect_key = True
+                self._current_key = None
+            elif (
+                self._list_active
+                and depth == 2
+                and self._item_start is None
+                and not ch.isspace()
+                and ch != ","
+            ):
+                self._item_start = pos
+
+        if text_delta:
+            delta = "".join(text_delta)
+            self.text += delta
+            events.insert(0, ("text", delta))
+        return events
+
+    def _in_think(self) -> bool:
+        return self._prefix.rfind("<think>") > self._prefix.rfind("</think>")
+
+    def _consume_string_char(
+        self,
+        ch: str,
+        pos: int,
+        text_delta: list[str],
+        events: list[tuple[str, Any]],
+    ) -> None:
+        decoded: str | None = None
+        closed = False
+
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) == 4:
+                try:
+                    decoded = self._decode_code_point(int(self._unicode, 16))
+                except ValueError:
+                    decoded = self._flush_surrogate()
+                self._unicode = None
+        elif self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+            else:
+                decoded = self._flush_surrogate() + _ESCAPES.get(ch, ch)
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            closed = True
+            decoded = self._flush_surrogate() or None
+        else:
+            decoded = self._flush_surrogate() + ch
+
+        if closed:
+            if decoded is not None:
+                self._append_decoded(decoded, text_delta)
+            self._in_string = False
+            if self._is_key:
+                self._is_key = False
+                self._current_key = "".join(self._key_chars)
+            elif self._streaming_text:
+                self._streaming_text = False
+            elif self._list_active and len(self._stack) == 2:
+                self._emit_item(self._raw[self._item_start : pos + 1], events)
+                self._item_start = None
+            return
+
+        if decoded is not None:
+            self._append_decoded(decoded, text_delta)
+
+    def _append_decoded(self, decoded: str, text_delta: list[str]) -> None:
+        if self._is_key:
+            self._key_chars.append(decoded)
+        elif self._streaming_text:
+            text_delta.append(decoded)
+
+    def _flush_surrogate(self) -> str:
+        """A pending high surrogate that no low surrogate followed"""
+        if self._high_surrogate is None:
+            return ""
+        self._high_surrogate = None
+        return _REPLACEMENT
+
+    def _decode_code_point(self, code: int) -> str | None:
+        if 0xD800 <= code <= 0xDBFF:
+            pending = self._flush_surrogate()
+            self._high_surrogate = code
+            return pending or None
+        if 0xDC00 <= code <= 0xDFFF:
+            if self._high_surrogate is None:
+                return _REPLACEMENT
+            high, self._high_surrogate = self._high_surrogate, None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00))
+        return self._flush_surrogate() + chr(code)
+
+    @staticmethod
+    def _emit_item(raw_item: str, events: list[tuple[str, Any]]) -> None:
+        raw_item = raw_item.strip()
+        if not raw_item:
+            return
+        try:
+            events.append(("item", json.loads(raw_item)))
+        except json.JSONDecodeError:
+            pass
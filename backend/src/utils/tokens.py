@@ -0,0 +1,65 @@
+import math
+from functools import lru_cache
+from typing import Any, Optional
+
+from src.config.config import config
+from src.utils.logger import LoggerConfig
+
+logger = LoggerConfig(__name__).get()
+
+_ELLIPSIS = " …"
+
+
+@lru_cache(maxsize=1)
+def _tokenizer(path: str) -> Optional[Any]:
+    """Local HuggingFace `tokenizer.json` of the generation model, if configured."""
+    if not path:
+        return None
+    try:
+        from tokenizers import Tokenizer
+
+        return Tokenizer.from_file(path)
+    except Exception as e:
+        logger.warning(f"Tokenizer {path} unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count for prompt budgeting.
+
+    Uses the tokenizer at `TOKENIZER_PATH` when there is one. Otherwise it
+    estimates one token per 4 bytes of UTF-8 text, as BPE tokenizers roughly
+    do, which also accounts for Vietnamese diacritics costing more than ASCII.
+    """
+    if not text:
+        return 0
+    tokenizer = _tokenizer(config.TOKENIZER_PATH)
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return math.ceil(len(text.encode("utf-8")) / 4)
+
+
+def warm_up() -> None:
+    """Load the tokenizer now rather than on the first prompt."""
+    count_tokens("warm-up")
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to at most `max_tokens` tokens, marking the cut with an ellipsis."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - count_tokens(_ELLIPSIS)
+    if budget <= 0:
+        return ""
+    tokenizer = _tokenizer(config.TOKENIZER_PATH)
+    if tokenizer is not None:
+        offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+        cut = text[: offsets[budget - 1][1]]
+    else:
+        cut = text.encode("utf-8")[: budget * 4].decode("utf-8", errors="ignore")
+    # Don't leave half a word behind
+    head, _, _ = cut.rpartition(" ")
+    return (head or cut).rstrip() + _ELLIPSIS
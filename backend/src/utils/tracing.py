@@ -0,0 +1,266 @@
+import contextvars
+import math
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.logger import LoggerConfig
+from src.utils.tokens import count_tokens
+
+logger = LoggerConfig(__name__).get()
+
+# Seconds, from a cache hit to a slow LLM call
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one label set per series."""
+
+    def __init__(
+        self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets) + (math.inf,)
+        # labels -> (bucket counts, sum, count)
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                labels = dict(key)
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f"{self.name}_bucket{_labels({**labels, 'le': _value(bound)})} "
+                        f"{cumulative}"
+                    )
+                lines.append(f"{self.name}_sum{_labels(labels)} {_value(total)}")
+                lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter with one label set per series."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._series: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_labels(dict(key))} {_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Metrics rendered in the Prometheus text format. Components that already
+    keep a `stats()` dict (thread pools, caches, the LLM router) register it
+    as a gauge source instead of duplicating their counters.
+    """
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "rag_stage_duration_seconds", "Latency of each request stage."
+        )
+        self.stage_tokens = Counter(
+            "rag_stage_tokens_total", "Prompt and completion tokens of each stage."
+        )
+        self._gauges: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def register_gauges(
+        self, prefix: str, stats_fn: Callable[[], Dict[str, Any]]
+    ) -> None:
+        """Expose the numeric values of `stats_fn()` as `rag_<prefix>_<key>` gauges."""
+        self._gauges[prefix] = stats_fn
+
+    def _render_gauges(self) -> List[str]:
+        lines = []
+        for prefix, stats_fn in self._gauges.items():
+            try:
+                stats = stats_fn()
+            except Exception as e:
+                logger.error(f"Metrics source {prefix} failed: {e}")
+                continue
+            for key, value in _flatten(stats):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"rag_{prefix}_{key}"
+                lines += [f"# TYPE {name} gauge", f"{name} {_value(value)}"]
+        return lines
+
+    def render(self) -> str:
+        lines = self.stage_seconds.render() + self.stage_tokens.render()
+        lines += self._render_gauges()
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    for key, value in stats.items():
+        name = "".join(ch if ch.isalnum() else "_" for ch in f"{prefix}{key}").lower()
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        else:
+            yield name, value
+
+
+metrics = MetricsRegistry()
+
+
+@dataclass
+class Span:
+    stage: str
+    start: float
+    duration: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    """Spans of one request, shared by every task and thread serving it."""
+
+    trace_id: str
+    started_at: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+
+    def stage_totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for recorded in self.spans:
+            totals[recorded.stage] = totals.get(recorded.stage, 0.0) + recorded.duration
+        return totals
+
+    def server_timing(self) -> str:
+        """`Server-Timing` header value, durations in milliseconds."""
+        return ", ".join(
+            f"{stage};dur={1000 * seconds:.1f}"
+            for stage, seconds in self.stage_totals().items()
+        )
+
+    def summary(self) -> str:
+        total = time.perf_counter() - self.started_at
+        stages = " ".join(
+            f"{stage}={1000 * seconds:.0f}ms"
+            for stage, seconds in self.stage_totals().items()
+        )
+        return f"trace {self.trace_id} total={1000 * total:.0f}ms {stages}"
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(trace_id: Optional[str] = None) -> Iterator[Trace]:
+    """Make a new trace current for the enclosed request."""
+    new_trace = Trace(trace_id=trace_id or uuid.uuid4().hex)
+    token = _current_trace.set(new_trace)
+    try:
+        yield new_trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time the enclosed block as `stage`: observed in the stage histogram and,
+    within a request, added to its trace. Works around `await` too.
+    """
+    current = Span(stage=stage, start=time.perf_counter(), attributes=attributes)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.start
+        metrics.stage_seconds.observe(current.duration, stage=stage)
+        active = _current_trace.get()
+        if active is not None:
+            active.spans.append(current)
+
+
+def record_tokens(stage: str, prompt: Any = None, message: Any = None) -> None:
+    """
+    Count the prompt and completion tokens of an LLM call. Provider usage
+    metadata is used when the message carries it, local counts otherwise.
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens")
+    completion_tokens = usage.get("output_tokens")
+    if prompt_tokens is None and prompt is not None:
+        prompt_tokens = count_tokens(_text(prompt))
+    if completion_tokens is None and message is not None:
+        completion_tokens = count_tokens(_text(getattr(message, "content", message)))
+    if prompt_tokens:
+        metrics.stage_tokens.inc(prompt_tokens, stage=stage, kind="prompt")
+    if completion_tokens:
+        metrics.stage_tokens.inc(completion_tokens, stage=stage, kind="completion")
+    active = _current_trace.get()
+    if active is not None:
+        for recorded in reversed(active.spans):
+            if recorded.stage == stage:
+                recorded.attributes.update(
+                    prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+                )
+                break
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return "\n".join(_text(item) for item in value)
+    content = getattr(value, "content", None)
+    if content is not None:
+        return _text(content)
+    return str(value)
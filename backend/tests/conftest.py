@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+# Read by `src.config` on import: no chat history file in the working directory
+os.environ.setdefault("CHAT_HISTORY_DATABASE_URL", "sqlite://")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# `src` as the app imports it, and the in-process fakes of the benchmarks
+sys.path[1:1] = [str(BACKEND_DIR), str(BACKEND_DIR / "benchmarks")]
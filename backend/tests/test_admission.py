@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from src.utils.admission import AdmissionController, RateLimited, TokenBuckets
+
+
+def test_take_rejects_an_empty_bucket():
+    buckets = TokenBuckets(rate=1, burst=2)
+    buckets.take("alice")
+    buckets.take("alice")
+
+    with pytest.raises(RateLimited) as error:
+        buckets.take("alice")
+    assert error.value.retry_after == 1
+    buckets.take("bob")
+    assert buckets.rejected == 1
+
+
+def test_debt_admits_any_cost_then_waits_it_off():
+    buckets = TokenBuckets(rate=10, burst=5)
+    buckets.take("alice", 50, debt=True)
+
+    with pytest.raises(RateLimited) as error:
+        buckets.take("alice", 1, debt=True)
+    assert error.value.retry_after == 5
+
+    buckets._buckets["alice"] = (-0.5, time.monotonic() - 0.1)
+    buckets.take("alice", 50, debt=True)
+
+
+def test_unlimited_rate():
+    buckets = TokenBuckets(rate=0, burst=1)
+    for _ in range(3):
+        buckets.take("alice", 100)
+    assert len(buckets) == 0
+
+
+def test_batches_do_not_take_interactive_tokens():
+    admission = AdmissionController(
+        limits={}, user_rate=1, user_burst=1, batch_rate=1, batch_burst=10
+    )
+    admission.check_batch_rate("alice", 100)
+
+    admission.check_rate("alice")
+    with pytest.raises(RateLimited):
+        admission.check_batch_rate("alice", 1)
+    assert admission.stats()["batch_rate_limited"] == 1
+    assert admission.stats()["rate_limited"] == 0
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.services.chat_history import chat_history
+from src.services.chat_history.chat_history import SessionTailCache
+from src.services.chat_history.sql_store import SQLAlchemyChatHistoryStore
+from src.services.chat_history.store import SessionTail
+
+
+def _message(id: int) -> dict:
+    return {"id": id, "role": "human", "content": f"m{id}"}
+
+
+def test_append_extends_cached_tail():
+    cache = SessionTailCache(max_sessions=10, tail=3, ttl_seconds=60)
+    cache.put("s", SessionTail(messages=[_message(1), _message(2)]), cache.version)
+    cache.append([("s", _message(3)), ("s", _message(4)), ("other", _message(5))])
+    assert [m["id"] for m in cache.get("s").messages] == [2, 3, 4]
+    assert cache.get("other") is None
+
+
+def test_append_skips_messages_of_a_tail_loaded_after_the_commit():
+    cache = SessionTailCache(max_sessions=10, tail=10, ttl_seconds=60)
+    # Loaded between the store's commit and `append`
+    cache.put("s", SessionTail(messages=[_message(1), _message(2)]), cache.version)
+    cache.append([("s", _message(2))])
+    assert [m["id"] for m in cache.get("s").messages] == [1, 2]
+
+
+def test_put_of_a_load_racing_a_write_is_dropped():
+    cache = SessionTailCache(max_sessions=10, tail=10, ttl_seconds=60)
+    version = cache.version
+    cache.append([("s", _message(1))])
+    cache.put("s", SessionTail(), version)
+    assert cache.get("s") is None
+
+
+def test_disabled_cache_keeps_nothing():
+    cache = SessionTailCache(max_sessions=0, tail=10, ttl_seconds=60)
+    cache.put("s", SessionTail(), cache.version)
+    assert cache.get("s") is None
+
+
+@pytest.fixture
+def sql_history():
+    store = SQLAlchemyChatHistoryStore("sqlite://")
+    previous = chat_history.chat_history_store
+    chat_history.use_store(store)
+    yield store
+    chat_history.use_store(previous)
+
+
+def test_failed_tail_load_is_not_cached(sql_history, monkeypatch):
+    sql_history.save_messages([("s", "human", "q1")])
+    session_factory = sql_history.SessionLocal
+
+    def execute(*args, **kwargs):
+        raise OperationalError("SELECT", {}, Exception("database is locked"))
+
+    def unreadable():
+        session = session_factory()
+        session.execute = execute
+        return session
+
+    monkeypatch.setattr(sql_history, "SessionLocal", unreadable)
+    with pytest.raises(OperationalError):
+        chat_history.get_session_tail("s")
+    assert chat_history.session_tail_cache.stats()["sessions"] == 0
+
+    monkeypatch.setattr(sql_history, "SessionLocal", session_factory)
+    assert [m["content"] for m in chat_history.get_session_tail("s").messages] == ["q1"]
+    assert chat_history.session_tail_cache.stats()["sessions"] == 1
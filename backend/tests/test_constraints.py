@@ -0,0 +1,51 @@
+import pytest
+
+from src.infra.attribute_index.attribute_index import transaction_type
+from src.infra.attribute_index.constraints import parse_constraints
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Cần bán nhà mặt tiền quận 7", "ban"),
+        ("can ban nha q7", "ban"),
+        ("Cho thuê căn hộ 2 phòng ngủ", "cho thue"),
+        ("cho thue phong tro", "cho thue"),
+        ("Thuê văn phòng quận 1", "cho thue"),
+        # "bạn" ("you") folds to "ban" ("sale")
+        ("bạn có căn hộ cho thuê nào ở quận 7 không?", "cho thue"),
+        ("Bạn có thể giúp gì cho tôi?", None),
+        ("Nhà đẹp quận 3", None),
+    ],
+)
+def test_transaction_type(text, expected):
+    assert transaction_type(text) == expected
+
+
+def test_parse_constraints():
+    constraints = parse_constraints("nhà dưới 3 tỷ, trên 70m2, quận 7, bán")
+    assert constraints.price_max == 3e9
+    assert constraints.area_min == 70
+    assert constraints.districts == ["quan 7"]
+    assert constraints.transaction_type == "ban"
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ("bạn có căn hộ cho thuê nào ở quận 7 không?", "cho thue"),
+        ("mua căn hộ dưới 3 tỷ", "ban"),
+        # "mùa" ("season") folds to "mua" ("buy")
+        ("mùa này giá nhà thế nào?", None),
+    ],
+)
+def test_parse_constraints_transaction_type(question, expected):
+    assert parse_constraints(question).transaction_type == expected
+
+
+@pytest.mark.parametrize(
+    "question",
+    ["Bạn có thể giúp gì cho tôi?", "bạn ơi, thời tiết hôm nay thế nào?"],
+)
+def test_parse_constraints_ignores_ban_you(question):
+    assert parse_constraints(question).is_empty
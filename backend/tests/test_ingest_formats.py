@@ -0,0 +1,80 @@
+import json
+import sys
+
+import numpy as np
+import pytest
+from langchain_chroma import Chroma
+
+from fakes import HashEmbeddings
+from fixtures import build_fixture
+from src.infra.attribute_index.attribute_index import AttributeIndex
+from src.infra.lexical_index.lexical_index import LexicalIndex
+from src.infra.listing_store.listing_store import ListingStore
+from src.infra.vector_index.vector_index import VectorIndex
+from src.infra.vector_stores.chroma_settings import chroma_settings
+
+from conftest import BACKEND_DIR
+
+sys.path.append(str(BACKEND_DIR.parent / "ingest_data"))
+
+
+@pytest.fixture(scope="module")
+def fixture(tmp_path_factory):
+    """Synthetic listings ingested by the production pipeline."""
+    embeddings = HashEmbeddings(dimension=64, buckets=512)
+    fixture = build_fixture(tmp_path_factory.mktemp("ingest"), 120, embeddings)
+    fixture.embeddings = embeddings
+    fixture.stats = json.loads(fixture.marker_path.read_text())
+    return fixture
+
+
+def test_ingestion_uses_the_api_modules():
+    import shared
+    from src.infra.lexical_index import lexical_index
+    from src.infra.vector_index import vector_index
+
+    assert shared.lexical_index is lexical_index
+    assert shared.vector_index is vector_index
+
+
+def test_listing_store(fixture):
+    keys = fixture.listing_keys(fixture.stats["listings"])
+    store = ListingStore(str(fixture.listing_store_path))
+
+    assert set(store.get_many(keys)) >= set(keys)
+    assert [item.title for item in store.hydrate(keys[:3])] == [
+        store.get_many([key])[key]["title"] for key in keys[:3]
+    ]
+
+
+def test_lexical_index(fixture):
+    index = LexicalIndex(str(fixture.lexical_index_path))
+    keys = set(fixture.listing_keys(fixture.stats["listings"]))
+
+    assert len(index) == fixture.stats["chunks"]
+    hits = index.search("nhà phố quận 7 sổ hồng", top_k=5)
+    assert hits and all(doc_id.rsplit(":", 1)[0] in keys for doc_id, _ in hits)
+
+
+def test_attribute_index(fixture):
+    index = AttributeIndex(str(fixture.attribute_index_path))
+
+    assert len(index) == fixture.stats["listings"]
+    assert index.candidate_keys() is None
+    assert set(index.candidate_keys(price=(0, None))) <= set(index.keys.tolist())
+
+
+def test_vector_index_and_collection(fixture):
+    index = VectorIndex(str(fixture.vector_index_path))
+    collection = Chroma(
+        collection_name=fixture.collection_name,
+        persist_directory=str(fixture.persist_dir),
+        embedding_function=fixture.embeddings,
+        client_settings=chroma_settings(),
+    )
+    stored = collection.get(include=["documents", "embeddings"], limit=1)
+
+    assert len(index) == collection._collection.count() == fixture.stats["chunks"]
+    row, distance = index.search(np.asarray(stored["embeddings"][0]), top_k=1)[0]
+    assert index.doc_id(row) == stored["ids"][0]
+    assert distance == pytest.approx(0.0, abs=1e-5)
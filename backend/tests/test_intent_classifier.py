@@ -0,0 +1,45 @@
+import pytest
+
+from src.services.routing.intent_classifier import (
+    CHITCHAT,
+    SEARCH,
+    IntentClassifier,
+)
+
+classifier = IntentClassifier()
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "Tìm căn hộ quận 7 dưới 3 tỷ",
+        "nhà phố trên 70m2 ở Bình Thạnh",
+        "bạn có căn hộ cho thuê nào ở quận 7 không?",
+        "cần bán đất nền 2 tỷ",
+    ],
+)
+def test_search(question):
+    assert classifier.classify(question).label == SEARCH
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "Bạn có thể giúp gì cho tôi?",
+        "bạn ơi, thời tiết hôm nay thế nào?",
+        "Bạn là ai?",
+        "thời tiết Hà Nội hôm nay thế nào?",
+        "cho tôi hỏi bạn một câu",
+    ],
+)
+def test_not_search(question):
+    assert classifier.classify(question).label != SEARCH
+
+
+def test_greeting():
+    assert classifier.classify("Xin chào").label == CHITCHAT
+
+
+def test_follow_up_goes_to_the_router():
+    history = [{"role": "human", "content": "căn hộ quận 7"}]
+    assert classifier.classify("căn đó giá bao nhiêu?", history).label != SEARCH
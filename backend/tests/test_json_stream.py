@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from src.utils.json_stream import StructuredOutputStreamParser
+
+ANSWER = {
+    "response": 'Có 2 căn "đẹp" ở Q.7:\n\t- giá 3,5 tỷ \\ 70m² 😀 / xong',
+    "result": [{"id": "a", "price": 3.5, "tags": ["view", "[sông]"]}, {"id": "b"}, 7, None],
+}
+
+
+def _parse(raw: str, size: int) -> tuple[str, list, StructuredOutputStreamParser]:
+    parser = StructuredOutputStreamParser()
+    text, items = [], []
+    for start in range(0, len(raw), size):
+        for kind, value in parser.feed(raw[start : start + size]):
+            (text if kind == "text" else items).append(value)
+    return "".join(text), items, parser
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_every_chunk_size(ensure_ascii):
+    raw = json.dumps(ANSWER, ensure_ascii=ensure_ascii)
+    for size in range(1, len(raw) + 1):
+        text, items, parser = _parse(raw, size)
+        assert text == ANSWER["response"], size
+        assert parser.text == ANSWER["response"], size
+        assert items == ANSWER["result"], size
+        assert parser.finished
+
+
+def test_surrogate_pair_escape_is_one_character():
+    raw = json.dumps({"response": "cười 😀!", "result": []})
+    assert "\\ud83d\\ude00" in raw
+    for size in range(1, len(raw) + 1):
+        text, _, _ = _parse(raw, size)
+        assert text == "cười 😀!"
+        text.encode("utf-8")
+
+
+@pytest.mark.parametrize(
+    "escaped, expected",
+    [
+        ('"\\ud83d x"', "� x"),
+        ('"\\ude00"', "�"),
+        ('"\\ud83d"', "�"),
+        ('"\\ud83d\\ud83d\\ude00"', "�😀"),
+        ('"\\ud83d\\n"', "�\n"),
+    ],
+)
+def test_lone_surrogates_are_replaced(escaped, expected):
+    text, _, _ = _parse('{"response": ' + escaped + "}", 1)
+    assert text == expected
+    text.encode("utf-8")
+
+
+def test_code_fence_and_think_prefix_are_skipped():
+    raw = (
+        "<think>Người dùng hỏi {giá}, trả lời bằng JSON</think>\n```json\n"
+        + json.dumps(ANSWER, ensure_ascii=False)
+        + "\n```"
+    )
+    text, items, parser = _parse(raw, 3)
+    assert parser.started and parser.finished
+    assert text == ANSWER["response"]
+    assert items == ANSWER["result"]
+
+
+def test_result_before_response():
+    raw = json.dumps({"result": ANSWER["result"], "response": ANSWER["response"]})
+    text, items, _ = _parse(raw, 5)
+    assert items == ANSWER["result"]
+    assert text == ANSWER["response"]
+
+
+def test_other_keys_are_ignored():
+    raw = json.dumps({"note": "response", "ids": ["x"], "response": "ok", "result": []})
+    text, items, _ = _parse(raw, 2)
+    assert (text, items) == ("ok", [])
+
+
+def test_input_after_the_object_is_ignored():
+    parser = StructuredOutputStreamParser()
+    parser.feed('{"response": "ok"}')
+    assert parser.finished
+    assert parser.feed('{"response": "again"}') == []
+    assert parser.text == "ok"
@@ -0,0 +1,62 @@
+import pytest
+
+from src.infra.lexical_index import lexical_index
+from src.infra.lexical_index.lexical_index import LexicalIndex, build_index
+
+DOCS = [
+    ("a:1", "Bán nhà phố Quận 7, 3,5 tỷ"),
+    ("b:1", "Cho thuê căn hộ q.7 Phú Mỹ Hưng"),
+    ("c:1", "Bán đất Thủ Đức sổ hồng"),
+    ("đ:1", "Nhà phố Bình Thạnh"),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "lexical.idx")
+    assert build_index(DOCS, path) == len(DOCS)
+    return LexicalIndex(path)
+
+
+def test_search(index):
+    hits = index.search("nhà phố quận 7", top_k=4)
+
+    assert len(index) == 4
+    assert hits[0][0] == "a:1"
+    assert {doc_id for doc_id, _ in hits} == {"a:1", "b:1", "đ:1"}
+    assert index.search("3.5 tỷ")[0][0] == "a:1"
+    assert index.search("unknown") == []
+    assert index.doc_id(3) == "đ:1"
+
+
+def test_doc_filter(index):
+    hits = index.search("nhà phố", top_k=1, doc_filter=lambda doc_id: doc_id != "a:1")
+
+    assert [doc_id for doc_id, _ in hits] == ["đ:1"]
+
+
+def test_colliding_term_hashes(tmp_path, monkeypatch):
+    monkeypatch.setattr(lexical_index, "hash64", lambda term: 7)
+    path = str(tmp_path / "lexical.idx")
+    build_index(DOCS, path)
+    index = LexicalIndex(path)
+
+    assert index.search("thu duc")[0][0] == "c:1"
+    assert index.search("q7")[0][0] in {"a:1", "b:1"}
+
+
+def test_empty_index(tmp_path):
+    path = str(tmp_path / "lexical.idx")
+    build_index([], path)
+    index = LexicalIndex(path)
+
+    assert len(index) == 0
+    assert index.search("nha") == []
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "lexical.idx"
+    path.write_bytes(b"LEXIDX01" + bytes(8))
+
+    with pytest.raises(ValueError):
+        LexicalIndex(str(path))
@@ -0,0 +1,201 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+from src.services.routing.llm_router import (
+    CircuitBreaker,
+    LLMBackend,
+    LLMRouter,
+    LLMUnavailableError,
+)
+
+
+class ClientError(Exception):
+    status_code = 400
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class FakeModel(Runnable):
+    """Answers with its name after `delay` seconds, or raises `error`."""
+
+    def __init__(self, name: str, delay: float = 0.0, error: Exception | None = None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    def invoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return AIMessage(content=self.name)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return AIMessage(content=self.name)
+
+    async def astream(self, input, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        for part in (self.name, "!"):
+            yield AIMessage(content=part)
+
+
+def make_router(*models: FakeModel, failures: int = 2, cooldown: float = 60.0, **kwargs):
+    backends = [
+        LLMBackend(model.name, model, breaker=CircuitBreaker(failures, cooldown))
+        for model in models
+    ]
+    kwargs.setdefault("hedge_min_delay", 0.05)
+    kwargs.setdefault("hedge_max_delay", 0.05)
+    return LLMRouter(backends, **kwargs)
+
+
+def test_hedge_to_the_next_provider_wins():
+    slow, fast = FakeModel("slow", delay=1.0), FakeModel("fast", delay=0.01)
+    router = make_router(slow, fast)
+
+    started = time.monotonic()
+    result = asyncio.run(router.ainvoke("hi"))
+
+    assert result.content == "fast"
+    assert time.monotonic() - started < 0.5
+    assert slow.cancelled == 1
+    assert router.stats()["fast"]["hedges"] == router.stats()["fast"]["hedge_wins"] == 1
+
+
+def test_no_hedge_when_disabled():
+    slow, fast = FakeModel("slow", delay=0.2), FakeModel("fast")
+    router = make_router(slow, fast, hedge_enabled=False)
+
+    assert asyncio.run(router.ainvoke("hi")).content == "slow"
+    assert fast.calls == 0
+
+
+def test_failover_on_error():
+    broken, healthy = FakeModel("broken", error=ServerError()), FakeModel("healthy")
+    router = make_router(broken, healthy)
+
+    assert asyncio.run(router.ainvoke("hi")).content == "healthy"
+    assert router.invoke("hi").content == "healthy"
+    assert router.stats()["broken"]["errors"] == 2
+
+
+def test_stream_fails_over_before_the_first_chunk():
+    broken, healthy = FakeModel("broken", error=ServerError()), FakeModel("healthy")
+    router = make_router(broken, healthy)
+
+    async def collect():
+        return [chunk.content async for chunk in router.astream("hi")]
+
+    assert asyncio.run(collect()) == ["healthy", "!"]
+
+
+def test_open_circuit_skips_the_provider():
+    broken, healthy = FakeModel("broken", error=ServerError()), FakeModel("healthy")
+    router = make_router(broken, healthy, failures=2)
+
+    for _ in range(3):
+        router.invoke("hi")
+
+    assert router.stats()["broken"]["circuit"] == CircuitBreaker.OPEN
+    assert broken.calls == 2
+
+
+def test_every_circuit_open():
+    router = make_router(FakeModel("broken", error=ServerError()), failures=1)
+
+    with pytest.raises(ServerError):
+        router.invoke("hi")
+    with pytest.raises(LLMUnavailableError):
+        router.invoke("hi")
+
+
+def test_half_open_probe_closes_or_reopens_the_circuit():
+    model = FakeModel("flaky", error=ServerError())
+    router = make_router(model, failures=1, cooldown=0.05)
+    breaker = router.backends[0].breaker
+
+    with pytest.raises(ServerError):
+        router.invoke("hi")
+    time.sleep(0.06)
+    with pytest.raises(ServerError):
+        router.invoke("hi")
+    # The failed probe re-opened the circuit for another cooldown
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(LLMUnavailableError):
+        router.invoke("hi")
+
+    time.sleep(0.06)
+    model.error = None
+    assert router.invoke("hi").content == "flaky"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_deadline():
+    slow = FakeModel("slow", delay=1.0)
+    router = make_router(slow, timeout=0.05)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        asyncio.run(router.ainvoke("hi"))
+    assert time.monotonic() - started < 0.5
+    assert slow.cancelled == 1
+    assert router.stats()["slow"]["errors"] == 1
+
+
+def test_per_call_deadline():
+    router = make_router(FakeModel("slow", delay=0.1), timeout=0.01)
+
+    assert asyncio.run(router.ainvoke("hi", timeout=1.0)).content == "slow"
+
+
+def test_stream_deadline_on_the_first_chunk():
+    router = make_router(FakeModel("slow", delay=1.0), timeout=0.05)
+
+    async def collect():
+        return [chunk async for chunk in router.astream("hi")]
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(collect())
+
+
+def test_client_error_is_passed_through():
+    rejecting, healthy = FakeModel("rejecting", error=ClientError()), FakeModel("healthy")
+    router = make_router(rejecting, healthy, failures=1)
+
+    with pytest.raises(ClientError):
+        asyncio.run(router.ainvoke("hi"))
+    with pytest.raises(ClientError):
+        router.invoke("hi")
+
+    # Not another provider's business, and not a provider failure
+    assert healthy.calls == 0
+    assert router.stats()["rejecting"]["circuit"] == CircuitBreaker.CLOSED
+    assert router.stats()["rejecting"]["errors"] == 0
@@ -0,0 +1,90 @@
+import pytest
+
+import fakes
+from fakes import FakeRedis
+from src.services.chat_history import chat_history
+from src.services.chat_history.redis_store import RedisChatHistoryStore
+
+
+@pytest.fixture
+def store():
+    return RedisChatHistoryStore(FakeRedis(), ttl_seconds=60, max_messages=3)
+
+
+def test_save_messages_reserves_ids_per_session(store):
+    saved = store.save_messages([("a", "human", "a1"), ("b", "human", "b1"), ("a", "ai", "a2")])
+    assert saved == [
+        ("a", {"id": 1, "role": "human", "content": "a1"}),
+        ("b", {"id": 1, "role": "human", "content": "b1"}),
+        ("a", {"id": 2, "role": "ai", "content": "a2"}),
+    ]
+    assert store.save_messages([("a", "human", "a3")])[0][1]["id"] == 3
+
+
+def test_messages_are_trimmed_to_the_newest(store):
+    store.save_messages([("a", "human", f"m{idx}") for idx in range(1, 6)])
+    messages = store.load_session_messages("a")
+    assert [m["id"] for m in messages] == [3, 4, 5]
+    assert [m["content"] for m in store.load_session_messages("a", after_id=4)] == ["m5"]
+
+
+def test_tail_and_summary_watermark(store):
+    store.save_messages([("a", "human", "q1"), ("a", "ai", "r1"), ("a", "human", "q2")])
+    assert store.load_summary("a") is None
+    store.save_summary("a", "asked q1", 2)
+    tail = store.load_session_tail("a", limit=2)
+    assert (tail.summary, tail.last_message_id) == ("asked q1", 2)
+    assert [m["content"] for m in tail.messages] == ["r1", "q2"]
+    assert store.load_summary("a") == ("asked q1", 2)
+
+
+def test_unknown_session_is_empty(store):
+    tail = store.load_session_tail("missing", limit=5)
+    assert (tail.summary, tail.last_message_id, tail.messages) == ("", 0, [])
+    assert store.load_session_messages("missing") == []
+
+
+def test_sessions_expire_after_their_last_write(store, monkeypatch):
+    store.save_messages([("a", "human", "q1")])
+    store.save_summary("a", "asked q1", 1)
+    now = fakes.time.monotonic()
+    monkeypatch.setattr(fakes.time, "monotonic", lambda: now + 61)
+    assert store.load_session_tail("a", limit=5).messages == []
+    assert store.load_summary("a") is None
+
+
+@pytest.fixture
+def redis_history(store):
+    previous = chat_history.chat_history_store
+    chat_history.use_store(store)
+    yield store
+    chat_history.use_store(previous)
+
+
+def test_shared_store_is_not_cached(redis_history):
+    chat_history.save_message("a", "human", "q1")
+    assert [m["content"] for m in chat_history.get_session_tail("a").messages] == ["q1"]
+    # Written by another node
+    redis_history.save_messages([("a", "ai", "r1")])
+    assert [m["content"] for m in chat_history.get_session_tail("a").messages] == ["q1", "r1"]
+    assert chat_history.session_tail_cache.stats()["sessions"] == 0
+
+
+
+class UnreachableRedis(FakeRedis):
+    def pipeline(self, transaction: bool = True):
+        return UnreachablePipeline()
+
+
+class UnreachablePipeline:
+    def __getattr__(self, command):
+        return lambda *args, **kwargs: None
+
+    def execute(self):
+        raise ConnectionError("Redis went away")
+
+
+def test_failed_tail_load_raises():
+    store = RedisChatHistoryStore(UnreachableRedis())
+    with pytest.raises(ConnectionError):
+        store.load_session_tail("a", limit=5)
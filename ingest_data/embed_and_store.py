@@ -3,6 +3,7 @@ from langchain_chroma import Chroma
 from langchain_aws import BedrockEmbeddings
 from langchain_community.vectorstores.utils import filter_complex_metadata
 from uuid import uuid4
+from shared import CachedEmbeddings, SQLiteEmbeddingStore, chroma_settings
 
 
 class DocumentEmbedder:
@@ -10,11 +11,21 @@ class DocumentEmbedder:
         self,
         model_id: str = "amazon.titan-embed-text-v2:0",
         region_name: str = "us-east-1",
+        dimension: int = 1024,
+        cache_path: str | None = None,
     ):
         print(
             f"Initializing Bedrock embeddings for model: {model_id} (region: {region_name})"
         )
         self.embeddings = BedrockEmbeddings(model_id=model_id, region_name=region_name)
+        if cache_path:
+            print(f"Using embedding cache: {cache_path}")
+            self.embeddings = CachedEmbeddings(
+                self.embeddings,
+                model_id=model_id,
+                dimension=dimension,
+                store=SQLiteEmbeddingStore(cache_path),
+            )
 
     def document_embedding_vectorstore(
         self, split_docs: list[Document], collection_name: str, persist_directory: str
@@ -35,9 +46,10 @@ class DocumentEmbedder:
             embedding_function=self.embeddings,
             persist_directory=persist_directory,
             collection_metadata={"dimension": 1024, "hnsw:space": "cosine"},
+            client_settings=chroma_settings(),
         )
-        # 2. Generate unique ID for each document chunk
-        uuids = [str(uuid4()) for _ in split_docs]
+        # 2. Use the deterministic chunk ids, so re-ingestion upserts in place
+        uuids = [doc.id or str(uuid4()) for doc in split_docs]
 
         # 3. Filter complex metadata before storing
         import json
@@ -1,8 +1,18 @@
-from typing import Optional
+from typing import Iterable, Iterator, Optional
+from shared import listing_key
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+import hashlib
 import json
 
+_READ_BLOCK_SIZE = 1 << 20
+
+
+def chunk_id(key: str, chunk: str) -> str:
+    """Deterministic chunk id derived from the listing key and the chunk content."""
+    digest = hashlib.sha256(f"{key}\n{chunk}".encode("utf-8")).hexdigest()
+    return f"{key}:{digest[:24]}"
+
 
 class LoadAndChunk:
     def __init__(
@@ -34,21 +44,93 @@ class LoadAndChunk:
                 **(self.split_kwargs or {}),
             )
 
-    def read_and_chunk(self, path: str = "data.json") -> list[Document]:
-        self._initialize_splitter()
+    def iter_records(self, path: str = "data.json") -> Iterator[dict]:
+        """
+        Stream records from a JSON array or a JSONL file without loading the
+        whole file in memory.
+        """
+        if path.endswith(".jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            return
 
+        decoder = json.JSONDecoder()
         with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+            buffer = ""
+            pos = 0
+            eof = False
+            started = False
+            while True:
+                # Skip whitespace, the opening bracket and separators
+                while pos < len(buffer) and (
+                    buffer[pos].isspace() or buffer[pos] == "," or (
+                        not started and buffer[pos] == "["
+                    )
+                ):
+                    started = started or buffer[pos] == "["
+                    pos += 1
+                if pos < len(buffer) and buffer[pos] == "]":
+                    return
+                if pos < len(buffer):
+                    try:
+                        record, end = decoder.raw_decode(buffer, pos)
+                        yield record
+                        pos = end
+                        continue
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                elif eof:
+                    return
 
-        chunk_docs = []
-        for idx, value in enumerate(data):
-            content = value.get("content", "")
-            if not content.strip():
+                # Need more data
+                block = f.read(_READ_BLOCK_SIZE)
+                eof = not block
+                buffer = buffer[pos:] + block
+                pos = 0
+
+    def read_records(self, path: str = "data.json") -> list[dict]:
+        return list(self.iter_records(path))
+
+    def chunk_record(self, idx: int, value: dict) -> list[Document]:
+        """Split one record into chunks that share its metadata."""
+        self._initialize_splitter()
+        content = value.get("content", "")
+        if not content.strip():
+            return []
+        key = listing_key(value.get("metadata", {}), fallback=f"record-{idx}")
+        metadata = {**value.get("metadata", {}), "listing_key": key}
+        chunks = self.recursive_splitter.split_text(content)
+        # Identical chunks of one listing map to the same id, keep one
+        docs = {}
+        for chunk in chunks:
+            doc_id = chunk_id(key, chunk)
+            if doc_id not in docs:
+                docs[doc_id] = Document(id=doc_id, page_content=chunk, metadata=metadata)
+        return list(docs.values())
+
+    def iter_chunks(
+        self, records: Iterable[dict], start: int = 0
+    ) -> Iterator[tuple[int, dict, list[Document]]]:
+        """Lazily yield `(record_index, record, chunks)`, skipping the first `start` records."""
+        for idx, value in enumerate(records):
+            if idx < start:
                 continue
-            metadata = value.get("metadata", {})
-            chunks = self.recursive_splitter.split_text(content)
-            for chunk in chunks:
-                chunk_docs.append(Document(page_content=chunk, metadata=metadata))
+            yield idx, value, self.chunk_record(idx, value)
+
+    def read_and_chunk(
+        self, path: str = "data.json", data: Optional[list[dict]] = None
+    ) -> list[Document]:
+        self._initialize_splitter()
+
+        if data is None:
+            data = self.iter_records(path)
+
+        chunk_docs = []
+        for idx, _, chunks in self.iter_chunks(data):
+            chunk_docs.extend(chunks)
 
             if (idx + 1) % 100 == 0:
                 print(f"Processed {idx + 1} documents, total chunks: {len(chunk_docs)}")
@@ -1,45 +1,94 @@
+import argparse
 import sys
 import traceback
 from pathlib import Path
 from load_and_chunk import LoadAndChunk
+from shared import ListingStoreWriter
+from manifest import IngestManifest
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from embed_and_store import DocumentEmbedder
+from pipeline import StreamingIngestion
 
 
 DATA_PATH = "data_mock_test.json"
 COLLECTION_NAME = "rag-goldog-ai"
 PERSIST_DIRECTORY = "../backend/infra/vector_stores/storage"
+EMBEDDING_CACHE_PATH = "../backend/infra/embedding_cache/embeddings.sqlite3"
+LISTING_STORE_PATH = "../backend/infra/vector_stores/storage/listings.sqlite3"
+MANIFEST_PATH = "../backend/infra/vector_stores/storage/ingest_manifest.sqlite3"
+LEXICAL_INDEX_PATH = "../backend/infra/vector_stores/storage/lexical.idx"
+ATTRIBUTE_INDEX_PATH = "../backend/infra/vector_stores/storage/attributes.npz"
+VECTOR_INDEX_PATH = "../backend/infra/vector_stores/storage/vectors.idx"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Goldog data ingestion pipeline")
+    parser.add_argument("--data", default=DATA_PATH, help="JSON array or JSONL file")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding batch")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent Bedrock requests")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file path")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--full", action="store_true", help="Re-embed unchanged listings too")
+    parser.add_argument(
+        "--no-prune",
+        action="store_true",
+        help="Keep listings missing from the feed (use for partial feeds)",
+    )
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
     print("=" * 80)
     print("Starting Data Ingestion Pipeline")
     print("=" * 80)
 
-    print("\nLoading and chunking documents...")
-    loader = LoadAndChunk()
-    chunked_docs = loader.read_and_chunk(path=DATA_PATH)
-    print(f"Successfully created {len(chunked_docs)} document chunks")
-
-    print("\nCreating embeddings and storing in vector database...")
-    embedder = DocumentEmbedder()
-
     persist_path = Path(PERSIST_DIRECTORY)
     persist_path.mkdir(parents=True, exist_ok=True)
-    vectordb = embedder.document_embedding_vectorstore(
-        split_docs=chunked_docs,
+
+    loader = LoadAndChunk()
+    embedder = DocumentEmbedder(cache_path=EMBEDDING_CACHE_PATH)
+    listing_store = ListingStoreWriter(LISTING_STORE_PATH)
+    manifest = IngestManifest(MANIFEST_PATH)
+
+    print(f"\nStreaming {args.data} into Chroma collection: {COLLECTION_NAME}")
+    pipeline = StreamingIngestion(
+        loader=loader,
+        embedder=embedder,
         collection_name=COLLECTION_NAME,
         persist_directory=str(persist_path),
+        listing_store=listing_store,
+        batch_size=args.batch_size,
+        max_concurrency=args.concurrency,
+        checkpoint_path=args.checkpoint,
+        manifest=manifest,
+        lexical_index_path=LEXICAL_INDEX_PATH,
+        attribute_index_path=ATTRIBUTE_INDEX_PATH,
+        vector_index_path=VECTOR_INDEX_PATH,
     )
+    stats = pipeline.run(
+        args.data, restart=args.restart, prune=not args.no_prune, force=args.full
+    )
+    listing_store.close()
+    manifest.close()
+
+    # Signal running API processes that the collection changed
+    (persist_path / ".ingest_version").touch()
 
-    print(f"Successfully stored documents in Chroma collection: {COLLECTION_NAME}")
+    print(
+        f"\nIngested {stats['records']} new or changed documents / {stats['chunks']} chunks, "
+        f"{stats['unchanged']} unchanged, {stats['pruned']} pruned, "
+        f"in {stats['seconds']:.1f}s "
+        f"({stats['docs_per_sec']:.1f} docs/sec, "
+        f"{stats['embeddings_per_sec']:.1f} embeddings/sec)"
+    )
     print(f"Persist directory: {persist_path.absolute()}")
 
     print("\nChecking vector store...")
-    doc_count = vectordb._collection.count()
+    doc_count = pipeline.vectordb._collection.count()
     print(f"Total documents in vector store: {doc_count}")
 
 
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    listing_key TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    updated_at TEXT,
+    chunk_ids TEXT NOT NULL,
+    run_id TEXT NOT NULL
+)
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS ix_manifest_run_id ON manifest (run_id)"
+
+
+def record_hash(record: dict) -> str:
+    """Hash of everything that ends up in the vector store for a record."""
+    payload = json.dumps(
+        {"content": record.get("content", ""), "metadata": record.get("metadata", {})},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """
+    Content hashes and chunk ids of every ingested listing, used to embed
+    only new or changed listings and to delete listings that left the feed.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(_SCHEMA)
+        self.conn.execute(_INDEX)
+        self.conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple[str, list[str]]]:
+        """Return `{listing_key: (content_hash, chunk_ids)}` for known keys."""
+        found = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                "SELECT listing_key, content_hash, chunk_ids FROM manifest "
+                f"WHERE listing_key IN ({placeholders})",
+                batch,
+            ).fetchall()
+            for key, content_hash, chunk_ids in rows:
+                found[key] = (content_hash, json.loads(chunk_ids))
+        return found
+
+    def upsert_many(
+        self, entries: list[tuple[str, str, Optional[str], list[str]]], run_id: str
+    ):
+        """Store `(listing_key, content_hash, updated_at, chunk_ids)` entries."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO manifest "
+            "(listing_key, content_hash, updated_at, chunk_ids, run_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (key, content_hash, updated_at, json.dumps(chunk_ids), run_id)
+                for key, content_hash, updated_at, chunk_ids in entries
+            ],
+        )
+        self.conn.commit()
+
+    def mark_seen(self, keys: list[str], run_id: str):
+        self.conn.executemany(
+            "UPDATE manifest SET run_id = ? WHERE listing_key = ?",
+            [(run_id, key) for key in keys],
+        )
+        self.conn.commit()
+
+    def stale(self, run_id: str) -> dict[str, list[str]]:
+        """Listings not seen during `run_id`, with their chunk ids."""
+        rows = self.conn.execute(
+            "SELECT listing_key, chunk_ids FROM manifest WHERE run_id != ?", (run_id,)
+        ).fetchall()
+        return {key: json.loads(chunk_ids) for key, chunk_ids in rows}
+
+    def delete_many(self, keys: list[str]):
+        self.conn.executemany(
+            "DELETE FROM manifest WHERE listing_key = ?", [(key,) for key in keys]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
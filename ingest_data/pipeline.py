@@ -0,0 +1,405 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+from langchain_chroma import Chroma
+from langchain_community.vectorstores.utils import filter_complex_metadata
+from langchain_core.documents import Document
+
+from embed_and_store import DocumentEmbedder
+from load_and_chunk import LoadAndChunk
+from manifest import IngestManifest, record_hash
+from shared import (
+    ListingStoreWriter,
+    attribute_index,
+    chroma_settings,
+    lexical_index,
+    listing_key,
+    vector_index,
+)
+
+
+class Checkpoint:
+    """Progress of an ingestion run, written atomically after every window."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self, source: str) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("source") != source:
+            print(f"Ignoring checkpoint of another source: {state.get('source')}")
+            return {}
+        return state
+
+    def save(self, state: dict):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@dataclass
+class _Window:
+    """Records, chunks and manifest updates written together."""
+
+    records: list[dict] = field(default_factory=list)
+    indexes: list[int] = field(default_factory=list)
+    docs: list[Document] = field(default_factory=list)
+    entries: list[tuple] = field(default_factory=list)
+    stale_ids: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    scanned: int = 0
+
+    def clear(self):
+        self.__init__()
+
+
+class StreamingIngestion:
+    """
+    Streaming ingestion: records are read and chunked lazily, chunks are
+    embedded in fixed-size batches with at most `max_concurrency` Bedrock
+    requests in flight, and written to Chroma one window of batches at a time.
+
+    A checkpoint is saved after each window, so an interrupted run resumes
+    after the last fully written record.
+
+    Chunk ids are derived from the listing key and the chunk content, so
+    writes are idempotent. With a `manifest`, listings whose content hash is
+    unchanged are skipped, changed listings have their old chunks replaced,
+    and listings missing from the feed are pruned at the end of the run.
+    """
+
+    def __init__(
+        self,
+        loader: LoadAndChunk,
+        embedder: DocumentEmbedder,
+        collection_name: str,
+        persist_directory: str,
+        listing_store: Optional[ListingStoreWriter] = None,
+        batch_size: int = 64,
+        max_concurrency: int = 4,
+        checkpoint_path: Optional[str] = None,
+        manifest: Optional[IngestManifest] = None,
+        lexical_index_path: Optional[str] = None,
+        attribute_index_path: Optional[str] = None,
+        vector_index_path: Optional[str] = None,
+    ):
+        self.loader = loader
+        self.embedder = embedder
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
+        self.listing_store = listing_store
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.manifest = manifest
+        self.lexical_index_path = lexical_index_path
+        self.attribute_index_path = attribute_index_path
+        self.vector_index_path = vector_index_path
+        self.checkpoint = Checkpoint(
+            checkpoint_path or str(Path(persist_directory) / ".ingest_checkpoint.json")
+        )
+        self.vectordb = Chroma(
+            collection_name=collection_name,
+            embedding_function=embedder.embeddings,
+            persist_directory=persist_directory,
+            collection_metadata={"dimension": 1024, "hnsw:space": "cosine"},
+            client_settings=chroma_settings(),
+        )
+
+    @staticmethod
+    def _prepare(docs: list[Document]) -> list[Document]:
+        for doc in docs:
+            if "image" in doc.metadata and isinstance(doc.metadata["image"], list):
+                doc.metadata = {
+                    **doc.metadata,
+                    "image": json.dumps(doc.metadata["image"], ensure_ascii=False),
+                }
+        return filter_complex_metadata(docs)
+
+    def _embed_batch(self, docs: list[Document]) -> list[list[float]]:
+        return self.embedder.embeddings.embed_documents(
+            [doc.page_content for doc in docs]
+        )
+
+    def _delete_chunks(self, ids: list[str]) -> None:
+        for start in range(0, len(ids), 1000):
+            self.vectordb._collection.delete(ids=ids[start : start + 1000])
+
+    def _write_window(
+        self, executor: ThreadPoolExecutor, window: _Window, run_id: str
+    ) -> None:
+        docs = self._prepare(window.docs)
+        batches = [
+            docs[start : start + self.batch_size]
+            for start in range(0, len(docs), self.batch_size)
+        ]
+        for batch, embeddings in zip(batches, executor.map(self._embed_batch, batches)):
+            self.vectordb._collection.upsert(
+                ids=[doc.id or str(uuid4()) for doc in batch],
+                embeddings=embeddings,
+                metadatas=[doc.metadata for doc in batch],
+                documents=[doc.page_content for doc in batch],
+            )
+        # Chunks a changed listing no longer produces. A listing repeated in
+        # the window keeps only the chunks of its last version.
+        latest = {key: chunk_ids for key, _, _, chunk_ids in window.entries}
+        keep = {chunk for chunk_ids in latest.values() for chunk in chunk_ids}
+        stale_ids = [chunk for chunk in set(window.stale_ids) if chunk not in keep]
+        if stale_ids:
+            self._delete_chunks(stale_ids)
+        if self.listing_store is not None and window.records:
+            self.listing_store.upsert_many(window.records, indexes=window.indexes)
+
+        # The manifest is updated last: a crash before this point re-embeds
+        # the window on the next run instead of losing it
+        if self.manifest is not None:
+            self.manifest.upsert_many(window.entries, run_id=run_id)
+            self.manifest.mark_seen(window.unchanged, run_id=run_id)
+
+    def _add_record(
+        self,
+        window: _Window,
+        idx: int,
+        record: dict,
+        known: dict,
+        written: dict,
+        force: bool,
+    ):
+        window.scanned += 1
+        if self.manifest is None:
+            window.records.append(record)
+            window.indexes.append(idx)
+            window.docs.extend(self.loader.chunk_record(idx, record))
+            return
+
+        key = listing_key(record.get("metadata", {}), fallback=f"record-{idx}")
+        content_hash = record_hash(record)
+        previous_hash, previous_ids = written.get(key) or known.get(key, (None, []))
+        if previous_hash == content_hash and not force:
+            window.unchanged.append(key)
+            return
+
+        chunks = self.loader.chunk_record(idx, record)
+        chunk_ids = [doc.id for doc in chunks]
+        window.records.append(record)
+        window.indexes.append(idx)
+        window.docs.extend(chunks)
+        window.entries.append(
+            (key, content_hash, record.get("metadata", {}).get("updatedAt"), chunk_ids)
+        )
+        window.stale_ids.extend(set(previous_ids) - set(chunk_ids))
+        # A listing repeated later in the feed compares against this version
+        written[key] = (content_hash, chunk_ids)
+
+    def _prune(self, run_id: str) -> int:
+        """Delete listings that were not seen during `run_id`."""
+        stale = self.manifest.stale(run_id)
+        if not stale:
+            return 0
+        self._delete_chunks([chunk for ids in stale.values() for chunk in ids])
+        if self.listing_store is not None:
+            self.listing_store.delete_many(list(stale))
+        self.manifest.delete_many(list(stale))
+        return len(stale)
+
+    def _iter_collection(self, page_size: int = 1000):
+        """Yield `(chunk_id, text)` for every chunk in the collection."""
+        offset = 0
+        while True:
+            page = self.vectordb._collection.get(
+                include=["documents", "metadatas"], limit=page_size, offset=offset
+            )
+            if not page["ids"]:
+                return
+            for chunk_id, text, metadata in zip(
+                page["ids"], page["documents"], page["metadatas"]
+            ):
+                metadata = metadata or {}
+                # Every chunk is searchable by the listing's address and type
+                yield chunk_id, " ".join(
+                    [text or "", str(metadata.get("address", "")), str(metadata.get("type", ""))]
+                )
+            offset += len(page["ids"])
+
+    def _iter_vectors(self, page_size: int = 1000):
+        """Yield `(chunk_id, embedding, text, metadata)` for every chunk in the collection."""
+        offset = 0
+        while True:
+            page = self.vectordb._collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=page_size,
+                offset=offset,
+            )
+            if not len(page["ids"]):
+                return
+            yield from zip(
+                page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+            )
+            offset += len(page["ids"])
+
+    def build_lexical_index(self) -> int:
+        """Rebuild the BM25 index from the whole collection, returns its size."""
+        started = time.perf_counter()
+        n_docs = lexical_index.build_index(
+            self._iter_collection(), self.lexical_index_path
+        )
+        print(
+            f"Built lexical index of {n_docs} chunks in "
+            f"{time.perf_counter() - started:.1f}s: {self.lexical_index_path}"
+        )
+        return n_docs
+
+    def build_vector_index(self) -> int:
+        """Export the collection's embeddings to the memory-mapped vector index."""
+        started = time.perf_counter()
+        n_chunks = vector_index.build_index(self._iter_vectors(), self.vector_index_path)
+        print(
+            f"Built vector index of {n_chunks} chunks in "
+            f"{time.perf_counter() - started:.1f}s: {self.vector_index_path}"
+        )
+        return n_chunks
+
+    def build_attribute_index(self) -> int:
+        """Rebuild the price / area / location / type columns from the listing store."""
+        started = time.perf_counter()
+        n_listings = attribute_index.build_index(
+            self.listing_store.iter_records(), self.attribute_index_path
+        )
+        print(
+            f"Built attribute index of {n_listings} listings in "
+            f"{time.perf_counter() - started:.1f}s: {self.attribute_index_path}"
+        )
+        return n_listings
+
+    def run(
+        self, path: str, restart: bool = False, prune: bool = True, force: bool = False
+    ) -> dict:
+        """
+        Ingest `path`. `force` re-embeds every listing even if its content
+        hash is unchanged, `prune` deletes listings missing from the feed.
+        """
+        if restart:
+            self.checkpoint.clear()
+        state = self.checkpoint.load(source=path)
+        records_done = state.get("records_done", 0)
+        chunks_done = state.get("chunks_done", 0)
+        run_id = state.get("run_id") or uuid4().hex
+        if records_done:
+            print(f"Resuming from checkpoint: {records_done} records, {chunks_done} chunks")
+
+        window_size = self.batch_size * self.max_concurrency
+        window = _Window()
+        started = time.perf_counter()
+        run_records = 0
+        run_chunks = 0
+        run_skipped = 0
+
+        def flush():
+            nonlocal records_done, chunks_done, run_records, run_chunks, run_skipped
+            self._write_window(executor, window, run_id)
+            records_done += window.scanned
+            chunks_done += len(window.docs)
+            run_records += len(window.records)
+            run_chunks += len(window.docs)
+            run_skipped += len(window.unchanged)
+            self.checkpoint.save(
+                {
+                    "source": path,
+                    "run_id": run_id,
+                    "records_done": records_done,
+                    "chunks_done": chunks_done,
+                }
+            )
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            print(
+                f"[{records_done} docs, {chunks_done} chunks, {run_skipped} unchanged] "
+                f"{run_records / elapsed:.1f} docs/sec, "
+                f"{run_chunks / elapsed:.1f} embeddings/sec"
+            )
+            window.clear()
+
+        # Listings written during this run, they may not be flushed yet
+        written: dict[str, tuple[str, list[str]]] = {}
+
+        def lookup(pending: list[tuple[int, dict]]) -> dict:
+            if self.manifest is None:
+                return {}
+            keys = [
+                listing_key(record.get("metadata", {}), fallback=f"record-{idx}")
+                for idx, record in pending
+            ]
+            return self.manifest.get_many(keys)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            pending: list[tuple[int, dict]] = []
+            records = self.loader.iter_records(path)
+            for idx, record in enumerate(records):
+                if idx < records_done:
+                    continue
+                pending.append((idx, record))
+                if len(pending) < window_size:
+                    continue
+                # One manifest query per group of records
+                known = lookup(pending)
+                for pending_idx, pending_record in pending:
+                    self._add_record(
+                        window, pending_idx, pending_record, known, written, force
+                    )
+                    if len(window.docs) >= window_size:
+                        flush()
+                pending.clear()
+            known = lookup(pending)
+            for pending_idx, pending_record in pending:
+                self._add_record(
+                    window, pending_idx, pending_record, known, written, force
+                )
+            if window.scanned:
+                flush()
+
+        pruned = 0
+        if self.manifest is not None and prune:
+            pruned = self._prune(run_id)
+            if pruned:
+                print(f"Pruned {pruned} listings missing from {path}")
+
+        # The indexes cover the whole collection, not only this run's chunks
+        changed = bool(run_records or pruned)
+        if self.lexical_index_path and (
+            changed or not os.path.exists(self.lexical_index_path)
+        ):
+            self.build_lexical_index()
+        if self.vector_index_path and (
+            changed or not os.path.exists(self.vector_index_path)
+        ):
+            self.build_vector_index()
+        if (
+            self.attribute_index_path
+            and self.listing_store is not None
+            and (changed or not os.path.exists(self.attribute_index_path))
+        ):
+            self.build_attribute_index()
+
+        self.checkpoint.clear()
+        elapsed = time.perf_counter() - started
+        return {
+            "records": run_records,
+            "chunks": run_chunks,
+            "unchanged": run_skipped,
+            "pruned": pruned,
+            "seconds": elapsed,
+            "docs_per_sec": run_records / elapsed if elapsed else 0.0,
+            "embeddings_per_sec": run_chunks / elapsed if elapsed else 0.0,
+        }
@@ -0,0 +1,18 @@
+"""
+Stores and index files the ingestion writes and the API reads. Both import
+the one implementation under `backend/src/infra`, so the formats cannot
+drift apart.
+"""
+import sys
+from pathlib import Path
+
+_BACKEND_DIR = str(Path(__file__).resolve().parent.parent / "backend")
+if _BACKEND_DIR not in sys.path:
+    sys.path.append(_BACKEND_DIR)
+
+from src.infra.attribute_index import attribute_index
+from src.infra.embeddings.embedding_cache import CachedEmbeddings, SQLiteEmbeddingStore
+from src.infra.lexical_index import lexical_index
+from src.infra.listing_store.listing_store import ListingStoreWriter, listing_key
+from src.infra.vector_index import vector_index
+from src.infra.vector_stores.chroma_settings import chroma_settings